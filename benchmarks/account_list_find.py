@@ -0,0 +1,34 @@
+# Copyright 2016 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+# Measures AccountList.find() the way the loader uses it: once per split, with the name of an
+# account that is already in the list.
+# Run with "python -m benchmarks.account_list_find [account_count ...]" from the root of the project.
+
+import sys
+import time
+
+from core.model.account import Account, AccountList, AccountType
+from core.model.currency import CAD
+
+FIND_COUNT = 100000
+
+def main(counts):
+    for count in counts:
+        accounts = AccountList(CAD)
+        for i in range(count):
+            account = Account('Account {}'.format(i), CAD, AccountType.Asset)
+            account.account_number = str(10000 + i)
+            accounts.add(account)
+        names = ['account {}'.format(i % count) for i in range(FIND_COUNT)]
+        start_time = time.perf_counter()
+        for name in names:
+            accounts.find(name)
+        elapsed = time.perf_counter() - start_time
+        print("{:>8} accounts: {:6.2f}s for {} finds".format(count, elapsed, FIND_COUNT))
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10, 100, 1000])
@@ -0,0 +1,41 @@
+# Copyright 2016 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+# Compares the time it takes to parse the split amounts of a native document with the general
+# amount parser and with the canonical amount parser that the native loader now tries first.
+# Run with "python -m benchmarks.amount_parse [split_count]" from the root of the project.
+
+import sys
+import time
+
+from core.model.amount import Amount, format_amount, parse_amount, parse_canonical_amount
+from core.model.currency import CAD, EUR, USD
+
+def make_amounts(split_count):
+    currencies = [CAD, CAD, CAD, USD, EUR]
+    return [
+        format_amount(Amount(((i * 7919) % 200001 - 100000) / 100, currencies[i % len(currencies)]))
+        for i in range(split_count)
+    ]
+
+def measure(func, amounts):
+    start_time = time.perf_counter()
+    for string in amounts:
+        func(string)
+    return time.perf_counter() - start_time
+
+def main(split_count):
+    print("{} split amounts".format(split_count))
+    amounts = make_amounts(split_count)
+    elapsed = measure(
+        lambda s: parse_amount(s, CAD, with_expression=False, strict_currency=True), amounts
+    )
+    print("parse_amount:           {:6.2f}s".format(elapsed))
+    elapsed = measure(parse_canonical_amount, amounts)
+    print("parse_canonical_amount: {:6.2f}s".format(elapsed))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
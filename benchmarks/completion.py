@@ -0,0 +1,49 @@
+# Copyright 2016 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+# Measures description completion the way a completable edit uses it: a transaction changes, then
+# the user types a few letters.
+# Run with "python -m benchmarks.completion [count ...]" from the root of the project.
+
+import sys
+import time
+from datetime import date, timedelta
+
+from core.model.completion import CompletionList
+from core.model.transaction import Transaction
+from core.model.transaction_list import TransactionList
+
+ROUNDS = 100
+
+def make_transactions(count):
+    start = date(2000, 1, 1)
+    result = []
+    for i in range(count):
+        txn = Transaction(start + timedelta(days=i // 50), description='Description {}'.format(i % 5000))
+        txn.mtime = i
+        result.append(txn)
+    return result
+
+def main(counts):
+    for count in counts:
+        txns = make_transactions(count)
+        transactions = TransactionList(txns)
+        transactions.complete('description', '')
+        start_time = time.perf_counter()
+        for i in range(ROUNDS):
+            txn = txns[i]
+            txn.description = 'Changed {}'.format(i)
+            txn.mtime = count + i
+            transactions.reindex(txn)
+            for partial in ['c', 'ch', 'cha']:
+                CompletionList(partial, transactions.complete('description', partial)).current()
+        elapsed = time.perf_counter() - start_time
+        print("{:>8} transactions: {:.2f}ms per change and 3 keystrokes".format(
+            count, elapsed / ROUNDS * 1000
+        ))
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000])
@@ -0,0 +1,61 @@
+# Copyright 2016 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+# Compares the object-based EntryList with the ColumnarEntryList.
+# Run with "python -m benchmarks.entry_list [entry_count]" from the root of the project.
+
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from core.model.account import Account, AccountList, AccountType
+from core.model.amount import Amount
+from core.model.currency import CAD
+from core.model.entry import EntryList, ColumnarEntryList
+from core.model.oven import Oven
+from core.model.transaction import Transaction
+from core.model.transaction_list import TransactionList
+
+def make_transactions(account, count):
+    start = date(2000, 1, 1)
+    return TransactionList(
+        Transaction(start + timedelta(days=i // 20), account=account, amount=Amount((i % 97) - 40, CAD))
+        for i in range(count)
+    )
+
+def bench(entry_list_class, count):
+    account = Account('Checking', CAD, AccountType.Asset)
+    account.entries = entry_list_class(account)
+    accounts = AccountList(CAD)
+    accounts.add(account)
+    transactions = make_transactions(account, count)
+    oven = Oven(accounts, transactions, [], [])
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start_time = time.perf_counter()
+    oven.cook()
+    cook_time = time.perf_counter() - start_time
+    memory = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    last_date = transactions[-1].date
+    lookup_dates = [date(2000, 1, 1) + timedelta(days=i % (last_date - date(2000, 1, 1)).days) for i in range(10000)]
+    start_time = time.perf_counter()
+    for d in lookup_dates:
+        account.entries.balance(d)
+    lookup_time = time.perf_counter() - start_time
+    return cook_time, memory, lookup_time
+
+def main(count):
+    print("{} entries".format(count))
+    for entry_list_class in [EntryList, ColumnarEntryList]:
+        cook_time, memory, lookup_time = bench(entry_list_class, count)
+        print("{:<18} cook: {:6.2f}s memory: {:7.1f} bytes/entry 10k balance(): {:.3f}s".format(
+            entry_list_class.__name__, cook_time, memory / count, lookup_time
+        ))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,66 @@
+# Copyright 2016 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+# Measures the time and peak memory of saving a synthetic document with our native saver. For
+# comparison, we also measure the peak memory of holding that same document as an ElementTree,
+# which is what our saver used to build before writing anything.
+# Run with "python -m benchmarks.native_save [split_count]" from the root of the project.
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.cElementTree as ET
+from datetime import date, timedelta
+
+from core.model.account import Account, AccountList, AccountType, GroupList
+from core.model.amount import Amount
+from core.model.currency import CAD
+from core.model.transaction import Transaction
+from core.model.transaction_list import TransactionList
+from core.saver.native import save
+
+def make_document(split_count):
+    accounts = AccountList(CAD)
+    for i in range(20):
+        accounts.add(Account('Account {}'.format(i), CAD, AccountType.Asset))
+    start = date(2000, 1, 1)
+    transactions = TransactionList()
+    for i in range(split_count // 2):
+        txn = Transaction(
+            start + timedelta(days=i // 50), description='Transaction {}'.format(i % 1000),
+            payee='Payee {}'.format(i % 300), account=accounts[i % 20], amount=Amount((i % 97) - 40, CAD)
+        )
+        txn.splits[1].account = accounts[(i + 7) % 20]
+        transactions.add(txn)
+    return accounts, transactions
+
+def measure(func):
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start_time
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+def main(split_count):
+    print("{} splits".format(split_count))
+    accounts, transactions = make_document(split_count)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, 'bench.moneyguru')
+        elapsed, peak = measure(
+            lambda: save(filename, 'id', {}, accounts, GroupList(), transactions, [], [])
+        )
+        size = os.path.getsize(filename)
+        print("file size: {:.1f} MB".format(size / 1024 / 1024))
+        print("save: {:6.2f}s peak memory: {:7.1f} MB".format(elapsed, peak / 1024 / 1024))
+        elapsed, peak = measure(lambda: ET.parse(filename))
+        print("ElementTree of the same document: peak memory: {:7.1f} MB".format(peak / 1024 / 1024))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,61 @@
+# Copyright 2016 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+# Measures the filtering of transactions by a search query, the way the transaction view does it
+# on each keystroke in the search field.
+# Run with "python -m benchmarks.search [count ...]" from the root of the project.
+
+import sys
+import time
+from datetime import date, timedelta
+
+from core.app import Application
+from core.tests.base import ApplicationGUI
+from core.model.account import Account, AccountType
+from core.model.amount import Amount
+from core.model.currency import CAD
+from core.model.transaction import Transaction
+from core.model.transaction_list import TransactionList
+
+QUERY_STRINGS = [
+    'g', 'gr', 'gro', 'groc', 'groce', 'grocer', 'grocery 12', '12', 'amount:10..20', 'gas OR rent',
+    'grocery AND NOT payee: payee 1',
+]
+
+def make_transactions(count):
+    start = date(2000, 1, 1)
+    accounts = [Account('Account {}'.format(i), CAD, AccountType.Asset) for i in range(20)]
+    words = ['Grocery', 'Gas', 'Rent', 'Salary', 'Restaurant', 'Pharmacy', 'Hardware', 'Books']
+    return TransactionList(
+        Transaction(
+            start + timedelta(days=i // 50), description='{} {}'.format(words[i % len(words)], i % 997),
+            payee='Payee {}'.format(i % 313), account=accounts[i % len(accounts)], amount=Amount(i % 97, CAD)
+        )
+        for i in range(count)
+    )
+
+def measure(func):
+    app = Application(ApplicationGUI())
+    queries = [app.parse_search_query(query_string) for query_string in QUERY_STRINGS]
+    start_time = time.perf_counter()
+    for query in queries:
+        func(query)
+    return (time.perf_counter() - start_time) / len(QUERY_STRINGS)
+
+def main(counts):
+    for count in counts:
+        transactions = make_transactions(count)
+        elapsed = measure(lambda query: [t for t in transactions if query.matches(t)])
+        print("{:>8} transactions: matches():  {:.2f}ms per keystroke".format(count, elapsed * 1000))
+        start_time = time.perf_counter()
+        transactions.matching({})
+        elapsed = time.perf_counter() - start_time
+        print("{:>8} transactions: build index: {:.2f}s".format(count, elapsed))
+        elapsed = measure(lambda query: query.transactions(transactions))
+        print("{:>8} transactions: indexes:   {:.2f}ms per keystroke".format(count, elapsed * 1000))
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000])
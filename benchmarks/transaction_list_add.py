@@ -0,0 +1,35 @@
+# Copyright 2016 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+# Measures how adding transactions to a TransactionList scales, the way an import adds them: without
+# a position, so that each of them has to be placed after the other transactions of its date.
+# Run with "python -m benchmarks.transaction_list_add [count ...]" from the root of the project.
+
+import sys
+import time
+from datetime import date, timedelta
+
+from core.model.transaction import Transaction
+from core.model.transaction_list import TransactionList
+
+def make_transactions(count):
+    start = date(2000, 1, 1)
+    return [Transaction(start + timedelta(days=i // 50)) for i in range(count)]
+
+def main(counts):
+    for count in counts:
+        txns = make_transactions(count)
+        transactions = TransactionList()
+        start_time = time.perf_counter()
+        for txn in txns:
+            transactions.add(txn)
+        elapsed = time.perf_counter() - start_time
+        print("{:>8} transactions: {:6.2f}s ({:.2f}us per add)".format(
+            count, elapsed, elapsed / count * 1000000
+        ))
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000])
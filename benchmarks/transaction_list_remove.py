@@ -0,0 +1,51 @@
+# Copyright 2016 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+# Measures membership tests and removals in a TransactionList, and the deletion of one of its 20
+# accounts through TransactionList.reassign_account(). The indexes that reassign_account() uses are
+# built once per list, which we measure separately.
+# Run with "python -m benchmarks.transaction_list_remove [count ...]" from the root of the project.
+
+import sys
+import time
+from datetime import date, timedelta
+
+from core.model.account import Account, AccountType
+from core.model.amount import Amount
+from core.model.currency import CAD
+from core.model.transaction import Transaction
+from core.model.transaction_list import TransactionList
+
+def make_transactions(count, accounts):
+    start = date(2000, 1, 1)
+    return TransactionList(
+        Transaction(
+            start + timedelta(days=i // 50), account=accounts[i % len(accounts)], amount=Amount(i % 97, CAD)
+        )
+        for i in range(count)
+    )
+
+def measure(func):
+    start_time = time.perf_counter()
+    func()
+    return time.perf_counter() - start_time
+
+def main(counts):
+    accounts = [Account('Account {}'.format(i), CAD, AccountType.Asset) for i in range(20)]
+    for count in counts:
+        transactions = make_transactions(count, accounts)
+        txns = list(transactions)
+        elapsed = measure(lambda: [txn in transactions for txn in txns])
+        print("{:>8} transactions: membership: {:6.2f}s".format(count, elapsed))
+        elapsed = measure(lambda: transactions.transactions_for_account(accounts[0]))
+        print("{:>8} transactions: build indexes: {:6.2f}s".format(count, elapsed))
+        elapsed = measure(lambda: transactions.reassign_account(accounts[0]))
+        print("{:>8} transactions: delete account: {:6.2f}s".format(count, elapsed))
+        elapsed = measure(lambda: [transactions.remove(txn) for txn in list(transactions)])
+        print("{:>8} transactions: remove all: {:6.2f}s".format(count, elapsed))
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000])
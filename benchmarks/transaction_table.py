@@ -0,0 +1,62 @@
+# Copyright 2016 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+# Measures the refresh of the transaction table and of the entry table of an account that has
+# all the transactions, and the fetching of a screenful of rows from them.
+# Run with "python -m benchmarks.transaction_table [count ...]" from the root of the project.
+
+import sys
+import time
+from datetime import date, timedelta
+
+from core.tests.base import TestApp
+from core.model.account import AccountType
+from core.model.amount import Amount
+from core.model.transaction import Transaction
+
+def make_app(count):
+    app = TestApp()
+    app.add_account('Checking')
+    app.add_account('Income', account_type=AccountType.Income)
+    doc = app.doc
+    checking = doc.accounts.find('Checking')
+    income = doc.accounts.find('Income')
+    start = date(2000, 1, 1)
+    for i in range(count):
+        txn = Transaction(
+            start + timedelta(days=i // 50), description='Transaction {}'.format(i), account=checking,
+            amount=Amount(i % 97 + 1, doc.default_currency)
+        )
+        txn.splits[1].account = income
+        doc.transactions.add(txn)
+    doc._cook()
+    doc.select_all_transactions_range()
+    return app
+
+def measure(func):
+    start_time = time.perf_counter()
+    func()
+    return time.perf_counter() - start_time
+
+def fetch_screenful(table):
+    for row in table[-50:]:
+        row.description
+        row.amount if hasattr(row, 'amount') else row.increase
+
+def main(counts):
+    for count in counts:
+        app = make_app(count)
+        app.show_tview()
+        elapsed = measure(app.ttable.refresh)
+        print("{:>8} transactions: transaction table refresh: {:.2f}s".format(count, elapsed))
+        elapsed = measure(lambda: fetch_screenful(app.ttable))
+        print("{:>8} transactions: transaction table screenful: {:.2f}ms".format(count, elapsed * 1000))
+        app.show_account('Checking')
+        elapsed = measure(app.etable.refresh)
+        print("{:>8} transactions: entry table refresh: {:.2f}s".format(count, elapsed))
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 50000])
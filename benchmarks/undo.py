@@ -0,0 +1,70 @@
+# Copyright 2016 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+# Measures the memory that the undo action of a mass edition holds, before and after it's compacted,
+# and the time it takes to undo and redo the change of a single transaction.
+# Run with "python -m benchmarks.undo [count ...]" from the root of the project.
+
+import gc
+import sys
+import time
+import tracemalloc
+
+from core.model.amount import Amount
+from .transaction_table import make_app
+
+EDITS = [
+    ('description', lambda doc: {'description': 'changed'}),
+    ('amount', lambda doc: {'amount': Amount(42, doc.default_currency)}),
+]
+
+def held_memory():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+def measure(app, kwargs):
+    # Returns the memory held by the action before and after it's compacted, which is what's freed
+    # when the action is forgotten.
+    doc = app.doc
+    tracemalloc.start()
+    doc.change_transactions(list(doc.transactions), **kwargs)
+    action = doc._undoer._actions[-1]
+    before = held_memory()
+    action.compact()
+    compacted = held_memory()
+    doc._undoer.clear()
+    del action
+    forgotten = held_memory()
+    tracemalloc.stop()
+    return before - forgotten, compacted - forgotten
+
+def measure_undo(app):
+    # Returns the time it takes to undo and redo a description change in the last transaction.
+    doc = app.doc
+    transactions = list(doc.transactions)
+    doc.change_transactions(transactions[-1:], description='changed')
+    start_time = time.perf_counter()
+    doc.undo()
+    undo_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    doc.redo()
+    return undo_time, time.perf_counter() - start_time
+
+def main(counts):
+    for count in counts:
+        for name, get_kwargs in EDITS:
+            app = make_app(count)
+            changed, compacted = measure(app, get_kwargs(app.doc))
+            print("{:>8} transactions: {} change: {:.0f} bytes/txn, compacted: {:.0f} bytes/txn".format(
+                count, name, changed / count, compacted / count
+            ))
+        undo_time, redo_time = measure_undo(make_app(count))
+        print("{:>8} transactions: single change undo: {:.3f}s, redo: {:.3f}s".format(
+            count, undo_time, redo_time
+        ))
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 20000])
@@ -11,7 +11,6 @@ import logging
 import datetime
 import threading
 from collections import namedtuple
-import re
 import importlib
 
 from hscommon.notify import Broadcaster
@@ -24,6 +23,7 @@ from .model import currency
 from .model.amount import parse_amount, format_amount
 from .model.currency import Currency, USD
 from .model.date import parse_date, format_date
+from .model.search import parse_query
 from .plugin import CurrencyProviderPlugin, get_all_core_plugin_modules, get_plugins_from_mod
 
 class PreferenceNames:
@@ -294,37 +294,19 @@ class Application(Broadcaster):
         return parse_date(date, self._date_format)
 
     def parse_search_query(self, query_string):
-        """Parses ``query_string`` into something that can be used to filter transactions.
+        """Compiles ``query_string`` into something that can be used to filter transactions.
 
         :param str query_string: Search string that comes straight from the user through the search
                                  box.
-        :rtype: a dict of query arguments
+        :rtype: :class:`.Query`
         """
         # Application might not be an appropriate place for this method. self._default_currency
         # is used, but I'm not even sure that it's appropriate to use it.
-        query_string = query_string.strip().lower()
-        ALL_QUERY_TYPES = ['account', 'group', 'amount', 'description', 'checkno', 'payee', 'memo']
-        RE_TARGETED_SEARCH = re.compile(r'({}):(.*)'.format('|'.join(ALL_QUERY_TYPES)))
-        m = RE_TARGETED_SEARCH.match(query_string)
-        if m is not None:
-            qtype, qargs = m.groups()
-            qtypes = [qtype]
-        else:
-            qtypes = ALL_QUERY_TYPES
-            qargs = query_string
-        query = {}
-        for qtype in qtypes:
-            if qtype in {'account', 'group'}:
-                # account and group args are comma-splitted
-                query[qtype] = {s.strip() for s in qargs.split(',')}
-            elif qtype == 'amount':
-                try:
-                    query['amount'] = abs(parse_amount(qargs, self._default_currency, with_expression=False))
-                except ValueError:
-                    pass
-            else:
-                query[qtype] = qargs
-        return query
+        return parse_query(
+            query_string,
+            parse_amount=lambda s: parse_amount(s, self._default_currency, with_expression=False),
+            parse_date=self.parse_date,
+        )
 
     def save_custom_range(self, slot, name, start, end):
         """Save a custom date range into our preferences.
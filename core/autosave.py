@@ -0,0 +1,333 @@
+# Copyright 2016 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+import os
+import os.path as op
+from collections import OrderedDict, defaultdict, deque
+import xml.etree.cElementTree as ET
+
+from .exception import FileFormatError
+from .model.recurrence import Spawn
+from .saver.native import Writer, attribs2str, save as save_native
+
+#: Once the journal has this many checkpoints, the next autosave compacts it in a new snapshot.
+MAX_CHECKPOINTS = 20
+# The order in which top level elements come in a native document.
+TOPLEVEL_TAGS = ['properties', 'group', 'account', 'transaction', 'recurrence', 'budget']
+
+def journal_path(snapshot_path):
+    """Returns the path of the journal associated with the snapshot at ``snapshot_path``."""
+    return snapshot_path + '.journal'
+
+class AutosaveJournal:
+    """Autosaves a document incrementally.
+
+    Rather than saving the whole document at every autosave, we save a full snapshot of it once
+    (:meth:`snapshot`) and then, at each autosave, append a checkpoint to a journal next to that
+    snapshot (:meth:`checkpoint`). A checkpoint only contains the instances that changed since the
+    last checkpoint and the keys of the ones that were deleted. When the journal grows too big
+    (:meth:`must_compact`), we start over with a new snapshot. :func:`replay_journal` rebuilds the
+    document from the snapshot and its journal.
+
+    Every top level element we write has a ``key`` attribute which is how checkpoints refer to the
+    instances of the snapshot.
+
+    Accounts, groups, schedules and budgets are few, so we simply compare their serialization with
+    the one we wrote last. Transactions are too many for this, so we only look at the ones that the
+    :class:`.Undoer` tells us about through :meth:`note`.
+
+    Like the :class:`.Undoer`, we hold references to the collections of the document rather than to
+    the document itself.
+    """
+    def __init__(self, accounts, groups, transactions, schedules, budgets, properties):
+        self._accounts = accounts
+        self._groups = groups
+        self._transactions = transactions
+        self._schedules = schedules
+        self._budgets = budgets
+        self._properties = properties
+        #: Path of the snapshot we write our checkpoints for. ``None`` until :meth:`snapshot`.
+        self.snapshot_path = None
+        self._keys = {}
+        self._last_key = 0
+        # key: (instance, serialization), for everything but transactions
+        self._written = {}
+        # account: name it had when we last wrote it
+        self._written_account_names = {}
+        self._written_properties = None
+        # list of (action, undone)
+        self._pending = []
+        self._checkpoint_count = 0
+
+    # --- Private
+    def _key(self, instance):
+        key = self._keys.get(instance)
+        if key is None:
+            self._last_key += 1
+            key = self._keys[instance] = str(self._last_key)
+        return key
+
+    def _serialize(self, methodname, instance):
+        result = []
+        writer = Writer(result.append, keygetter=self._key)
+        getattr(writer, methodname)(instance)
+        return ''.join(result)
+
+    def _small_collections(self):
+        return [
+            ('group', self._groups),
+            ('account', self._accounts),
+            ('recurrence', [s for s in self._schedules if s.is_alive]),
+            ('budget', self._budgets),
+        ]
+
+    def _changed_transactions(self, pending):
+        # Returns a {transaction: is_present} dict of the transactions affected by ``pending``.
+        result = OrderedDict()
+        for action, undone in pending:
+            for txn in action.added_transactions:
+                result[txn] = not undone
+            for txn in action.deleted_transactions:
+                result[txn] = undone
+            changed = [txn for txn, old in action.changed_transactions]
+            changed += [split.transaction for split, old in action.changed_splits]
+            for txn in changed:
+                result.setdefault(txn, True)
+        for txn in list(result):
+            if isinstance(txn, Spawn):
+                del result[txn]
+        return result
+
+    # --- Public
+    def reset(self):
+        """Forgets about our current snapshot. Call this when the document is cleared."""
+        self.snapshot_path = None
+        self._keys = {}
+        self._last_key = 0
+        self._written = {}
+        self._written_account_names = {}
+        self._written_properties = None
+        self._pending = []
+        self._checkpoint_count = 0
+
+    def note(self, action, undone=False):
+        """Tells the journal that ``action`` was recorded, redone or, if ``undone``, undone."""
+        if self.snapshot_path is not None:
+            self._pending.append((action, undone))
+
+    def must_compact(self):
+        """Returns whether our next autosave should be a new snapshot rather than a checkpoint."""
+        if self.snapshot_path is None or not op.exists(self.snapshot_path):
+            return True
+        if self._checkpoint_count >= MAX_CHECKPOINTS:
+            return True
+        path = journal_path(self.snapshot_path)
+        return op.exists(path) and op.getsize(path) > op.getsize(self.snapshot_path)
+
+    def snapshot(self, path, document_id):
+        """Saves the whole document to ``path`` and starts a new journal for it."""
+        self.reset()
+        save_native(
+            path, document_id, self._properties, self._accounts, self._groups,
+            self._transactions, self._schedules, self._budgets, keygetter=self._key
+        )
+        for tag, instances in self._small_collections():
+            for instance in instances:
+                self._written[self._key(instance)] = (instance, self._serialize(tag, instance))
+        self._written_account_names = {account: account.name for account in self._accounts}
+        self._written_properties = self._serialize('properties', self._properties)
+        self.snapshot_path = path
+
+    def checkpoint(self):
+        """Appends what changed since our last checkpoint to the journal.
+
+        Returns whether there was anything to append.
+        """
+        pending, self._pending = self._pending, []
+        elements = []
+        properties = self._serialize('properties', self._properties)
+        if properties != self._written_properties:
+            elements.append(properties)
+            self._written_properties = properties
+        remaining_keys = set(self._written)
+        transactions_index = None
+        for tag, instances in self._small_collections():
+            if tag == 'recurrence':
+                # transactions have to come after accounts
+                transactions_index = len(elements)
+            for instance in instances:
+                key = self._key(instance)
+                remaining_keys.discard(key)
+                serialized = self._serialize(tag, instance)
+                if self._written.get(key, (None, None))[1] != serialized:
+                    elements.append(serialized)
+                    self._written[key] = (instance, serialized)
+        for key in remaining_keys:
+            instance, serialized = self._written.pop(key)
+            del self._keys[instance]
+            elements.append('<deleted key="%s" />' % key)
+        changed_transactions = self._changed_transactions(pending)
+        # Splits refer to accounts by name. When an account is renamed, we have to write all its
+        # transactions again. It doesn't happen often.
+        renamed = set()
+        for account in self._accounts:
+            if self._written_account_names.get(account, account.name) != account.name:
+                renamed.add(account)
+        self._written_account_names = {account: account.name for account in self._accounts}
+        if renamed:
+            for txn in self._transactions:
+                if any(split.account in renamed for split in txn.splits):
+                    changed_transactions.setdefault(txn, True)
+        transaction_elements = []
+        for txn, present in changed_transactions.items():
+            if present:
+                transaction_elements.append(self._serialize('transaction', txn))
+            else:
+                key = self._keys.pop(txn, None)
+                if key is not None:
+                    transaction_elements.append('<deleted key="%s" />' % key)
+        elements[transactions_index:transactions_index] = transaction_elements
+        if not elements:
+            return False
+        try:
+            with open(journal_path(self.snapshot_path), 'at', encoding='utf-8') as fp:
+                fp.write('<checkpoint>%s</checkpoint>\n' % ''.join(elements))
+                fp.flush()
+                os.fsync(fp.fileno())
+        except OSError:
+            # We don't know what made it to the journal. Our next autosave will be a new snapshot.
+            self.snapshot_path = None
+            raise
+        self._checkpoint_count += 1
+        return True
+
+
+def read_journal(path):
+    """Reads the journal at ``path`` and returns ``(properties, elements, deleted_keys)``.
+
+    ``properties`` is the last properties element of the journal, or ``None``. ``elements`` is an
+    ordered ``{key: element}`` dict of the last version of all elements in the journal and
+    ``deleted_keys`` is a set of the keys that were deleted.
+
+    A checkpoint that was interrupted in the middle of its writing, and everything that follows, is
+    ignored.
+    """
+    properties = None
+    elements = OrderedDict()
+    deleted_keys = set()
+    if not op.exists(path):
+        return properties, elements, deleted_keys
+    with open(path, 'rt', encoding='utf-8') as fp:
+        for line in fp:
+            try:
+                checkpoint = ET.fromstring(line)
+            except ET.ParseError:
+                break
+            for element in checkpoint:
+                key = element.get('key')
+                if element.tag == 'properties':
+                    properties = element
+                elif element.tag == 'deleted':
+                    elements.pop(key, None)
+                    deleted_keys.add(key)
+                else:
+                    elements[key] = element
+    return properties, elements, deleted_keys
+
+def _transaction_order(element):
+    # The loader gives positions to transactions of the same date in the order they're written, so
+    # we have to write them in (date, position) order. Snapshots from before we wrote positions sort
+    # their transactions before those of the journal.
+    return (element.get('date'), int(element.get('position', 0)))
+
+def _write_replayed(write, snapshot_path, properties, changed, deleted_keys):
+    new_elements = defaultdict(list)
+    for key, element in changed.items():
+        new_elements[element.tag].append(element)
+    # Snapshot transactions are in (date, position) order. Those of the journal, changed or new, are
+    # merged with them in that order.
+    journal_transactions = deque(sorted(new_elements.pop('transaction', []), key=_transaction_order))
+    snapshot_keys = set()
+    written_index = 0
+    properties_written = False
+
+    def write_element(element):
+        element.tail = None
+        write(ET.tostring(element, encoding='unicode'))
+
+    def write_properties(element):
+        nonlocal properties_written
+        if not properties_written:
+            write_element(properties if properties is not None else element)
+            properties_written = True
+
+    def write_journal_transactions(until=None):
+        while journal_transactions and (until is None or _transaction_order(journal_transactions[0]) < until):
+            write_element(journal_transactions.popleft())
+
+    def write_new_elements(until_index):
+        # Elements of the snapshot come ordered by tag. When we get to a tag, we're done with the
+        # previous ones and can write their new elements.
+        nonlocal written_index
+        for tag in TOPLEVEL_TAGS[written_index:until_index]:
+            if tag == 'properties' and properties is not None:
+                write_properties(properties)
+            if tag == 'transaction':
+                write_journal_transactions()
+            for element in new_elements[tag]:
+                if element.get('key') not in snapshot_keys:
+                    write_element(element)
+        written_index = max(written_index, until_index)
+
+    events = ET.iterparse(snapshot_path, events=('start', 'end'))
+    event, root = next(events)
+    write('<?xml version="1.0" encoding="utf-8"?>\n')
+    write('<moneyguru-file%s>' % attribs2str(root.attrib))
+    depth = 1
+    for event, element in events:
+        if event == 'start':
+            depth += 1
+            continue
+        depth -= 1
+        if depth != 1:
+            continue
+        tag = element.tag
+        if tag in TOPLEVEL_TAGS:
+            write_new_elements(TOPLEVEL_TAGS.index(tag))
+        key = element.get('key')
+        snapshot_keys.add(key)
+        if tag == 'properties':
+            write_properties(element)
+        elif key in deleted_keys:
+            pass
+        elif tag == 'transaction':
+            if key not in changed:
+                write_journal_transactions(until=_transaction_order(element))
+                write_element(element)
+        elif key in changed:
+            write_element(changed[key])
+        else:
+            write_element(element)
+        del root[:]
+    write_new_elements(len(TOPLEVEL_TAGS))
+    write('</moneyguru-file>')
+
+def replay_journal(snapshot_path, dest_path):
+    """Writes, in ``dest_path``, the document in ``snapshot_path`` with its journal applied to it.
+
+    The result is a regular moneyGuru document. We stream through the snapshot, replacing or
+    removing the elements that changed in the journal. Elements that were added in the journal come
+    after the snapshot elements with the same tag, except for transactions, which are all written in
+    (date, position) order.
+
+    Raises :exc:`.FileFormatError` if the snapshot can't be read.
+    """
+    properties, changed, deleted_keys = read_journal(journal_path(snapshot_path))
+    try:
+        with open(dest_path, 'wt', encoding='utf-8') as fp:
+            _write_replayed(fp.write, snapshot_path, properties, changed, deleted_keys)
+    except (SyntaxError, StopIteration):
+        raise FileFormatError()
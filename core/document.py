@@ -5,21 +5,25 @@
 # http://www.gnu.org/licenses/gpl-3.0.html
 
 import datetime
+import tempfile
 import time
 import uuid
 import logging
 import os
 import os.path as op
+from contextlib import contextmanager
 from functools import wraps
 
+from hscommon.jobprogress.job import nulljob
 from hscommon.notify import Repeater
 from hscommon.util import nonone, allsame, dedupe, extract, first
 from hscommon.trans import tr
 from hscommon.gui.base import GUIObject
 
+from .autosave import AutosaveJournal, journal_path, replay_journal
 from .const import NOEDIT, DATE_FORMAT_FOR_PREFERENCES
 from .exception import FileFormatError, OperationAborted
-from .loader import native
+from .loader import native, cache
 from .model.account import Account, Group, AccountList, GroupList, AccountType
 from .model.amount import parse_amount, format_amount
 from .model.currency import Currency
@@ -32,6 +36,7 @@ from .model.oven import Oven
 from .model.recurrence import Spawn
 from .model.transaction_list import TransactionList
 from .model.undo import Undoer, Action
+from .saver.cache import save as save_cache
 from .saver.native import save as save_native
 
 SELECTED_DATE_RANGE_PREFERENCE = 'SelectedDateRange'
@@ -71,6 +76,13 @@ class ScheduleScope:
 
 AUTOSAVE_BUFFER_COUNT = 10 # Number of autosave files that will be kept in the cache.
 
+def affected_accounts(transactions):
+    """Returns the set of all accounts affected by ``transactions``."""
+    result = set()
+    for txn in transactions:
+        result |= txn.affected_accounts()
+    return result
+
 def handle_abort(method):
     @wraps(method)
     def wrapper(self, *args, **kwargs):
@@ -81,6 +93,32 @@ def handle_abort(method):
 
     return wrapper
 
+class _Batch:
+    # What a Document.batch() session has deferred to its end.
+    def __init__(self):
+        # Earliest date to cook from, or None if nothing has to be cooked.
+        self.cook_from = None
+        # Accounts to cook, or None for all of them.
+        self.cook_accounts = set()
+        # Accounts that must not be removed if empty, or None if there's no cleaning to do.
+        self.kept_accounts = None
+        self.date_range_will_change_sent = False
+
+    def add_cook(self, from_date, accounts):
+        if from_date is None:
+            from_date = datetime.date.min
+        self.cook_from = from_date if self.cook_from is None else min(self.cook_from, from_date)
+        if accounts is None or self.cook_accounts is None:
+            self.cook_accounts = None
+        else:
+            self.cook_accounts |= set(accounts)
+
+    def add_cleaning(self, kept_accounts):
+        if self.kept_accounts is None:
+            self.kept_accounts = set()
+        self.kept_accounts |= set(kept_accounts)
+
+
 class BaseDocument:
     """Provides a common base for :class:`Document` and :class:`ImportDocument`.
 
@@ -121,7 +159,7 @@ class BaseDocument:
         for txn in transactions:
             self.transactions.add(txn)
         min_date = min(t.date for t in transactions)
-        self._cook(from_date=min_date)
+        self._cook(from_date=min_date, accounts=affected_accounts(transactions))
 
     def _change_transaction(
             self, transaction, date=NOEDIT, description=NOEDIT, payee=NOEDIT,
@@ -132,6 +170,7 @@ class BaseDocument:
             date=date, description=description, payee=payee, checkno=checkno,
             from_=from_, to=to, amount=amount, currency=currency, notes=notes
         )
+        self.transactions.reindex(transaction)
         # XXX This Spawn-related code piece doesn't belong in `BaseDocument`, but in the middle of
         # a big refactoring, there wasn't an easy way to extract it out to `Document` without
         # needlessly complexifying the code. Some day, we'll have to find an elegant solution to
@@ -149,11 +188,10 @@ class BaseDocument:
                 self.transactions.add(transaction)
             elif date_changed:
                 self.transactions.move_last(transaction)
-        self.transactions.clear_cache()
 
-    def _clean_empty_categories(self, from_account=None):
+    def _clean_empty_categories(self, kept_accounts=()):
         for account in list(self.accounts.auto_created):
-            if account is from_account:
+            if account in kept_accounts:
                 continue
             if not account.entries:
                 self.accounts.remove(account)
@@ -163,9 +201,9 @@ class BaseDocument:
         self.transactions.clear()
         self._cook()
 
-    def _cook(self, from_date=None):
+    def _cook(self, from_date=None, accounts=None):
         # Without date ranges and spawns, it's OK to pass `None` as an `until_date`.
-        self.oven.cook(from_date=from_date, until_date=None)
+        self.oven.cook(from_date=from_date, until_date=None, accounts=accounts)
 
     # --- Public
     def change_transaction(self, original, new, global_scope=False):
@@ -190,6 +228,7 @@ class BaseDocument:
         """
         # don't forget that account up here is an external instance. Even if an account of
         # the same name exists in self.accounts, it's not gonna be the same instance.
+        accounts = original.affected_accounts()
         for split in new.splits:
             if split.account is not None:
                 split.account = self.accounts.find(split.account.name, split.account.type)
@@ -199,7 +238,8 @@ class BaseDocument:
             original, date=new.date, description=new.description,
             payee=new.payee, checkno=new.checkno, notes=new.notes, global_scope=global_scope
         )
-        self._cook(from_date=min_date)
+        accounts |= original.affected_accounts()
+        self._cook(from_date=min_date, accounts=accounts)
         self._clean_empty_categories()
 
     def change_transactions(
@@ -237,13 +277,15 @@ class BaseDocument:
             Currency.get_rates_db().ensure_rates(date, currencies_to_ensure)
 
         min_date = date if date is not NOEDIT else datetime.date.max
+        accounts = affected_accounts(transactions)
         for transaction in transactions:
             min_date = min(min_date, transaction.date)
             self._change_transaction(
                 transaction, date=date, description=description, payee=payee, checkno=checkno,
                 from_=from_, to=to, amount=amount, currency=currency, global_scope=global_scope
             )
-        self._cook(from_date=min_date)
+        accounts |= affected_accounts(transactions)
+        self._cook(from_date=min_date, accounts=accounts)
         self._clean_empty_categories()
 
     def delete_transactions(self, transactions, from_account=None, global_scope=False):
@@ -272,8 +314,8 @@ class BaseDocument:
             else:
                 self.transactions.remove(txn)
         min_date = min(t.date for t in transactions)
-        self._cook(from_date=min_date)
-        self._clean_empty_categories(from_account=from_account)
+        self._cook(from_date=min_date, accounts=affected_accounts(transactions))
+        self._clean_empty_categories(kept_accounts={from_account})
 
     def duplicate_transactions(self, transactions):
         """Create copies of ``transactions`` in the document.
@@ -332,6 +374,7 @@ class BaseDocument:
             Currency.get_rates_db().ensure_rates(date, [amount.currency.code, entry.account.currency.code])
         candidate_dates = [entry.date, date, reconciliation_date, entry.reconciliation_date]
         min_date = min(d for d in candidate_dates if d is not NOEDIT and d is not None)
+        accounts = entry.transaction.affected_accounts()
         if reconciliation_date is not NOEDIT:
             entry.split.reconciliation_date = reconciliation_date
         if (amount is not NOEDIT) and (len(entry.splits) == 1):
@@ -344,7 +387,8 @@ class BaseDocument:
             entry.transaction, date=date, description=description,
             payee=payee, checkno=checkno, global_scope=global_scope
         )
-        self._cook(from_date=min_date)
+        accounts |= entry.transaction.affected_accounts()
+        self._cook(from_date=min_date, accounts=accounts)
         self._clean_empty_categories()
 
     def delete_entries(self, entries):
@@ -375,6 +419,41 @@ class BaseDocument:
             default_currency = self.default_currency
         return parse_amount(amount, default_currency, auto_decimal_place=self.app._auto_decimal_place)
 
+    def transaction_matcher(self, query, date_range=None):
+        """Returns a function telling whether a transaction matches ``query``.
+
+        The function gives the same answer as :meth:`.Query.matches`, but the transactions of the
+        document are matched all at once through the indexes of our :class:`.TransactionList`.
+        Call it again when transactions change.
+
+        :param query: a :class:`.Query`, as returned by :meth:`.Application.parse_search_query`
+        :param date_range: :class:`.DateRange`. If set, only transactions in it are matched at
+                           once. The others are checked one by one.
+        :rtype: a function taking a :class:`.Transaction` and returning a ``bool``
+        """
+        transactions = self.transactions
+        matching = query.transactions(transactions, date_range)
+
+        def matcher(transaction):
+            if transaction in transactions and (date_range is None or transaction.date in date_range):
+                return transaction in matching
+            # Schedule and budget spawns aren't in our transaction list
+            return query.matches(transaction)
+
+        return matcher
+
+    def transactions_for_account(self, account):
+        """Returns a set of all transactions with a split assigned to ``account``.
+
+        Unlike ``account.entries``, the result doesn't include spawns and doesn't depend on
+        cooking. We keep an index of transactions by account, so this doesn't go through all
+        transactions.
+
+        :param account: :class:`.Account`
+        :rtype: set of :class:`.Transaction`
+        """
+        return self.transactions.transactions_for_account(account)
+
     def is_amount_native(self, amount):
         if amount == 0:
             return True
@@ -421,12 +500,27 @@ class Document(BaseDocument, Repeater, GUIObject):
         self.excluded_accounts = set()
         #: :class:`.GroupList` containing all account groups of the document.
         self.groups = GroupList()
-        self._undoer = Undoer(self.accounts, self.groups, self.transactions, self.schedules, self.budgets)
+        self._journal = AutosaveJournal(
+            self.accounts, self.groups, self.transactions, self.schedules, self.budgets,
+            self._properties
+        )
+        self._undoer = Undoer(
+            self.accounts, self.groups, self.transactions, self.schedules, self.budgets,
+            journal=self._journal
+        )
         self._date_range = YearRange(datetime.date.today())
         self._filter_string = ''
         self._filter_type = None
+        # Incremented on each notification, which follows every change to the document.
+        self._revision = 0
+        # (filter_string, query) and ((filter_string, date_range, revision), matcher) of the last
+        # filter_matcher()
+        self._filter_query = None
+        self._filter_matcher = None
         self._document_id = None
         self._dirty_flag = False
+        # _Batch of the current batch() session, if any.
+        self._batch = None
         self._restore_preferences()
 
     # --- Private
@@ -450,16 +544,35 @@ class Document(BaseDocument, Repeater, GUIObject):
         # exactly as the user is commiting a change. In these cases, the autosaved file might be a
         # save of the data in a quite weird state. I think this risk is acceptable. The alternative
         # is to put locks everywhere, which would complexify the application.
-        existing_names = [name for name in os.listdir(self.app.cache_path) if name.startswith('autosave')]
+        # Most of the time, we only append the latest changes to the journal of our last autosave.
+        # Every once in a while, we write a new full snapshot of the document.
+        if not self._journal.must_compact():
+            self._journal.checkpoint()
+            return
+        existing_names = [
+            name for name in os.listdir(self.app.cache_path)
+            if name.startswith('autosave') and name.endswith('.moneyguru')
+        ]
         existing_names.sort()
         timestamp = int(time.time())
         autosave_name = 'autosave{0}.moneyguru'.format(timestamp)
         while autosave_name in existing_names:
             timestamp += 1
             autosave_name = 'autosave{0}.moneyguru'.format(timestamp)
-        self.save_to_xml(op.join(self.app.cache_path, autosave_name), autosave=True)
+        if self._document_id is None:
+            self._document_id = uuid.uuid4().hex
+        self._journal.snapshot(op.join(self.app.cache_path, autosave_name), self._document_id)
         if len(existing_names) >= AUTOSAVE_BUFFER_COUNT:
-            os.remove(op.join(self.app.cache_path, existing_names[0]))
+            oldest_path = op.join(self.app.cache_path, existing_names[0])
+            os.remove(oldest_path)
+            if op.exists(journal_path(oldest_path)):
+                os.remove(journal_path(oldest_path))
+
+    def _cache_path(self, document_id):
+        # Path of the binary cache of the document with ``document_id``. See core.saver.cache.
+        if not self.app.cache_path or not document_id:
+            return None
+        return op.join(self.app.cache_path, 'documents', '{0}.cache'.format(document_id))
 
     def _clear(self):
         self._document_id = None
@@ -467,11 +580,21 @@ class Document(BaseDocument, Repeater, GUIObject):
         del self.schedules[:]
         del self.budgets[:]
         self._undoer.clear()
+        self._journal.reset()
         self._dirty_flag = False
         BaseDocument._clear(self)
 
-    def _cook(self, from_date=None):
-        self.oven.cook(from_date=from_date, until_date=self.date_range.end)
+    def _clean_empty_categories(self, kept_accounts=()):
+        if self._batch is not None:
+            self._batch.add_cleaning(kept_accounts)
+        else:
+            BaseDocument._clean_empty_categories(self, kept_accounts=kept_accounts)
+
+    def _cook(self, from_date=None, accounts=None):
+        if self._batch is not None:
+            self._batch.add_cook(from_date, accounts)
+        else:
+            self.oven.cook(from_date=from_date, until_date=self.date_range.end, accounts=accounts)
 
     def _get_action_from_changed_transactions(self, transactions, global_scope=False):
         if len(transactions) == 1 and not isinstance(transactions[0], Spawn) \
@@ -487,6 +610,56 @@ class Document(BaseDocument, Repeater, GUIObject):
                 action.change_schedule(schedule)
         return action
 
+    def _load_cache(self, filename, document_id, job):
+        # Returns a loaded cache.Loader if we have a valid cache for ``filename``, None otherwise.
+        cache_path = self._cache_path(document_id)
+        if cache_path is None or not op.exists(cache_path):
+            return None
+        loader = cache.Loader(self.default_currency, filename)
+        try:
+            loader.parse(cache_path)
+            loader.load(job=job)
+        except FileFormatError:
+            logging.info("Cache of %s is stale or invalid, loading from XML", filename)
+            return None
+        return loader
+
+    def _load_native(self, filename, job, use_cache=True):
+        loader = native.Loader(self.default_currency)
+        try:
+            loader.parse(filename)
+        except FileFormatError:
+            raise FileFormatError(tr('"%s" is not a moneyGuru file') % filename)
+        cache_loader = self._load_cache(filename, loader.document_id, job) if use_cache else None
+        if cache_loader is not None:
+            loader.close()
+            loader = cache_loader
+        else:
+            loader.load(job=job)
+        self._clear()
+        self._document_id = loader.document_id
+        for propname in self._properties:
+            if propname in loader.properties:
+                self._properties[propname] = loader.properties[propname]
+        for group in loader.groups:
+            self.groups.append(group)
+        for account in loader.accounts:
+            self.accounts.add(account)
+        for transaction in loader.transactions:
+            self.transactions.add(transaction, position=transaction.position)
+        for recurrence in loader.schedules:
+            self.schedules.append(recurrence)
+        for budget in loader.budgets:
+            self.budgets.append(budget)
+        self.accounts.default_currency = self.default_currency
+        self._cook()
+        self._restore_preferences_after_load()
+        self.notify('document_changed')
+        self._undoer.set_save_point()
+        self._refresh_date_range()
+        if use_cache and cache_loader is None:
+            self._save_cache(filename)
+
     def _query_for_scope_if_needed(self, transactions):
         """Queries the UI for change scope if there's any Spawn among transactions.
 
@@ -559,6 +732,19 @@ class Document(BaseDocument, Repeater, GUIObject):
             self.select_all_transactions_range()
         self.notify('document_restoring_preferences')
 
+    def _save_cache(self, filename):
+        cache_path = self._cache_path(self._document_id)
+        if cache_path is None:
+            return
+        try:
+            save_cache(
+                cache_path, filename, self._document_id, self._properties, self.accounts,
+                self.groups, self.transactions, self.schedules, self.budgets
+            )
+        except OSError:
+            # The cache is only an optimization, we can live without it.
+            logging.warning("Could not write cache of %s", filename)
+
     def _save_preferences(self):
         dr = self.date_range
         selected_range = DATE_RANGE_MONTH
@@ -582,6 +768,18 @@ class Document(BaseDocument, Repeater, GUIObject):
         excluded_account_names = [a.name for a in self.excluded_accounts]
         self.set_default(EXCLUDED_ACCOUNTS_PREFERENCE, excluded_account_names)
 
+    # --- Overrides
+    def notify(self, msg):
+        self._revision += 1
+        if msg == 'date_range_will_change' and self._batch is not None:
+            # Listeners remember the state they're in before the date range changes. They have to
+            # know before the change, not at the end of the batch.
+            if not self._batch.date_range_will_change_sent:
+                self._batch.date_range_will_change_sent = True
+                Repeater.notify_now(self, msg)
+            return
+        Repeater.notify(self, msg)
+
     # --- Account
     def change_accounts(
             self, accounts, name=NOEDIT, type=NOEDIT, currency=NOEDIT, group=NOEDIT,
@@ -615,7 +813,7 @@ class Document(BaseDocument, Repeater, GUIObject):
             if group is not NOEDIT:
                 account.group = group
             if account_number is not NOEDIT:
-                account.account_number = account_number
+                self.accounts.set_account_number(account, account_number)
             if inactive is not NOEDIT:
                 account.inactive = inactive
             if notes is not NOEDIT:
@@ -636,7 +834,10 @@ class Document(BaseDocument, Repeater, GUIObject):
         """
         action = Action(tr('Remove account'))
         accounts = set(accounts)
-        action.delete_accounts(accounts, reassign=reassign_to is not None)
+        transactions = set()
+        for account in accounts:
+            transactions |= self.transactions_for_account(account)
+        action.delete_accounts(accounts, transactions, reassign=reassign_to is not None)
         affected_schedules = [s for s in self.schedules if accounts & s.affected_accounts()]
         for schedule in affected_schedules:
             action.change_schedule(schedule)
@@ -966,7 +1167,7 @@ class Document(BaseDocument, Repeater, GUIObject):
         else:
             for split in splits:
                 split.reconciliation_date = None
-        self._cook(from_date=min_date)
+        self._cook(from_date=min_date, accounts=affected_accounts(e.transaction for e in entries))
         self.notify('transaction_changed')
 
     # --- Budget
@@ -1033,7 +1234,8 @@ class Document(BaseDocument, Repeater, GUIObject):
         original.reset_spawn_cache()
         if original not in self.budgets:
             self.budgets.append(original)
-        self._cook(from_date=min_date)
+        # Accounts affected by budget changes are found by the oven through spawn changes.
+        self._cook(from_date=min_date, accounts=set())
         self.notify('budget_changed')
 
     def delete_budgets(self, budgets):
@@ -1049,7 +1251,7 @@ class Document(BaseDocument, Repeater, GUIObject):
         for budget in budgets:
             self.budgets.remove(budget)
         min_date = min(b.start_date for b in budgets)
-        self._cook(from_date=min_date)
+        self._cook(from_date=min_date, accounts=set())
         self.notify('budget_deleted')
 
     # --- Schedule
@@ -1088,7 +1290,8 @@ class Document(BaseDocument, Repeater, GUIObject):
         schedule.reset_spawn_cache()
         if schedule not in self.schedules:
             self.schedules.append(schedule)
-        self._cook(from_date=min_date)
+        # Accounts affected by schedule changes are found by the oven through spawn changes.
+        self._cook(from_date=min_date, accounts=set())
         self.notify('schedule_changed')
 
     def delete_schedules(self, schedules):
@@ -1104,7 +1307,7 @@ class Document(BaseDocument, Repeater, GUIObject):
         for schedule in schedules:
             self.schedules.remove(schedule)
         min_date = min(s.ref.date for s in schedules)
-        self._cook(from_date=min_date)
+        self._cook(from_date=min_date, accounts=set())
         self.notify('schedule_deleted')
 
     # --- Load / Save / Import
@@ -1132,6 +1335,7 @@ class Document(BaseDocument, Repeater, GUIObject):
             for split in txn.splits:
                 if split.reconciliation_date is not None:
                     split.reconciliation_date = txn.date
+        self.transactions.clear_cache()
         for schedule in self.schedules:
             date2exception = schedule.date2exception
             schedule.start_date = inc_month_overflow(schedule.start_date, month_diff)
@@ -1155,40 +1359,31 @@ class Document(BaseDocument, Repeater, GUIObject):
         self._clear()
         self.notify('document_changed')
 
-    def load_from_xml(self, filename):
+    def load_from_xml(self, filename, job=nulljob):
         """Clears the document and loads data from ``filename``.
 
-        ``filename`` must be a path to a moneyGuru XML document.
+        ``filename`` must be a path to a moneyGuru XML document. If it's an autosave snapshot
+        with a journal, we load the snapshot with its journal replayed on top of it.
+
+        If we have a cache (see :mod:`core.saver.cache`) for that document and it's still valid, we
+        load the cache instead of the XML. If we don't, we write one after the load.
 
         :param filename: ``str``
+        :param job: :class:`hscommon.jobprogress.job.Job` reporting the loading progress.
         """
-        loader = native.Loader(self.default_currency)
-        try:
-            loader.parse(filename)
-        except FileFormatError:
-            raise FileFormatError(tr('"%s" is not a moneyGuru file') % filename)
-        loader.load()
-        self._clear()
-        self._document_id = loader.document_id
-        for propname in self._properties:
-            if propname in loader.properties:
-                self._properties[propname] = loader.properties[propname]
-        for group in loader.groups:
-            self.groups.append(group)
-        for account in loader.accounts:
-            self.accounts.add(account)
-        for transaction in loader.transactions:
-            self.transactions.add(transaction, position=transaction.position)
-        for recurrence in loader.schedules:
-            self.schedules.append(recurrence)
-        for budget in loader.budgets:
-            self.budgets.append(budget)
-        self.accounts.default_currency = self.default_currency
-        self._cook()
-        self._restore_preferences_after_load()
-        self.notify('document_changed')
-        self._undoer.set_save_point()
-        self._refresh_date_range()
+        if op.exists(journal_path(filename)):
+            fd, replayed_path = tempfile.mkstemp(suffix='.moneyguru')
+            os.close(fd)
+            try:
+                try:
+                    replay_journal(filename, replayed_path)
+                except FileFormatError:
+                    raise FileFormatError(tr('"%s" is not a moneyGuru file') % filename)
+                self._load_native(replayed_path, job, use_cache=False)
+            finally:
+                os.remove(replayed_path)
+        else:
+            self._load_native(filename, job)
 
     def save_to_xml(self, filename, autosave=False):
         """Saves the document to ``filename``.
@@ -1215,6 +1410,7 @@ class Document(BaseDocument, Repeater, GUIObject):
         if not autosave:
             self._undoer.set_save_point()
             self._dirty_flag = False
+            self._save_cache(filename)
 
     def import_entries(self, target_account, ref_account, matches):
         """Imports entries in ``mathes`` into ``target_account``.
@@ -1271,12 +1467,14 @@ class Document(BaseDocument, Repeater, GUIObject):
             self.accounts.add(account)
         if target_account is not ref_account and ref_account.reference is not None:
             target_account.reference = ref_account.reference
+            self.accounts.reindex(target_account)
         for entry, ref in matches:
             if ref is not None:
                 ref.transaction.date = entry.date
                 ref.split.amount = entry.split.amount
                 ref.transaction.balance(strong_split=ref.split, keep_two_splits=True)
                 ref.split.reference = entry.split.reference
+                self.transactions.reindex(ref.transaction)
             else:
                 if entry.transaction not in self.transactions:
                     self.transactions.add(entry.transaction)
@@ -1393,8 +1591,8 @@ class Document(BaseDocument, Repeater, GUIObject):
     def undo(self):
         """Undo the last undoable action."""
         self.stop_edition()
-        self._undoer.undo()
-        self._cook()
+        action = self._undoer.undo()
+        self._cook(from_date=action.min_date, accounts=action.affected_accounts)
         self.notify('performed_undo_or_redo')
 
     def can_redo(self):
@@ -1408,11 +1606,43 @@ class Document(BaseDocument, Repeater, GUIObject):
     def redo(self):
         """Redo the last redoable action."""
         self.stop_edition()
-        self._undoer.redo()
-        self._cook()
+        action = self._undoer.redo()
+        self._cook(from_date=action.min_date, accounts=action.affected_accounts)
         self.notify('performed_undo_or_redo')
 
     # --- Misc
+    @contextmanager
+    def batch(self, description=None):
+        """Context manager making the changes in its ``with`` block a single edit.
+
+        Changes made through the document's public methods in the block are recorded as a single
+        undo action. Cooking, the removal of empty auto-created accounts and notifications are
+        deferred to the end of the block, where we cook once, from the earliest affected date, and
+        send each notification once (see :meth:`hscommon.notify.Broadcaster.coalescing`).
+
+        Because of this, entries and balances aren't up to date during the block. Don't undo or
+        redo in it. Nested batches are part of the outermost one.
+
+        :param str description: Description of the undo action. If ``None``, the description of the
+                                first change is used.
+        """
+        if self._batch is not None:
+            yield
+            return
+        self._batch = batch = _Batch()
+        self._undoer.begin_batch()
+        self.begin_coalescing()
+        try:
+            yield
+        finally:
+            self._batch = None
+            self._undoer.end_batch(description)
+            if batch.cook_from is not None:
+                self._cook(from_date=batch.cook_from, accounts=batch.cook_accounts)
+            if batch.kept_accounts is not None:
+                self._clean_empty_categories(kept_accounts=batch.kept_accounts)
+            self.end_coalescing()
+
     def close(self):
         """Cleanup the document and close it.
 
@@ -1422,12 +1652,54 @@ class Document(BaseDocument, Repeater, GUIObject):
         self._save_preferences()
         self.notify('document_will_close')
 
+    def account_revision(self, account, date_range=None):
+        """Returns the revision of ``account``'s entries.
+
+        It goes up every time they're re-cooked. If ``date_range`` is set, only changes affecting
+        amounts in it (that is, changes at or before its end) count.
+
+        :param account: :class:`.Account`
+        :param date_range: :class:`.DateRange`
+        :rtype: int
+        """
+        return self.oven.revision(account, date_range.end if date_range is not None else None)
+
+    def date_range_revision(self, date_range=None):
+        """Returns the revision of our cooked data, as far as ``date_range`` is concerned.
+
+        It goes up every time we cook something affecting amounts in ``date_range`` (that is,
+        at or before its end), whatever the account.
+
+        :param date_range: :class:`.DateRange`. Defaults to :attr:`date_range`.
+        :rtype: int
+        """
+        if date_range is None:
+            date_range = self.date_range
+        return self.oven.revision(until_date=date_range.end)
+
     def stop_edition(self):
         """Call this when some operation (such as a panel loading) requires the other GUIs to save
         their edits and stop edition.
         """
         self.notify('edition_must_stop')
 
+    def filter_matcher(self):
+        """Returns a function telling whether a transaction matches :attr:`filter_string`.
+
+        The filter string is compiled once, and the matcher is shared by all views until the
+        document or the date range changes. Only transactions in :attr:`date_range`, which are the
+        only ones views filter, are matched in advance. See :meth:`transaction_matcher`.
+
+        :rtype: a function taking a :class:`.Transaction` and returning a ``bool``
+        """
+        key = (self._filter_string, self.date_range, self._revision)
+        if self._filter_matcher is None or self._filter_matcher[0] != key:
+            if self._filter_query is None or self._filter_query[0] != self._filter_string:
+                self._filter_query = (self._filter_string, self.app.parse_search_query(self._filter_string))
+            matcher = self.transaction_matcher(self._filter_query[1], self.date_range)
+            self._filter_matcher = (key, matcher)
+        return self._filter_matcher[1]
+
     def can_restore_from_prefs(self):
         """Returns whether the document has preferences to restore from.
 
@@ -1532,6 +1804,15 @@ class Document(BaseDocument, Repeater, GUIObject):
         self.accounts.default_currency = value
         self.notify('document_changed')
 
+    @property
+    def revision(self):
+        """Revision of the document as a whole.
+
+        It goes up with every notification, which follows every change to the document. See also
+        :meth:`account_revision` and :meth:`date_range_revision`.
+        """
+        return self._revision
+
     # --- Events
     def must_autosave(self):
         # this is called async
@@ -1586,6 +1867,6 @@ class ImportDocument(BaseDocument):
         self.cook_flag = True
         self.oven.cook(from_date=None, until_date=None)
 
-    def _cook(self, from_date=None):
+    def _cook(self, from_date=None, accounts=None):
         pass
 
@@ -22,6 +22,13 @@ class AccountBalanceGraph(BalanceGraph):
         entry = self._account.entries.last_entry(date=date)
         return entry.normal_balance() if entry else 0
 
+    def _balance_changes(self, date_range):
+        if self._account is None:
+            return []
+        normalize = self._account.normalize_amount
+        changes = self._account.entries.balance_changes(date_range)
+        return ((date, normalize(balance)) for date, balance in changes)
+
     def _budget_for_date(self, date):
         date_range = DateRange(date.min, date)
         return self.document.budgeted_amount_for_target(
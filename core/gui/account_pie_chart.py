@@ -69,7 +69,10 @@ class BalancePieChart(_AccountPieChart):
         currency = self.document.default_currency
 
         def get_value(account):
-            balance = account.entries.normal_balance(date=date, currency=currency)
+            balance = self._memo.get(
+                account, lambda: account.entries.normal_balance(date=date, currency=currency),
+                accounts=[account]
+            )
             budget_date_range = DateRange(date.min, self.document.date_range.end)
             budgeted = self.document.budgeted_amount_for_target(account, budget_date_range)
             budgeted = convert_amount(budgeted, currency, date)
@@ -93,7 +96,10 @@ class CashFlowPieChart(_AccountPieChart):
         currency = self.document.default_currency
 
         def get_value(account):
-            cash_flow = account.entries.normal_cash_flow(date_range, currency=currency)
+            cash_flow = self._memo.get(
+                account, lambda: account.entries.normal_cash_flow(date_range, currency=currency),
+                accounts=[account]
+            )
             budgeted = self.document.budgets.normal_amount_for_account(account, date_range, currency=currency)
             return cash_flow + budgeted
 
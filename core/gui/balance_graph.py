@@ -27,15 +27,44 @@ class BalanceGraph(Graph):
     def _balance_for_date(self, date):
         return 0
 
+    def _balance_changes(self, date_range):
+        # Returns an iterable of (date, balance) for each date of date_range where the balance
+        # might change, in order. The balance stays the same between those dates. Returning None
+        # means that we can't tell, in which case we compute the balance of every day in the range.
+        return None
+
     def _budget_for_date(self, date):
         return 0
 
+    # --- Private
+    def _iter_balances(self, date_range, start_balance):
+        # Yields (date, balance) for every date that might be a point in our graph. Today and the
+        # end of the date range always are.
+        changes = self._balance_changes(date_range)
+        if changes is None:
+            for date_point in date_range:
+                yield date_point, self._balance_for_date(date_point)
+            return
+        fixed_points = sorted(d for d in {date.today(), date_range.end} if d in date_range)
+        balance = start_balance
+        for date_point, new_balance in changes:
+            while fixed_points and fixed_points[0] < date_point:
+                yield fixed_points.pop(0), balance
+            if fixed_points and fixed_points[0] == date_point:
+                fixed_points.pop(0)
+            balance = new_balance
+            yield date_point, balance
+        for date_point in fixed_points:
+            yield date_point, balance
+
     # --- Override
     # Computation Notes: When the balance in the graph changes, we have to create a flat line until
     # one day prior to the change. However, when budgets are involved, the line is *not* flattened.
     # To save some calculations (in a year range, those take a lot of time if they're made every day),
     # rather than calculating the budget every day, they are only calculated when the balance without
     # budget changes. this is what the algorithm below reflects.
+    # We don't look at every day of the range either. When subclasses can tell us when their
+    # balance changes (through _balance_changes()), we only look at those dates.
     def compute_data(self):
         date_range = self.document.date_range
         TODAY = date.today()
@@ -43,8 +72,7 @@ class BalanceGraph(Graph):
         last_balance = self._balance_for_date(date_range.start - ONE_DAY)
         if last_balance:
             date2value[date_range.start] = last_balance
-        for date_point in date_range:
-            balance = self._balance_for_date(date_point)
+        for date_point, balance in self._iter_balances(date_range, last_balance):
             if (balance != last_balance) or (date_point == TODAY) or (date_point == date_range.end):
                 if date2value and last_balance != balance:
                     # create a "step"
@@ -34,10 +34,18 @@ class BalanceSheet(Report):
         start_date = date_range.start
         end_date = date_range.end
         currency = self.document.default_currency
-        start_amount = account.entries.normal_balance(start_date - timedelta(1))
-        start_amount_native = account.entries.normal_balance(start_date - timedelta(1), currency=currency)
-        end_amount = account.entries.normal_balance(end_date)
-        end_amount_native = account.entries.normal_balance(end_date, currency=currency)
+
+        def compute_balances():
+            return (
+                account.entries.normal_balance(start_date - timedelta(1)),
+                account.entries.normal_balance(start_date - timedelta(1), currency=currency),
+                account.entries.normal_balance(end_date),
+                account.entries.normal_balance(end_date, currency=currency),
+            )
+
+        start_amount, start_amount_native, end_amount, end_amount_native = self._memo.get(
+            account, compute_balances, accounts=[account]
+        )
         budget_date_range = DateRange(date.today(), end_date)
         budgeted_amount = self.document.budgeted_amount_for_target(account, budget_date_range)
         budgeted_amount_native = convert_amount(budgeted_amount, currency, date_range.end)
@@ -56,6 +56,10 @@ class BarGraph(Graph):
         return 0
     
     # --- Override
+    def _data_memo_name(self):
+        # Weekly bars depend on the first weekday
+        return ('data', self.document.first_weekday)
+
     def compute_data(self):
         TODAY = date.today()
         self._data = []
@@ -7,6 +7,7 @@
 # http://www.gnu.org/licenses/gpl-3.0.html
 
 from .base import ViewChild, MESSAGES_DOCUMENT_CHANGED
+from .memo import Memo
 
 class ChartView:
     """Expected interface for :class:`Chart`'s view.
@@ -105,6 +106,8 @@ class Chart(ViewChild):
     def __init__(self, parent_view):
         ViewChild.__init__(self, parent_view)
         self.view_size = (0, 0)
+        # Results of our computations, which are only re-computed when their data changes.
+        self._memo = Memo(self.document)
     
     # --- Override
     def _revalidate(self):
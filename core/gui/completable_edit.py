@@ -24,23 +24,27 @@ class CompletableEdit(DocumentGUIObject):
         self.connect()
 
     # --- Private
-    def _refresh_candidates(self):
-        if self.mainwindow is None or not self.attrname:
-            return
+    def _get_candidates(self, partial=''):
+        # Returns our candidates that can complete `partial`, most likely first. Our document's
+        # completion indexes give us those without going through all candidates.
         doc = self.mainwindow.document
         attrname = self.attrname
-        if attrname == 'description':
-            self._candidates = doc.transactions.descriptions
-        elif attrname == 'payee':
-            self._candidates = doc.transactions.payees
+        if attrname in {'description', 'payee'}:
+            result = doc.transactions.complete(attrname, partial)
         elif attrname in {'from', 'to', 'account', 'transfer'}:
-            result = doc.transactions.account_names
+            result = doc.transactions.complete('account', partial)
             # `result` doesn't contain empty accounts' name, so we'll add them.
             result += [a.name for a in doc.accounts if not a.inactive]
             if attrname == 'transfer' and self.account is not None:
                 result = [name for name in result if name != self.account.name]
-            self._candidates = result
-        self._candidates = dedupe([name for name in self._candidates if name.strip()])
+        else:
+            result = []
+        return dedupe([name for name in result if name.strip()])
+
+    def _refresh_candidates(self):
+        if self.mainwindow is None or not self.attrname:
+            return
+        self._candidates = self._get_candidates()
 
     def _set_completion(self, completion):
         completion = nonone(completion, '')
@@ -117,8 +121,9 @@ class CompletableEdit(DocumentGUIObject):
     @text.setter
     def text(self, value):
         self._text = value
-        if self.candidates:
-            self._completions = CompletionList(value, self._candidates)
+        if self.mainwindow is not None and self.attrname:
+            # CompletionList filters out account names that don't match.
+            self._completions = CompletionList(value, self._get_candidates(value))
             self._set_completion(self._completions.current())
         else:
             self._completions = None
@@ -17,7 +17,7 @@ from ..model.date import ONE_DAY
 from ..model.entry import Entry
 from ..model.recurrence import Spawn
 from ..model.transaction import Transaction
-from .table import Row, RowWithDebitAndCreditMixIn, RowWithDateMixIn, rowattr
+from .table import Row, LazyRow, RowWithDebitAndCreditMixIn, RowWithDateMixIn, rowattr
 from .transaction_table_base import TransactionTableBase
 
 class BaseEntryTableRow(Row, RowWithDateMixIn, RowWithDebitAndCreditMixIn):
@@ -143,7 +143,7 @@ class BaseEntryTableRow(Row, RowWithDateMixIn, RowWithDebitAndCreditMixIn):
 AUTOFILL_ATTRS = {'description', 'payee', 'transfer', 'increase', 'decrease'}
 AMOUNT_AUTOFILL_ATTRS = {'increase', 'decrease'}
 
-class EntryTableRow(BaseEntryTableRow):
+class EntryTableRow(LazyRow, BaseEntryTableRow):
     FIELDS = [
         ('_date', 'date'),
         ('_description', 'description'),
@@ -154,11 +154,15 @@ class EntryTableRow(BaseEntryTableRow):
     ]
 
     def __init__(self, table, entry, account):
-        BaseEntryTableRow.__init__(self, table, account)
+        # We don't call BaseEntryTableRow.__init__() because its defaults would hide the
+        # attributes that load() sets.
+        LazyRow.__init__(self, table)
+        RowWithDateMixIn.__init__(self)
+        self.account = account
+        self.is_bold = False
         self.entry = entry
         # makes possible to move more code down to TransactionTableBase
         self.transaction = entry.transaction
-        self.load()
 
     def _autofill_row(self, ref_row, dest_attrs):
         if len(ref_row.entry.transfer) > 1:
@@ -203,9 +207,13 @@ class EntryTableRow(BaseEntryTableRow):
         balance_sheet = self.account.is_balance_sheet_account()
         return inmode and canedit and not future and not foreign and balance_sheet
 
+    def get_key(self):
+        return self.entry.split
+
     def load(self):
         entry = self.entry
         self._load_from_fields(entry, self.FIELDS)
+        self._date_fmt = None
         self._position = entry.transaction.position
         self._transfer = ', '.join(s.combined_display for s in entry.transfer)
         self._balance = entry.balance_with_budget
@@ -224,6 +232,13 @@ class EntryTableRow(BaseEntryTableRow):
         self.table.document.change_entry(entry, **changed_fields)
         self.load()
 
+    def sort_key_for_column(self, column_name):
+        if column_name == 'date':
+            # The entry is used directly so that the row doesn't have to be loaded.
+            return (self.entry.date, self.transaction.position)
+        else:
+            return BaseEntryTableRow.sort_key_for_column(self, column_name)
+
     def toggle_reconciled(self):
         assert self.table.reconciliation_mode
         self.table.selected_row = self
@@ -287,6 +302,9 @@ class PreviousBalanceRow(BaseEntryTableRow):
         self._reconciled = False
         self.is_bold = True
 
+    def get_key(self):
+        return ('previous_balance', self.account)
+
 
 class NewEntryTableRow(EntryTableRow):
     @property
@@ -323,6 +341,9 @@ class TotalRow(BaseEntryTableRow):
             self._balance_fmt = ''
         self.is_bold = True
 
+    def get_key(self):
+        return ('total', self.account)
+
     @property
     def increase(self):
         return self._credit_fmt if self.table.account.is_credit_account() else self._debit_fmt
@@ -352,13 +373,13 @@ class EntryTableBase(TransactionTableBase):
         entry = self._new_entry()
         account = entry.account
         last_suitable_index = 0 if self.header is not None else -1
-        for index, row in enumerate(self):
+        for index, row in enumerate(self._rows):
             if not isinstance(row, EntryTableRow):
                 continue
             if row.account is not account:
                 continue
             last_suitable_index = index
-            if row._date > entry.date:
+            if row.entry.date > entry.date:
                 insert_index = index
                 break
         else:
@@ -396,11 +417,12 @@ class EntryTableBase(TransactionTableBase):
         total_credit = 0
         entries = self.mainwindow.visible_entries_for_account(account)
         for entry in entries:
-            row = self.ENTRY_ROWCLASS(self, entry, account)
-            result.append(row)
-            convert = lambda a: convert_amount(a, account.currency, entry.date)
-            total_debit += convert(row._debit)
-            total_credit += convert(row._credit)
+            result.append(self.ENTRY_ROWCLASS(self, entry, account))
+            amount = convert_amount(entry.amount, account.currency, entry.date)
+            if amount > 0:
+                total_debit += amount
+            else:
+                total_credit -= amount
         if result:
             total_row = TotalRow(self, account, date_range.end, total_debit, total_credit)
             result.append(total_row)
@@ -419,7 +441,7 @@ class EntryTableBase(TransactionTableBase):
         # returns (selected_count, total_count, total_debit, total_credit)
         entries = self.selected_entries
         selected = len(entries)
-        total = sum(1 for row in self if isinstance(row, EntryTableRow))
+        total = sum(1 for row in self._rows if isinstance(row, EntryTableRow))
         total_currency = self._get_totals_currency()
         amounts = [convert_amount(e.amount, total_currency, e.date) for e in entries]
         total_debit = sum(a for a in amounts if a > 0)
@@ -19,6 +19,9 @@ class AccountRow(Row):
         Row.__init__(self, table)
         self.account = account
         self.account_name = account.name
+
+    def get_key(self):
+        return self.account
     
 
 class GeneralLedgerRow(EntryTableRow):
@@ -11,7 +11,7 @@ from math import ceil, floor, log10
 
 from hscommon.geometry import Point, Rect
 
-from ..model.date import inc_month, inc_year
+from ..model.date import DateRange, inc_month, inc_year
 from .chart import Chart
 
 # A graph is a chart or drawing that shows the relationship between changing things.
@@ -60,6 +60,12 @@ class Graph(Chart):
     def _offset_xpos(self, xpos):
         return xpos - self._xoffset
 
+    # --- Virtual
+    def _data_memo_name(self):
+        # Returns the name of our data in our memo. Subclasses whose data depend on something else
+        # than the document's data and date range add it to the name.
+        return 'data'
+
     # --- Public
     def compute_x_axis(self, min_date=None, max_date=None):
         # By default, xmin and xmax are determined by date range's start and end, but you can
@@ -73,6 +79,7 @@ class Graph(Chart):
         # weird overflow problem when translating our painter by this large offset. Therefore, it's
         # better to offset this X value in the model.
         self._xoffset = min_date.toordinal()
+        self._x_date_range = DateRange(min_date, max_date)
         self.xmin = self._offset_xpos(min_date.toordinal())
         self.xmax = self._offset_xpos(max_date.toordinal() + 1)
         tick = date_range.start
@@ -131,7 +138,14 @@ class Graph(Chart):
         # our data points. Then, we compute data before the yaxis because we need the data to know
         # how big our yaxis is.
         self.compute_x_axis()
-        self.compute_data()
+
+        def compute_data():
+            self.compute_data()
+            return self._data
+
+        # Our data can depend on budgets and on all accounts, so it's the revision of the whole
+        # x axis that matters.
+        self._data = self._memo.get(self._data_memo_name(), compute_data, date_range=self._x_date_range)
         self.compute_y_axis()
 
     def draw_graph(self, context):
@@ -28,10 +28,18 @@ class IncomeStatement(Report):
         account = node.account
         date_range = self.document.date_range
         currency = self.document.default_currency
-        cash_flow = account.entries.normal_cash_flow(date_range)
-        cash_flow_native = account.entries.normal_cash_flow(date_range, currency)
-        last_cash_flow = account.entries.normal_cash_flow(date_range.prev())
-        last_cash_flow_native = account.entries.normal_cash_flow(date_range.prev(), currency)
+
+        def compute_cash_flows():
+            return (
+                account.entries.normal_cash_flow(date_range),
+                account.entries.normal_cash_flow(date_range, currency),
+                account.entries.normal_cash_flow(date_range.prev()),
+                account.entries.normal_cash_flow(date_range.prev(), currency),
+            )
+
+        cash_flow, cash_flow_native, last_cash_flow, last_cash_flow_native = self._memo.get(
+            account, compute_cash_flows, accounts=[account]
+        )
         remaining = self.document.budgets.normal_amount_for_account(account, date_range)
         remaining_native = self.document.budgets.normal_amount_for_account(account, date_range, currency)
         delta = cash_flow - last_cash_flow
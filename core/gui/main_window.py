@@ -266,6 +266,12 @@ class MainWindow(Repeater, GUIObject):
         self.view.refresh_panes()
         self._change_current_pane(newpane)
 
+    def _show_import_window(self):
+        if any(a.is_balance_sheet_account() for a in self.loader.accounts) and self.loader.transactions:
+            self.import_window.show()
+        else:
+            raise FileFormatError('This file does not contain any account to import.')
+
     def _update_area_visibility(self):
         self.notify('area_visibility_changed')
         self.view.update_area_visibility()
@@ -276,8 +282,8 @@ class MainWindow(Repeater, GUIObject):
         query_string = self.document.filter_string
         filter_type = self.document.filter_type
         if query_string:
-            query = self.app.parse_search_query(query_string)
-            entries = [e for e in entries if e.transaction.matches(query)]
+            matches = self.document.filter_matcher()
+            entries = [e for e in entries if matches(e.transaction)]
         if filter_type is FilterType.Unassigned:
             entries = [e for e in entries if not e.transfer]
         elif (filter_type is FilterType.Income) or (filter_type is FilterType.Expense):
@@ -364,10 +370,7 @@ class MainWindow(Repeater, GUIObject):
         parsed data into model instances, ready to be shown in the Import window.
         """
         self.loader.load()
-        if any(a.is_balance_sheet_account() for a in self.loader.accounts) and self.loader.transactions:
-            self.import_window.show()
-        else:
-            raise FileFormatError('This file does not contain any account to import.')
+        self._show_import_window()
 
     def make_schedule_from_selected(self):
         current_view = self._current_pane.view
@@ -453,6 +456,10 @@ class MainWindow(Repeater, GUIObject):
                     self.document.default_currency, default_date_format=default_date_format
                 )
                 loader.parse(filename)
+                if isinstance(loader, native.Loader):
+                    # The native loader only reads the root element when parsing. We read the rest
+                    # now so that a corrupt file falls through to the other loaders.
+                    loader.load()
                 break
             except FileFormatError:
                 pass
@@ -462,6 +469,8 @@ class MainWindow(Repeater, GUIObject):
         self.loader = loader
         if isinstance(self.loader, csv.Loader):
             self.csv_options.show()
+        elif isinstance(self.loader, native.Loader):
+            self._show_import_window()
         else:
             self.load_parsed_file_for_import()
 
@@ -0,0 +1,76 @@
+# Copyright 2016 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+from collections import OrderedDict
+from datetime import date
+
+from ..model.currency import Currency
+
+class Memo:
+    """Bounded cache of what a view computes from the document's data.
+
+    Views are revalidated on many notifications, often without their data having changed. With a
+    memo, they only recompute what's affected by the change.
+
+    A result is keyed by its computation (a hashable ``name``) and by everything computations depend
+    on: the document's date range, excluded accounts, default currency, today's date, exchange
+    rates and the revisions (see :meth:`.Document.account_revision` and
+    :meth:`.Document.date_range_revision`) of the accounts the computation depends on. Only the
+    ``max_size`` most recently used results are kept.
+
+    :param document: :class:`.Document` the computations are made from.
+    :param int max_size: Maximum number of results we keep.
+    """
+    def __init__(self, document, max_size=1000):
+        self.document = document
+        self.max_size = max_size
+        #: Number of results that were found in the memo.
+        self.hits = 0
+        #: Number of results that had to be computed.
+        self.misses = 0
+        self._results = OrderedDict()
+
+    def __len__(self):
+        return len(self._results)
+
+    def clear(self):
+        """Forgets all results."""
+        self._results.clear()
+
+    def get(self, name, compute, accounts=None, date_range=None):
+        """Returns the result of ``compute()``, computing it only if needed.
+
+        :param name: hashable identifying the computation among others of our view.
+        :param compute: function without arguments returning the result.
+        :param accounts: iterable of the :class:`.Account` the computation depends on. If ``None``,
+                         it depends on all of them.
+        :param date_range: :class:`.DateRange` of the amounts the computation depends on. Changes
+                           after its end don't affect the computation. Defaults to the document's
+                           date range.
+        """
+        doc = self.document
+        if date_range is None:
+            date_range = doc.date_range
+        if accounts is None:
+            revisions = doc.date_range_revision(date_range)
+        else:
+            revisions = tuple(doc.account_revision(a, date_range) for a in accounts)
+        key = (
+            name, doc.date_range, frozenset(doc.excluded_accounts), doc.default_currency,
+            date.today(), Currency.get_rates_db().revision, revisions,
+        )
+        try:
+            result = self._results[key]
+        except KeyError:
+            self.misses += 1
+            result = compute()
+            self._results[key] = result
+            if len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+        else:
+            self.hits += 1
+            self._results.move_to_end(key)
+        return result
@@ -6,8 +6,13 @@
 # which should be included with this package. The terms are also available at 
 # http://www.gnu.org/licenses/gpl-3.0.html
 
+import heapq
+from itertools import groupby
+from operator import itemgetter
+
 from hscommon.trans import tr
-from ..model.date import DateRange
+from ..model.amount import Amount
+from ..model.date import DateRange, ONE_DAY
 from .balance_graph import BalanceGraph
 from .base import SheetViewNotificationsMixin
 
@@ -19,6 +24,43 @@ class NetWorthGraph(BalanceGraph, SheetViewNotificationsMixin):
         balances = (a.entries.balance(date=date, currency=self._currency) for a in self._accounts)
         return sum(balances)
     
+    def _merged_balance_changes(self, date_range):
+        # Merges the balance changes of all our accounts into a single stream of total balances.
+        accounts = list(self._accounts)
+        start_date = date_range.start - ONE_DAY
+        balances = [a.entries.balance(start_date, currency=self._currency) for a in accounts]
+        total = sum(balances)
+
+        def account_changes(index, account):
+            if not account.entries:
+                return
+            elif account.currency == self._currency:
+                for date, balance in account.entries.balance_changes(date_range):
+                    yield date, index, balance
+            else:
+                # Converted balances follow exchange rates, which can change every day.
+                yield from foreign_account_changes(index, account)
+
+        def foreign_account_changes(index, account):
+            dates = list(date_range)
+            rates = account.currency.values_in(self._currency, dates)
+            changes = dict(account.entries.balance_changes(date_range))
+            balance = account.entries.balance(date_range.start - ONE_DAY)
+            for date, rate in zip(dates, rates):
+                balance = changes.get(date, balance)
+                converted = Amount(balance.value * rate, self._currency) if balance else 0
+                yield date, index, converted
+
+        changes = heapq.merge(*[account_changes(i, a) for i, a in enumerate(accounts)])
+        for date, group in groupby(changes, key=itemgetter(0)):
+            for _, index, balance in group:
+                total += balance - balances[index]
+                balances[index] = balance
+            yield date, total
+
+    def _balance_changes(self, date_range):
+        return self._merged_balance_changes(date_range)
+
     def _budget_for_date(self, date):
         date_range = DateRange(date.min, date)
         return self.document.budgeted_amount_for_target(None, date_range)
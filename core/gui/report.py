@@ -13,6 +13,7 @@ from hscommon.gui.column import Columns
 
 from ..exception import DuplicateAccountNameError
 from .base import ViewChild, SheetViewNotificationsMixin, MESSAGES_DOCUMENT_CHANGED
+from .memo import Memo
 
 # used in both bsheet and istatement
 def get_delta_perc(delta_amount, start_amount):
@@ -33,6 +34,8 @@ class Report(ViewChild, tree.Tree, SheetViewNotificationsMixin):
         self.columns = Columns(self, prefaccess=parent_view.document, savename=self.SAVENAME)
         self.edited = None
         self._expanded_paths = {(0, ), (1, )}
+        # Amounts of accounts, which are only re-computed when the account changes.
+        self._memo = Memo(self.document)
 
     # --- Override
     def _do_restore_view(self):
@@ -10,7 +10,7 @@ import csv
 import datetime
 from io import StringIO
 
-from hscommon.gui.table import GUITable as GUITableBase, Row as RowBase
+from hscommon.gui.table import GUITable as GUITableBase, Row as RowBase, LazyRow as LazyRowBase
 from hscommon.gui.column import Columns
 
 from ..model.amount import Amount
@@ -152,6 +152,13 @@ class Row(RowBase):
         return value
 
 
+class LazyRow(LazyRowBase, Row):
+    """A :class:`Row` that is only loaded when it's needed.
+
+    See :class:`hscommon.gui.table.LazyRow`.
+    """
+
+
 class RowWithDebitAndCreditMixIn:
     @property
     def _debit(self):
@@ -200,8 +207,11 @@ class RowWithDebitAndCreditMixIn:
 
 class RowWithDateMixIn:
     def __init__(self):
-        self._date = datetime.date.today()
-        self._date_fmt = None
+        # Lazy rows get their date from load(). Defaults would hide it and be returned by an
+        # unloaded row.
+        if not isinstance(self, LazyRow):
+            self._date = datetime.date.today()
+            self._date_fmt = None
 
     def is_date_in_future(self):
         return self._date > self.table.document.date_range.end
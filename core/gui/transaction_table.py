@@ -14,7 +14,7 @@ from hscommon.gui.column import Column
 from ..model.amount import convert_amount
 from ..model.recurrence import Spawn
 from ..model.transaction import Transaction
-from .table import Row, RowWithDateMixIn, rowattr
+from .table import Row, LazyRow, RowWithDateMixIn, rowattr
 from .transaction_table_base import TransactionTableBase
 
 trcol = trget('columns')
@@ -38,9 +38,9 @@ class TransactionTable(TransactionTableBase):
         transactions = self.mainwindow.selected_transactions
         date = transactions[0].date if transactions else datetime.date.today()
         transaction = Transaction(date, amount=0)
-        rows = self[:-1] # ignore total row
+        rows = self._rows[:-1] # ignore total row
         for index, row in enumerate(rows):
-            if row._date > transaction.date:
+            if row.transaction.date > transaction.date:
                 insert_index = index
                 break
         else:
@@ -58,9 +58,9 @@ class TransactionTable(TransactionTableBase):
         total_amount = 0
         for transaction in self.parent_view.visible_transactions:
             self.append(TransactionTableRow(self, transaction))
-            convert = lambda a: convert_amount(a, self.document.default_currency, transaction.date)
-            total_amount += convert(transaction.amount)
-            if not self.document.is_amount_native(transaction.amount):
+            amount = transaction.amount
+            total_amount += convert_amount(amount, self.document.default_currency, transaction.date)
+            if not self.document.is_amount_native(amount):
                 self._all_amounts_are_native = False
         self.footer = TotalRow(self, self.document.date_range.end, total_amount)
         self._restore_from_explicit_selection(refresh_view=False)
@@ -110,7 +110,7 @@ class TransactionTable(TransactionTableBase):
 
 AUTOFILL_ATTRS = {'description', 'payee', 'from', 'to', 'amount'}
 
-class TransactionTableRow(Row, RowWithDateMixIn):
+class TransactionTableRow(LazyRow, RowWithDateMixIn):
     FIELDS = [
         ('_date', 'date'),
         ('_description', 'description'),
@@ -119,12 +119,11 @@ class TransactionTableRow(Row, RowWithDateMixIn):
     ]
 
     def __init__(self, table, transaction):
-        Row.__init__(self, table)
+        LazyRow.__init__(self, table)
         RowWithDateMixIn.__init__(self)
         self.document = table.document
         self.transaction = transaction
         self.is_bold = False
-        self.load()
 
     def _autofill_row(self, ref_row, dest_attrs):
         self._amount_fmt = None
@@ -148,6 +147,9 @@ class TransactionTableRow(Row, RowWithDateMixIn):
     def can_edit(self):
         return not self.is_budget
 
+    def get_key(self):
+        return self.transaction
+
     def load(self):
         transaction = self.transaction
         self._load_from_fields(transaction, self.FIELDS)
@@ -189,7 +191,8 @@ class TransactionTableRow(Row, RowWithDateMixIn):
 
     def sort_key_for_column(self, column_name):
         if column_name == 'date':
-            return (self._date, self._position)
+            # The transaction is used directly so that the row doesn't have to be loaded.
+            return (self.transaction.date, self.transaction.position)
         elif column_name == 'status':
             # First reconciled, then plain ones, then schedules, then budgets
             if self.reconciled:
@@ -277,3 +280,6 @@ class TotalRow(Row):
     def can_edit(self):
         return False
 
+    def get_key(self):
+        return 'total'
+
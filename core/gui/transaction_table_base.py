@@ -24,7 +24,8 @@ class TransactionSelectionMixin:
 
     def select_transactions(self, transactions):
         selected_indexes = []
-        for index, row in enumerate(self):
+        # We don't fetch rows from the table because we don't need them loaded.
+        for index, row in enumerate(self._rows):
             if hasattr(row, 'transaction') and row.transaction in transactions:
                 selected_indexes.append(index)
         self.selected_indexes = selected_indexes
@@ -48,8 +49,10 @@ class TransactionSelectionMixin:
     def _select_nearest_date(self, target_date):
         # This method assumes that self is sorted by date
         last_delta = datetime.timedelta.max
-        for index, row in enumerate(self):
-            delta = abs(row._date - target_date)
+        for index, row in enumerate(self._rows):
+            # The transaction date doesn't require the row to be loaded
+            row_date = row.transaction.date if hasattr(row, 'transaction') else row._date
+            delta = abs(row_date - target_date)
             if delta > last_delta:
                 # The last iteration was the correct one
                 self.selected_index = index - 1
@@ -80,8 +80,8 @@ class TransactionView(BaseView, ViewWithTransactionsMixin):
             self._visible_transactions = txns
             return
         if query_string:
-            query = self.app.parse_search_query(query_string)
-            txns = [t for t in txns if t.matches(query)]
+            matches = self.document.filter_matcher()
+            txns = [t for t in txns if matches(t)]
         if filter_type is FilterType.Unassigned:
             txns = [t for t in txns if t.has_unassigned_split]
         elif filter_type is FilterType.Income:
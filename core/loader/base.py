@@ -285,26 +285,8 @@ class Loader:
             group = Group(info.name, info.type)
             self.groups.append(group)
         for info in self.account_infos:
-            account_type = info.type
-            if account_type not in AccountType.All:
-                account_type = AccountType.Asset
-            account_currency = self.default_currency
-            try:
-                if info.currency:
-                    account_currency = Currency(info.currency)
-            except ValueError:
-                pass # keep account_currency as self.default_currency
-            account = Account(info.name, account_currency, account_type)
-            if info.group:
-                account.group = self.groups.find(info.group, account_type)
-            if info.budget:
-                self.budget_infos.append(BudgetInfo(info.name, info.budget_target, info.budget))
-            account.reference = info.reference
-            account.account_number = info.account_number
-            account.inactive = info.inactive
-            account.notes = info.notes
+            account = self.load_account_info(info)
             currencies.add(account.currency)
-            self.accounts.add(account)
 
         # Pre-parse transaction info. We bring all relevant info recorded at the txn level into the split level
         all_txn = self.transaction_infos + [r.transaction_info for r in self.recurrence_infos] +\
@@ -357,7 +339,39 @@ class Loader:
                 spawn = Spawn(recurrence, change, date, change.date)
                 recurrence.date2globalchange[date] = spawn
             self.schedules.append(recurrence)
-        # Budgets
+        self.load_budget_infos()
+        self._post_load()
+        self.finish_load(start_date, currencies)
+
+    def load_account_info(self, info):
+        """Creates an :class:`.Account` from ``info``, adds it to :attr:`accounts` and returns it.
+        """
+        account_type = info.type
+        if account_type not in AccountType.All:
+            account_type = AccountType.Asset
+        account_currency = self.default_currency
+        try:
+            if info.currency:
+                account_currency = Currency(info.currency)
+        except ValueError:
+            pass # keep account_currency as self.default_currency
+        account = Account(info.name, account_currency, account_type)
+        if info.group:
+            account.group = self.groups.find(info.group, account_type)
+        if info.budget:
+            self.budget_infos.append(BudgetInfo(info.name, info.budget_target, info.budget))
+        account.reference = info.reference
+        account.account_number = info.account_number
+        account.inactive = info.inactive
+        account.notes = info.notes
+        self.accounts.add(account)
+        return account
+
+    def load_budget_infos(self):
+        """Creates :attr:`budgets` from the budget infos we've gathered.
+
+        Our accounts have to be created before this is called.
+        """
         TODAY = datetime.date.today()
         fallback_start_date = datetime.date(TODAY.year, TODAY.month, 1)
         for info in self.budget_infos:
@@ -373,7 +387,13 @@ class Loader:
             if info.repeat_every:
                 budget.repeat_every = info.repeat_every
             self.budgets.append(budget)
-        self._post_load()
+
+    def finish_load(self, start_date, currencies):
+        """Cooks our loaded data and ensures that we have rates for ``currencies``.
+
+        :param start_date: ``datetime.date`` of our earliest transaction.
+        :param currencies: set of :class:`.Currency` used in our loaded data.
+        """
         self.oven.cook(datetime.date.min, until_date=None)
         Currency.get_rates_db().ensure_rates(start_date, [x.code for x in currencies])
 
@@ -0,0 +1,176 @@
+# Copyright 2016 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+import datetime
+import pickle
+
+from hscommon.jobprogress.job import nulljob, JobCancelled
+
+from ..exception import FileFormatError
+from ..model.account import Account, Group, AccountType
+from ..model.amount import Amount
+from ..model.budget import Budget
+from ..model.currency import Currency
+from ..model.recurrence import Recurrence, Spawn
+from ..model.transaction import Transaction, Split
+from ..saver.cache import CACHE_VERSION, source_stamp
+from . import base
+
+class SafeUnpickler(pickle.Unpickler):
+    # Our caches only contain builtin types. Refusing to look up any class means that a tampered
+    # cache can't make us run anything.
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError("Unexpected class in cache: %s.%s" % (module, name))
+
+class Loader(base.Loader):
+    """Loads a document cache written by :mod:`core.saver.cache`.
+
+    ``source_filename`` is the native document that the cache is a copy of. :meth:`parse` raises
+    :exc:`.FileFormatError` if the cache is not a valid cache for that file, which is the cue for
+    loading the native document instead.
+
+    Because the data comes from an already loaded document, we skip the cooking that other loaders
+    do at the end of the load. The :class:`.Document` cooks its data anyway.
+    """
+    def __init__(self, default_currency, source_filename):
+        base.Loader.__init__(self, default_currency)
+        self.source_filename = source_filename
+        self._data = None
+        self._dates = {}
+        self._name2account = {}
+        self._currencies = set()
+
+    # --- Private
+    def _date(self, ordinal):
+        # A lot of transactions share dates, no need to have a date instance for each of them.
+        if ordinal is None:
+            return None
+        result = self._dates.get(ordinal)
+        if result is None:
+            result = self._dates[ordinal] = datetime.date.fromordinal(ordinal)
+        return result
+
+    def _account(self, name, amount):
+        if name is None:
+            return None
+        result = self._name2account.get(name)
+        if result is None:
+            auto_create_type = AccountType.Income if amount >= 0 else AccountType.Expense
+            result = self._name2account[name] = self.accounts.find(name, auto_create_type)
+        return result
+
+    def _amount(self, amount_tuple):
+        value, currency_code = amount_tuple
+        if currency_code is None:
+            return value
+        currency = Currency.by_code[currency_code]
+        self._currencies.add(currency)
+        return Amount(value, currency)
+
+    def _transaction(self, txn_tuple):
+        ordinal, description, payee, checkno, notes, mtime, position, split_tuples = txn_tuple
+        txn = Transaction(self._date(ordinal), description, payee, checkno)
+        txn.notes = notes
+        txn.mtime = mtime
+        txn.position = position
+        for account_name, amount_tuple, memo, reference, reconciliation_ordinal in split_tuples:
+            amount = self._amount(amount_tuple)
+            split = Split(txn, self._account(account_name, amount), amount)
+            split.memo = memo
+            split.reference = reference
+            split.reconciliation_date = self._date(reconciliation_ordinal)
+            txn.splits.append(split)
+        return txn
+
+    def _recurrence(self, recurrence_tuple):
+        repeat_type, repeat_every, stop_ordinal, ref_tuple, changes, exceptions = recurrence_tuple
+        recurrence = Recurrence(self._transaction(ref_tuple), repeat_type, repeat_every)
+        recurrence.stop_date = self._date(stop_ordinal)
+        # Same order as in the native loader
+        for ordinal, exception_tuple in exceptions:
+            date = self._date(ordinal)
+            if exception_tuple is not None:
+                exception = self._transaction(exception_tuple)
+                recurrence.date2exception[date] = Spawn(recurrence, exception, date, exception.date)
+            else:
+                recurrence.delete_at(date)
+        for ordinal, change_tuple in changes:
+            date = self._date(ordinal)
+            change = self._transaction(change_tuple)
+            recurrence.date2globalchange[date] = Spawn(recurrence, change, date, change.date)
+        return recurrence
+
+    def _budget(self, budget_tuple):
+        (account_name, target_name, amount_tuple, repeat_type, repeat_every, notes, start_ordinal,
+            stop_ordinal) = budget_tuple
+        account = self.accounts.find(account_name)
+        target = self.accounts.find(target_name) if target_name else None
+        budget = Budget(
+            account, target, self._amount(amount_tuple), self._date(start_ordinal),
+            repeat_type=repeat_type
+        )
+        budget.notes = notes
+        budget.stop_date = self._date(stop_ordinal)
+        budget.repeat_every = repeat_every
+        return budget
+
+    def _build(self, job):
+        data = self._data
+        for name, value in data['properties'].items():
+            if name == 'default_currency':
+                value = Currency.by_code[value]
+            self.properties[name] = value
+        for name, type in data['groups']:
+            self.groups.append(Group(name, type))
+        for (name, currency_code, type, group_name, reference, account_number, inactive,
+                notes) in data['accounts']:
+            account = Account(name, Currency.by_code[currency_code], type)
+            if group_name:
+                account.group = self.groups.find(group_name, type)
+            account.reference = reference
+            account.account_number = account_number
+            account.inactive = inactive
+            account.notes = notes
+            self.accounts.add(account)
+            self._name2account[name] = account
+            self._currencies.add(account.currency)
+        for txn_tuple in job.iter_with_progress(data['transactions'], every=1000):
+            txn = self._transaction(txn_tuple)
+            self.transactions.add(txn, position=txn.position)
+        for recurrence_tuple in data['schedules']:
+            self.schedules.append(self._recurrence(recurrence_tuple))
+        for budget_tuple in data['budgets']:
+            self.budgets.append(self._budget(budget_tuple))
+
+    # --- Public
+    def parse(self, filename):
+        try:
+            with open(filename, 'rb') as fp:
+                unpickler = SafeUnpickler(fp)
+                header = unpickler.load()
+                if header['version'] != CACHE_VERSION:
+                    raise FileFormatError()
+                if header['source_stamp'] != source_stamp(self.source_filename):
+                    raise FileFormatError()
+                self.document_id = header['document_id']
+                self._data = unpickler.load()
+        except FileFormatError:
+            raise
+        except Exception:
+            # A corrupted cache can make unpickling fail in all kinds of ways.
+            raise FileFormatError()
+
+    def load(self, job=nulljob):
+        try:
+            self._build(job)
+        except JobCancelled:
+            raise
+        except Exception:
+            raise FileFormatError()
+        finally:
+            self._data = None
+        start_date = min((t.date for t in self.transactions), default=datetime.date.max)
+        Currency.get_rates_db().ensure_rates(start_date, [x.code for x in self._currencies])
@@ -4,146 +4,291 @@
 # which should be included with this package. The terms are also available at
 # http://www.gnu.org/licenses/gpl-3.0.html
 
-from datetime import datetime
+import datetime
+import io
+from collections import defaultdict
+from operator import attrgetter
 import xml.etree.cElementTree as ET
 
-from hscommon.util import tryint
+from hscommon.jobprogress.job import nulljob
+from hscommon.trans import tr
+from hscommon.util import tryint, nonone
 
 from ..exception import FileFormatError
+from ..model.account import Group, AccountType
+from ..model.amount import of_currency, parse_canonical_amount
 from ..model.currency import Currency
-from .base import SplitInfo, TransactionInfo
+from ..model.recurrence import Recurrence, Spawn
+from ..model.transaction import Transaction, Split
+from .base import AccountInfo, BudgetInfo
 from . import base
 
+def handle_newlines(s):
+    # etree doesn't correctly save newlines. During save, we escape them. Now's the time to
+    # restore them.
+    # XXX After a while, when most users will have used a moneyGuru version that doesn't
+    # need newline escaping on save, we can remove this one as well.
+    if not s:
+        return s
+    return s.replace('\\n', '\n')
+
 class Loader(base.Loader):
+    """Loads native moneyGuru documents.
+
+    Unlike other loaders, we don't build a whole tree and infos for the whole file before creating
+    model instances. :meth:`_parse` only reads the root element, and :meth:`load` streams through
+    the rest of the file with ``iterparse``, creating model instances as top level elements come and
+    discarding those elements right after.
+
+    This relies on the order in which we save our files: groups and accounts come before the
+    transactions, schedules and budgets referencing them.
+    """
     FILE_OPEN_MODE = 'rb'
     NATIVE_DATE_FORMAT = '%Y-%m-%d'
     STRICT_CURRENCY = True
+    # We report progress every time we've read this number of top level elements.
+    PROGRESS_EVERY = 1000
+
+    def __init__(self, default_currency, default_date_format=None):
+        base.Loader.__init__(self, default_currency, default_date_format=default_date_format)
+        self._infile = None
+        self._filename = None
+        self._filesize = 0
+        self._events = None
+        self._currencies = set()
+        self._date2position = defaultdict(int)
 
+    # --- Override
     def _parse(self, infile):
+        # We only read the root element here, the rest is read in load(), which closes infile.
+        position = infile.tell()
+        infile.seek(0, io.SEEK_END)
+        self._filesize = infile.tell() - position
+        infile.seek(position)
+        self._infile = infile
+        self._events = ET.iterparse(infile, events=('start', 'end'))
         try:
-            root = ET.parse(infile).getroot()
-        except SyntaxError:
+            event, root = next(self._events)
+        except (SyntaxError, StopIteration):
             raise FileFormatError()
         if root.tag != 'moneyguru-file':
             raise FileFormatError()
         self.root = root
+        self.document_id = root.attrib.get('document_id')
+
+    # --- Private
+    def _str2date(self, s, default=None):
+        try:
+            return self.parse_date_str(s)
+        except (ValueError, TypeError):
+            return default
+
+    def _read_properties(self, element):
+        for name, value in element.attrib.items():
+            # For now, all our prefs are ints, so we can simply assume tryint, but we'll
+            # eventually need something more sophisticated.
+            if name == 'default_currency':
+                value = Currency.by_code.get(value)
+            else:
+                value = tryint(value, default=None)
+            if name and value is not None:
+                self.properties[name] = value
+
+    def _read_group(self, element):
+        attrib = element.attrib
+        name = attrib.get('name')
+        if name:
+            self.groups.append(Group(name, attrib.get('type')))
+
+    def _read_account(self, element):
+        attrib = element.attrib
+        info = AccountInfo()
+        info.name = attrib.get('name')
+        info.currency = attrib.get('currency')
+        info.type = attrib.get('type')
+        info.group = attrib.get('group')
+        info.budget = attrib.get('budget')
+        info.budget_target = attrib.get('budget_target')
+        info.reference = attrib.get('reference')
+        info.account_number = attrib.get('account_number', '')
+        info.inactive = attrib.get('inactive') == 'y'
+        info.notes = handle_newlines(attrib.get('notes', ''))
+        if info.is_valid():
+            account = self.load_account_info(info)
+            self._currencies.add(account.currency)
+
+    def _read_split(self, element, transaction):
+        attrib = element.attrib
+        str_amount = attrib.get('amount')
+        if str_amount is None:
+            return None
+        # We write our amounts with format_amount() and, unless the file comes from an old
+        # version, they're canonical. Otherwise, we have to go through the slower parse_amount().
+        amount = parse_canonical_amount(str_amount)
+        is_canonical = amount is not None
+        if not is_canonical:
+            amount = self.parse_amount(str_amount, self.default_currency)
+        account_name = attrib.get('account')
+        if account_name:
+            auto_create_type = AccountType.Income if amount >= 0 else AccountType.Expense
+            account = self.accounts.find(account_name, auto_create_type)
+            if not is_canonical and account.currency != self.default_currency:
+                amount = self.parse_amount(str_amount, account.currency)
+        else:
+            account = None
+        if amount:
+            self._currencies.add(amount.currency)
+        split = Split(transaction, account, amount)
+        split.memo = nonone(attrib.get('memo'), '')
+        if account is None or not of_currency(amount, account.currency):
+            # fix #442: off-currency transactions shouldn't be reconciled
+            split.reconciliation_date = None
+        else:
+            reconciliation_date = self._str2date(attrib.get('reconciliation_date'))
+            if reconciliation_date is not None:
+                split.reconciliation_date = reconciliation_date
+            elif attrib.get('reconciled') == 'y': # legacy
+                split.reconciliation_date = transaction.date
+        split.reference = attrib.get('reference')
+        return split
+
+    def _read_transaction(self, element, allow_empty=False):
+        # Returns a Transaction for ``element``, or None if it has no valid split and
+        # ``allow_empty`` is false.
+        attrib = element.attrib
+        date = self._str2date(attrib.get('date'), datetime.date.today())
+        transaction = Transaction(
+            date, attrib.get('description'), attrib.get('payee'), attrib.get('checkno')
+        )
+        transaction.notes = nonone(handle_newlines(attrib.get('notes')), '')
+        for split_element in element.iter('split'):
+            split = self._read_split(split_element, transaction)
+            if split is not None:
+                transaction.splits.append(split)
+        if not transaction.splits and not allow_empty:
+            return None
+        while len(transaction.splits) < 2:
+            transaction.splits.append(Split(transaction, None, 0))
+        transaction.balance()
+        try:
+            transaction.mtime = int(attrib.get('mtime', 0))
+        except ValueError:
+            transaction.mtime = 0
+        reference = attrib.get('reference')
+        if reference is not None:
+            for split in transaction.splits:
+                if split.reference is None:
+                    split.reference = reference
+        return transaction
 
-    def _load(self):
-        TODAY = datetime.now().date()
-
-        def str2date(s, default=None):
-            try:
-                return self.parse_date_str(s)
-            except (ValueError, TypeError):
-                return default
-
-        def handle_newlines(s):
-            # etree doesn't correctly save newlines. During save, we escape them. Now's the time to
-            # restore them.
-            # XXX After a while, when most users will have used a moneyGuru version that doesn't
-            # need newline escaping on save, we can remove this one as well.
-            if not s:
-                return s
-            return s.replace('\\n', '\n')
-
-        def read_transaction_element(element, info):
-            attrib = element.attrib
-            info.account = attrib.get('account')
-            info.date = str2date(attrib.get('date'), TODAY)
-            info.description = attrib.get('description')
-            info.payee = attrib.get('payee')
-            info.checkno = attrib.get('checkno')
-            info.notes = handle_newlines(attrib.get('notes'))
-            info.transfer = attrib.get('transfer')
-            try:
-                info.mtime = int(attrib.get('mtime', 0))
-            except ValueError:
-                info.mtime = 0
-            info.reference = attrib.get('reference')
-            for split_element in element.iter('split'):
-                attrib = split_element.attrib
-                split_info = SplitInfo()
-                split_info.account = split_element.attrib.get('account')
-                split_info.amount = split_element.attrib.get('amount')
-                split_info.memo = split_element.attrib.get('memo')
-                split_info.reference = split_element.attrib.get('reference')
-                if 'reconciled' in split_element.attrib: # legacy
-                    split_info.reconciled = split_element.attrib['reconciled'] == 'y'
-                if 'reconciliation_date' in split_element.attrib:
-                    split_info.reconciliation_date = str2date(split_element.attrib['reconciliation_date'])
-                info.splits.append(split_info)
-            return info
+    def _read_root_transaction(self, element):
+        transaction = self._read_transaction(element)
+        if transaction is not None:
+            self._date2position[transaction.date] += 1
+            self.transactions.add(transaction, position=self._date2position[transaction.date])
 
+    def _read_recurrence(self, element):
+        attrib = element.attrib
+        ref_element = element.find('transaction')
+        ref = self._read_transaction(ref_element) if ref_element is not None else None
+        if ref is None:
+            return
+        recurrence = Recurrence(ref, attrib.get('type'), int(attrib.get('every', '1')))
+        recurrence.stop_date = self._str2date(attrib.get('stop_date'))
+        for exception_element in element.iter('exception'):
+            if 'date' not in exception_element.attrib:
+                continue
+            date = self._str2date(exception_element.attrib['date'])
+            txn_element = exception_element.find('transaction')
+            if txn_element is not None:
+                exception = self._read_transaction(txn_element, allow_empty=True)
+                recurrence.date2exception[date] = Spawn(recurrence, exception, date, exception.date)
+            else:
+                recurrence.delete_at(date)
+        for change_element in element.iter('change'):
+            txn_element = change_element.find('transaction')
+            if 'date' not in change_element.attrib or txn_element is None:
+                continue
+            date = self._str2date(change_element.attrib['date'])
+            change = self._read_transaction(txn_element, allow_empty=True)
+            recurrence.date2globalchange[date] = Spawn(recurrence, change, date, change.date)
+        self.schedules.append(recurrence)
+
+    def _read_budget(self, element):
+        attrib = element.attrib
+        info = BudgetInfo(attrib.get('account'), attrib.get('target'), attrib.get('amount'))
+        info.repeat_type = attrib.get('type')
+        info.repeat_every = tryint(attrib.get('every'), default=None)
+        info.notes = attrib.get('notes')
+        info.start_date = self._str2date(attrib.get('start_date'))
+        info.stop_date = self._str2date(attrib.get('stop_date'))
+        if info.is_valid():
+            self.budget_infos.append(info)
+
+    def _read_elements(self, job):
+        readers = {
+            'properties': self._read_properties,
+            'group': self._read_group,
+            'account': self._read_account,
+            'transaction': self._read_root_transaction,
+            'recurrence': self._read_recurrence,
+            'budget': self._read_budget,
+        }
         root = self.root
-        self.document_id = root.attrib.get('document_id')
-        props_element = root.find('properties')
-        if props_element is not None:
-            for name, value in props_element.attrib.items():
-                # For now, all our prefs are ints, so we can simply assume tryint, but we'll
-                # eventually need something more sophisticated.
-                if name == 'default_currency':
-                    value = Currency.by_code.get(value)
-                else:
-                    value = tryint(value, default=None)
-                if name and value is not None:
-                    self.properties[name] = value
-        for group_element in root.iter('group'):
-            self.start_group()
-            attrib = group_element.attrib
-            self.group_info.name = attrib.get('name')
-            self.group_info.type = attrib.get('type')
-            self.flush_group()
-        for account_element in root.iter('account'):
-            self.start_account()
-            attrib = account_element.attrib
-            self.account_info.name = attrib.get('name')
-            self.account_info.currency = attrib.get('currency')
-            self.account_info.type = attrib.get('type')
-            self.account_info.group = attrib.get('group')
-            self.account_info.budget = attrib.get('budget')
-            self.account_info.budget_target = attrib.get('budget_target')
-            self.account_info.reference = attrib.get('reference')
-            self.account_info.account_number = attrib.get('account_number', '')
-            self.account_info.inactive = attrib.get('inactive') == 'y'
-            self.account_info.notes = handle_newlines(attrib.get('notes', ''))
-            self.flush_account()
-        elements = [e for e in root if e.tag == 'transaction'] # we only want transaction element *at the root*
-        for transaction_element in elements:
-            self.start_transaction()
-            read_transaction_element(transaction_element, self.transaction_info)
-            self.flush_transaction()
-        for recurrence_element in root.iter('recurrence'):
-            attrib = recurrence_element.attrib
-            self.recurrence_info.repeat_type = attrib.get('type')
-            self.recurrence_info.repeat_every = int(attrib.get('every', '1'))
-            self.recurrence_info.stop_date = str2date(attrib.get('stop_date'))
-            read_transaction_element(recurrence_element.find('transaction'), self.recurrence_info.transaction_info)
-            for exception_element in recurrence_element.iter('exception'):
-                try:
-                    date = str2date(exception_element.attrib['date'])
-                    txn_element = exception_element.find('transaction')
-                    txn = read_transaction_element(txn_element, TransactionInfo()) if txn_element is not None else None
-                    self.recurrence_info.date2exception[date] = txn
-                except KeyError:
-                    continue
-            for change_element in recurrence_element.iter('change'):
-                try:
-                    date = str2date(change_element.attrib['date'])
-                    txn_element = change_element.find('transaction')
-                    txn = read_transaction_element(txn_element, TransactionInfo()) if txn_element is not None else None
-                    self.recurrence_info.date2globalchange[date] = txn
-                except KeyError:
-                    continue
-            self.flush_recurrence()
-        for budget_element in root.iter('budget'):
-            attrib = budget_element.attrib
-            self.budget_info.account = attrib.get('account')
-            self.budget_info.repeat_type = attrib.get('type')
-            self.budget_info.repeat_every = tryint(attrib.get('every'), default=None)
-            self.budget_info.target = attrib.get('target')
-            self.budget_info.amount = attrib.get('amount')
-            self.budget_info.notes = attrib.get('notes')
-            self.budget_info.start_date = str2date(attrib.get('start_date'))
-            self.budget_info.stop_date = str2date(attrib.get('stop_date'))
-            self.flush_budget()
+        job.start_job(self._filesize)
+        depth = 1 # we're in the root element
+        count = 0
+        for event, element in self._events:
+            if event == 'start':
+                depth += 1
+                continue
+            depth -= 1
+            if depth != 1:
+                continue
+            # We have a complete top level element
+            reader = readers.get(element.tag)
+            if reader is not None:
+                reader(element)
+            del root[:]
+            count += 1
+            if count % self.PROGRESS_EVERY == 0:
+                job.set_progress(self._infile.tell())
+        job.set_progress(self._filesize)
 
+    # --- Public
+    def parse(self, filename):
+        # Our file has to stay open until load() is done with it, so we don't use a with block.
+        try:
+            infile = open(filename, self.FILE_OPEN_MODE)
+        except IOError:
+            raise FileFormatError()
+        self._filename = filename
+        try:
+            self._parse(infile)
+        except (FileFormatError, IOError):
+            infile.close()
+            raise FileFormatError()
+
+    def close(self):
+        """Closes the parsed file without loading it."""
+        self._infile.close()
+
+    def load(self, job=nulljob):
+        """Reads the rest of the parsed file and creates model instances from it.
+
+        Raises :exc:`.FileFormatError` if the file turns out to be corrupt past its root element.
+
+        :param job: :class:`hscommon.jobprogress.job.Job` through which we report our progress,
+                    proportionally to the part of the file we've read.
+        """
+        try:
+            self._read_elements(job)
+        except SyntaxError:
+            raise FileFormatError(tr('"%s" is not a moneyGuru file') % self._filename)
+        finally:
+            self._infile.close()
+        self.transactions.sort(key=attrgetter('date'))
+        self.load_budget_infos()
+        self._post_load()
+        start_date = self.transactions[0].date if self.transactions else datetime.date.max
+        self.finish_load(start_date, self._currencies)
@@ -15,6 +15,10 @@ import operator
 
 from .currency import Currency
 
+# Amounts are stored in an int64 in amount.c, which holds any number of 18 digits. Longer numbers
+# aren't canonical, we leave them to parse_amount().
+MAX_CANONICAL_DIGITS = 18
+
 def cmp_wrap(op):
     def wrapper(self, other):
         if isinstance(other, Amount):
@@ -170,3 +174,47 @@ class Amount:
         "*readonly*. ``float``. numerical value of the amount."""
         return self._value
 
+
+
+def parse_canonical(string, currencies):
+    """Returns an :class:`Amount` from ``string`` if it's in canonical form, ``None`` otherwise.
+
+    The canonical form is what :func:`.format_amount` returns when we don't give it a default
+    currency: a currency code, a space, and the number with as many decimals as the currency has
+    (no decimal separator at all when it has none). "CAD 42.54", "JPY -42". Zero has no currency
+    and is always "0.00". When the amount is zero, we return ``0``.
+
+    ``currencies`` is a ``{code: currency}`` dict. A code that isn't in it isn't canonical.
+
+    Only ASCII digits are canonical, and numbers can't have more than :data:`MAX_CANONICAL_DIGITS`
+    digits.
+    """
+    code, space, number = string.partition(' ')
+    if space:
+        currency = currencies.get(code)
+        if currency is None:
+            return None
+    else:
+        currency = None
+        number = code
+    if number.startswith('-'):
+        number = number[1:]
+        negative = True
+    else:
+        negative = False
+    integer, dot, decimals = number.partition('.')
+    # strip() leaves something behind if there's anything else than ASCII digits in there.
+    if not integer or integer.strip('0123456789') or (dot and (not decimals or decimals.strip('0123456789'))):
+        return None
+    if len(integer) + len(decimals) > MAX_CANONICAL_DIGITS:
+        return None
+    if currency is None:
+        if int(integer) or (decimals and int(decimals)):
+            return None
+        return 0
+    if len(decimals) != currency.exponent:
+        return None
+    value = int(integer + decimals)
+    if not value:
+        return 0
+    return Amount(-value if negative else value, currency, _value_is_shifted=True)
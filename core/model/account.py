@@ -6,7 +6,7 @@
 
 from functools import partial
 
-from .entry import EntryList
+from .entry import ColumnarEntryList
 from .sort import sort_string
 from ..exception import DuplicateAccountNameError
 from ..const import Const
@@ -71,7 +71,7 @@ class Account:
         self.notes = ''
         #: *readonly*. :class:`.EntryList` belonging to that account. This list is computed from
         #: :attr:`.Document.transactions` by the :class:`.Oven`.
-        self.entries = EntryList(self)
+        self.entries = ColumnarEntryList(self)
 
     def __repr__(self):
         return '<Account %r>' % self.name
@@ -158,13 +158,89 @@ class AccountList(list):
     ``default_currency`` is the currency that we want new accounts (created in :meth:`find`) to
     have.
 
+    To avoid going through all accounts in :meth:`find` and :meth:`find_reference`, we index
+    accounts by normalized name, account number and reference. Indexes are built the first time we
+    need them and kept up to date by our methods. If you change the name, account number or
+    reference of an account in the list by other means, call :meth:`reindex`.
+
     Subclasses ``list``.
     """
     def __init__(self, default_currency):
         list.__init__(self)
         self.default_currency = default_currency
         self.auto_created = set()
+        self._clear_indexes()
+
+    # --- Overrides
+    def sort(self, *args, **kwargs):
+        list.sort(self, *args, **kwargs)
+        # When many accounts match, find() returns the first one in the list. Our indexes remember
+        # list order.
+        self._clear_indexes()
+
+    # --- Private
+    def _clear_indexes(self):
+        # {account: (normalized name, account number, reference)}, as they were when we indexed the
+        # account. None until we need our indexes.
+        self._indexed = None
+        # {account: sequence number}. Follows list order.
+        self._order = None
+        self._last_order = 0
+        # {key: [accounts in list order]}
+        self._name2accounts = None
+        self._number2accounts = None
+        self._reference2accounts = None
+        # Sorted lengths of the account numbers in _number2accounts
+        self._number_lengths = None
+
+    def _ensure_indexes(self):
+        if self._indexed is None:
+            self._indexed = {}
+            self._order = {}
+            self._name2accounts = {}
+            self._number2accounts = {}
+            self._reference2accounts = {}
+            self._number_lengths = []
+            for account in self:
+                self._index(account)
+
+    def _index(self, account):
+        if account not in self._order:
+            self._last_order += 1
+            self._order[account] = self._last_order
+        keys = (account.name.lower().strip(), account.account_number, account.reference)
+        self._indexed[account] = keys
+        name, number, reference = keys
+        self._index_key(self._name2accounts, name, account)
+        if number:
+            self._index_key(self._number2accounts, number, account)
+            if len(number) not in self._number_lengths:
+                self._number_lengths.append(len(number))
+                self._number_lengths.sort()
+        if reference is not None:
+            self._index_key(self._reference2accounts, reference, account)
+
+    def _index_key(self, key2accounts, key, account):
+        accounts = key2accounts.setdefault(key, [])
+        accounts.append(account)
+        if len(accounts) > 1:
+            accounts.sort(key=self._order.__getitem__)
+
+    def _unindex(self, account):
+        name, number, reference = self._indexed.pop(account)
+        self._unindex_key(self._name2accounts, name, account)
+        if number:
+            self._unindex_key(self._number2accounts, number, account)
+        if reference is not None:
+            self._unindex_key(self._reference2accounts, reference, account)
+
+    def _unindex_key(self, key2accounts, key, account):
+        accounts = key2accounts[key]
+        accounts.remove(account)
+        if not accounts:
+            del key2accounts[key]
 
+    # --- Public
     def add(self, account):
         """Adds ``account`` to the list.
 
@@ -172,10 +248,13 @@ class AccountList(list):
         """
         if self.find_reference(account.reference) is None:
             list.append(self, account)
+            if self._indexed is not None:
+                self._index(account)
 
     def clear(self):
         """Removes all elements from the list."""
         del self[:]
+        self._clear_indexes()
 
     def filter(self, group=NOT_GIVEN, type=NOT_GIVEN):
         """Returns all accounts of the given ``type`` and/or ``group``.
@@ -197,11 +276,18 @@ class AccountList(list):
         ``auto_create_type`` and return it.
         """
         normalized = name.lower().strip()
-        for account in self:
-            if account.name.lower().strip() == normalized:
-                return account
-            elif account.account_number and normalized.startswith(account.account_number):
-                return account
+        self._ensure_indexes()
+        # The first account with that name and, for each account number that prefixes ``name``,
+        # the first account with that number. The first of those in the list wins.
+        candidates = self._name2accounts.get(normalized, [])[:1]
+        for length in self._number_lengths:
+            if length > len(normalized):
+                break
+            accounts = self._number2accounts.get(normalized[:length])
+            if accounts:
+                candidates.append(accounts[0])
+        if candidates:
+            return min(candidates, key=self._order.__getitem__)
         if auto_create_type:
             account = Account(name.strip(), self.default_currency, type=auto_create_type)
             self.add(account)
@@ -212,9 +298,9 @@ class AccountList(list):
         """Returns the account with ``reference`` or ``None`` if it isn't there."""
         if reference is None:
             return None
-        for account in self:
-            if account.reference == reference:
-                return account
+        self._ensure_indexes()
+        accounts = self._reference2accounts.get(reference)
+        return accounts[0] if accounts else None
 
     def has_multiple_currencies(self):
         """Returns whether there's at least one account with a different currency.
@@ -231,10 +317,23 @@ class AccountList(list):
         """
         return new_name(base_name, self.find)
 
+    def reindex(self, account):
+        """Updates our indexes after a change to the name, account number or reference of
+        ``account``.
+
+        Does nothing if ``account`` isn't in the list.
+        """
+        if self._indexed is not None and account in self._indexed:
+            self._unindex(account)
+            self._index(account)
+
     def remove(self, account):
         """Removes ``account`` from the list."""
         list.remove(self, account)
         self.auto_created.discard(account)
+        if self._indexed is not None:
+            self._unindex(account)
+            del self._order[account]
 
     def set_account_name(self, account, new_name):
         """Rename ``account`` to ``new_name``.
@@ -247,6 +346,12 @@ class AccountList(list):
         if (other is not None) and (other is not account):
             raise DuplicateAccountNameError()
         account.name = new_name.strip()
+        self.reindex(account)
+
+    def set_account_number(self, account, account_number):
+        """Sets the account number of ``account`` to ``account_number``."""
+        account.account_number = account_number
+        self.reindex(account)
 
 
 class GroupList(list):
@@ -6,10 +6,94 @@
 # which should be included with this package. The terms are also available at 
 # http://www.gnu.org/licenses/gpl-3.0.html
 
+from bisect import bisect_left, insort
+
 from hscommon.util import dedupe
 
 from .sort import sort_string
 
+class CompletionIndex:
+    """Completion candidates, ranked by modification time.
+
+    Values come from keys (transactions, for example) that each give them a modification time. A
+    value's rank is the latest of those times. When values are added or removed, we update our
+    index instead of computing it again.
+
+    Values are kept sorted by the :func:`.sort_string` of their stripped form so that finding those
+    that complete a partial value doesn't require going through all of them.
+    """
+    def __init__(self):
+        # {value: {key: mtime}}
+        self._value2keys = {}
+        # {value: latest mtime of its keys}
+        self._value2mtime = {}
+        # {value: sequence number}. When two values have the same mtime, the one we saw first
+        # comes first.
+        self._value2seq = {}
+        self._last_seq = 0
+        # Sorted list of (normalized value, value)
+        self._sorted = []
+        # All values in rank order. None until we need it.
+        self._ranked = None
+
+    # --- Private
+    def _rank(self, values):
+        return sorted(values, key=lambda v: (-self._value2mtime[v], self._value2seq[v]))
+
+    # --- Public
+    def add(self, value, key, mtime):
+        """Adds ``value`` as coming from ``key`` modified at ``mtime``."""
+        keys = self._value2keys.get(value)
+        if keys is None:
+            keys = self._value2keys[value] = {}
+            self._last_seq += 1
+            self._value2seq[value] = self._last_seq
+            insort(self._sorted, (sort_string(value.strip()), value))
+        keys[key] = mtime
+        self._value2mtime[value] = max(mtime, self._value2mtime.get(value, mtime))
+        self._ranked = None
+
+    def remove(self, value, key):
+        """Removes ``value`` as coming from ``key``.
+
+        Once no key gives us ``value``, it's not a candidate anymore.
+        """
+        keys = self._value2keys[value]
+        mtime = keys.pop(key)
+        if not keys:
+            del self._value2keys[value]
+            del self._value2mtime[value]
+            del self._value2seq[value]
+            index = bisect_left(self._sorted, (sort_string(value.strip()), value))
+            del self._sorted[index]
+        elif mtime == self._value2mtime[value]:
+            self._value2mtime[value] = max(keys.values())
+        self._ranked = None
+
+    def complete(self, partial):
+        """Returns values that ``partial`` can be completed to, most recent first.
+
+        Like in :class:`CompletionList`, values are compared to ``partial`` in their
+        :func:`.sort_string` form, without leading and trailing whitespace.
+        """
+        partial = sort_string(partial)
+        result = []
+        index = bisect_left(self._sorted, (partial, ))
+        while index < len(self._sorted):
+            normalized, value = self._sorted[index]
+            if not normalized.startswith(partial):
+                break
+            result.append(value)
+            index += 1
+        return self._rank(result)
+
+    def values(self):
+        """Returns a list of all values, most recent first."""
+        if self._ranked is None:
+            self._ranked = self._rank(self._value2keys)
+        return self._ranked[:]
+
+
 class CompletionList:
     def __init__(self, partial, candidates):
         """Build a completion list.
@@ -11,6 +11,8 @@ easily figure out their exchange value.
 """
 
 import os
+import bisect
+from array import array
 from datetime import datetime, date, timedelta
 import logging
 import sqlite3 as sqlite
@@ -142,6 +144,23 @@ class Currency:
         else:
             return self.get_rates_db().get_rate(date, self.code, currency.code)
 
+    def values_in(self, currency, dates):
+        """Returns a list of the values of this currency in ``currency`` for each of ``dates``.
+
+        Same as calling :meth:`value_in` for each date, but rates are fetched with a single call to
+        :meth:`RatesDB.get_rates`.
+        """
+        def fixed_rate(date):
+            if self.start_date is not None and date < self.start_date:
+                return self.start_rate
+            elif self.stop_date is not None and date > self.stop_date:
+                return self.latest_rate
+
+        fixed_rates = [fixed_rate(d) for d in dates]
+        db_dates = [d for d, rate in zip(dates, fixed_rates) if rate is None]
+        db_rates = iter(self.get_rates_db().get_rates(db_dates, self.code, currency.code))
+        return [next(db_rates) if rate is None else rate for rate in fixed_rates]
+
     def set_CAD_value(self, value, date):
         """Sets the currency's value in CAD on the given date."""
         self.get_rates_db().set_CAD_value(date, self.code, value)
@@ -161,14 +180,84 @@ CAD = Currency.register('CAD', 'Canadian dollar', latest_rate=1)
 def date2str(date):
     return '%d%02d%02d' % (date.year, date.month, date.day)
 
+def str2ordinal(str_date):
+    return date(int(str_date[:4]), int(str_date[4:6]), int(str_date[6:8])).toordinal()
+
+class RateTable:
+    """In-memory copy of the CAD values of a currency in :class:`RatesDB`.
+
+    Values are kept in a dense ``array``, one per day from the first rate we have to the last one.
+    Days without a rate hold the value of the nearest previous rate. Dates before our first rate
+    get the first rate and dates after our last rate get the last one. This is the same seek logic
+    as the one :meth:`RatesDB.get_rate` has always had, but without the SQL queries.
+
+    :param rows: A list of ``(date_ordinal, rate)``, sorted by date.
+    """
+    def __init__(self, rows=()):
+        #: Ordinals of the dates for which we have an actual rate.
+        self.dates = array('l')
+        self._start = None
+        self._values = array('d')
+        for ordinal, rate in rows:
+            self.set(ordinal, rate)
+
+    def __bool__(self):
+        return bool(self.dates)
+
+    def get(self, ordinal):
+        """Returns the rate at ``ordinal``, or ``None`` if we have no rate at all."""
+        if not self.dates:
+            return None
+        index = ordinal - self._start
+        if index < 0:
+            return self._values[0]
+        elif index >= len(self._values):
+            return self._values[-1]
+        else:
+            return self._values[index]
+
+    def has_rate(self, ordinal):
+        """Returns whether we have an actual (not seeked) rate at ``ordinal``."""
+        index = bisect.bisect_left(self.dates, ordinal)
+        return index < len(self.dates) and self.dates[index] == ordinal
+
+    def set(self, ordinal, rate):
+        """Sets the rate at ``ordinal``, updating only the days that depend on it."""
+        if not self.dates:
+            self.dates.append(ordinal)
+            self._start = ordinal
+            self._values = array('d', [rate])
+        elif ordinal < self._start:
+            self.dates.insert(0, ordinal)
+            self._values = array('d', [rate]) * (self._start - ordinal) + self._values
+            self._start = ordinal
+        elif ordinal > self.dates[-1]:
+            last_rate = self._values[-1]
+            self.dates.append(ordinal)
+            self._values.extend(array('d', [last_rate]) * (ordinal - self._start - len(self._values)))
+            self._values.append(rate)
+        else:
+            index = bisect.bisect_left(self.dates, ordinal)
+            if self.dates[index] != ordinal:
+                self.dates.insert(index, ordinal)
+            if index + 1 < len(self.dates):
+                span_end = self.dates[index + 1] - self._start
+            else:
+                span_end = len(self._values)
+            span_start = ordinal - self._start
+            self._values[span_start:span_end] = array('d', [rate]) * (span_end - span_start)
+
 class RatesDB:
     """Stores exchange rates for currencies.
 
     The currencies are identified with ISO 4217 code (USD, CAD, EUR, etc.).
     The rates are represented as float and represent the value of the currency in CAD.
+
+    Rates of a currency are loaded from the database in a :class:`RateTable` the first time they're
+    needed and that table is kept up to date by :meth:`set_CAD_value`.
     """
     def __init__(self, db_or_path=':memory:', async=True):
-        self._cache = {} # {(date, currency): CAD value
+        self._tables = {} # currency code: RateTable
         self.db_or_path = db_or_path
         if isinstance(db_or_path, str):
             self.con = sqlite.connect(str(db_or_path))
@@ -179,6 +268,7 @@ class RatesDB:
         self.async = async
         self._fetched_values = Queue()
         self._fetched_ranges = {} # a currency --> (start, end) map
+        self._revision = 0
 
     def _execute(self, *args, **kwargs):
         def create_tables():
@@ -208,18 +298,25 @@ class RatesDB:
             create_tables()
         return self.con.execute(*args, **kwargs) # try again
 
-    def _seek_value_in_CAD(self, str_date, currency_code):
-        if currency_code == 'CAD':
-            return 1
+    def _get_table(self, currency_code):
+        table = self._tables.get(currency_code)
+        if table is None:
+            sql = "select date, rate from rates where currency = ? order by date"
+            cur = self._execute(sql, [currency_code])
+            rows = [(str2ordinal(str_date), rate) for str_date, rate in cur]
+            table = self._tables[currency_code] = RateTable(rows)
+        return table
 
-        def seek(date_op, desc):
-            sql = "select rate from rates where date %s ? and currency = ? order by date %s limit 1" % (date_op, desc)
-            cur = self._execute(sql, [str_date, currency_code])
-            row = cur.fetchone()
-            if row:
-                return row[0]
+    def _seek_values_in_CAD(self, ordinals, currency_code):
+        if currency_code == 'CAD':
+            return [1] * len(ordinals)
+        table = self._get_table(currency_code)
+        if not table:
+            return [Currency(currency_code).latest_rate] * len(ordinals)
+        return [table.get(ordinal) for ordinal in ordinals]
 
-        return seek('<=', 'desc') or seek('>=', '') or Currency(currency_code).latest_rate
+    def _seek_value_in_CAD(self, ordinal, currency_code):
+        return self._seek_values_in_CAD([ordinal], currency_code)[0]
 
     def _ensure_filled(self, date_start, date_end, currency_code):
         """Make sure that the cache contains *something* for each of the dates in the range.
@@ -232,11 +329,10 @@ class RatesDB:
         # provider gives it to us.
         if date_end >= date.today():
             date_end = date.today() - timedelta(1)
-        sql = "select rate from rates where date = ? and currency = ?"
+        table = self._get_table(currency_code)
         for curdate in iterdaterange(date_start, date_end):
-            cur = self._execute(sql, [date2str(curdate), currency_code])
-            if cur.fetchone() is None:
-                nearby_rate = self._seek_value_in_CAD(date2str(curdate), currency_code)
+            if not table.has_rate(curdate.toordinal()):
+                nearby_rate = self._seek_value_in_CAD(curdate.toordinal(), currency_code)
                 self.set_CAD_value(curdate, currency_code, nearby_rate)
                 logging.debug("Filled currency void for %s at %s (value: %2.2f)", currency_code, curdate, nearby_rate)
 
@@ -257,7 +353,7 @@ class RatesDB:
                 break
 
     def clear_cache(self):
-        self._cache = {}
+        self._tables = {}
 
     def date_range(self, currency_code):
         """Returns (start, end) of the cached rates for currency.
@@ -282,39 +378,32 @@ class RatesDB:
         The rate of the nearest date that is smaller than 'date' is returned. If
         there is none, a seek for a rate with a higher date will be made.
         """
+        return self.get_rates([date], currency1_code, currency2_code)[0]
+
+    def get_rates(self, dates, currency1_code, currency2_code):
+        """Returns a list of the exchange rates between currency1 and currency2 for each of ``dates``.
+
+        Same as calling :meth:`get_rate` for each date, but faster when there are many dates.
+        """
         # We want to check self._fetched_values for rates to add.
         if not self._fetched_values.empty():
             self._save_fetched_rates()
-        # This method is a bottleneck and has been optimized for speed.
-        value1 = None
-        value2 = None
-        if currency1_code == 'CAD':
-            value1 = 1
-        else:
-            value1 = self._cache.get((date, currency1_code))
-        if currency2_code == 'CAD':
-            value2 = 1
-        else:
-            value2 = self._cache.get((date, currency2_code))
-        if value1 is None or value2 is None:
-            str_date = date2str(date)
-            if value1 is None:
-                value1 = self._seek_value_in_CAD(str_date, currency1_code)
-                self._cache[(date, currency1_code)] = value1
-            if value2 is None:
-                value2 = self._seek_value_in_CAD(str_date, currency2_code)
-                self._cache[(date, currency2_code)] = value2
-        return value1 / value2
+        ordinals = [d.toordinal() for d in dates]
+        values1 = self._seek_values_in_CAD(ordinals, currency1_code)
+        values2 = self._seek_values_in_CAD(ordinals, currency2_code)
+        return [value1 / value2 for value1, value2 in zip(values1, values2)]
 
     def set_CAD_value(self, date, currency_code, value):
         """Sets the daily value in CAD for currency at date"""
-        # we must clear the whole cache because there might be other dates affected by this change
-        # (dates when the currency server has no rates).
-        self.clear_cache()
         str_date = date2str(date)
         sql = "replace into rates(date, currency, rate) values(?, ?, ?)"
         self._execute(sql, [str_date, currency_code, value])
         self.con.commit()
+        # Only the rates of this currency following date (and until its next rate) are affected.
+        table = self._tables.get(currency_code)
+        if table is not None:
+            table.set(date.toordinal(), value)
+        self._revision += 1
 
     def register_rate_provider(self, rate_provider):
         """Adds `rate_provider` to the list of providers supported by this DB.
@@ -397,6 +486,17 @@ class RatesDB:
         else:
             do()
 
+    @property
+    def revision(self):
+        """Number that changes whenever rates change.
+
+        Rates that were fetched in the background are saved first, so that a revision always
+        reflects the rates :meth:`get_rates` returns.
+        """
+        if not self._fetched_values.empty():
+            self._save_fetched_rates()
+        return self._revision
+
 def initialize_db(path):
     """Initialize the app wide currency db if not already initialized."""
     ratesdb = RatesDB(str(path))
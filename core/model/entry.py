@@ -8,11 +8,12 @@
 
 import bisect
 import datetime
+from array import array
 from collections import defaultdict, Sequence
 from itertools import takewhile
 
 from hscommon.util import flatten
-from .amount import convert_amount, same_currency
+from .amount import Amount, convert_amount, convert_amounts, same_currency
 
 class Entry:
     """Wrapper around a :class:`.Split` to show in an :class:`.Account` ledger.
@@ -27,6 +28,8 @@ class Entry:
     Most entries are created by the :class:`.Oven`, which does the necessary calculations to compute
     running total information that the entry needs on init.
     """
+    __slots__ = ['split', 'amount', 'balance', 'reconciled_balance', 'balance_with_budget', 'index']
+
     def __init__(self, split, amount, balance, reconciled_balance, balance_with_budget):
         #: The :class:`.Split` our entry wraps.
         self.split = split
@@ -159,6 +162,9 @@ class EntryList(Sequence):
     The main roles of this class is to manage entry order as well as managing "last entries" to be
     able to easily answer questions like "What's the running total of the last entry at date X?"
 
+    This list holds :class:`Entry` instances directly. :class:`ColumnarEntryList`, which is what
+    accounts use, has the same interface with a more compact storage.
+
     :param account: :class:`.Account` for which we manage entries.
     """
     def __init__(self, account):
@@ -190,13 +196,23 @@ class EntryList(Sequence):
             return 0
 
     def _cash_flow(self, date_range, currency):
-        cache = self._date2entries
-        entries = flatten(cache[date] for date in date_range if date in cache)
+        dates = self._sorted_entry_dates
+        start = bisect.bisect_left(dates, date_range.start)
+        end = bisect.bisect_right(dates, date_range.end)
+        entries = flatten(self._date2entries[date] for date in dates[start:end])
         entries = (e for e in entries if not getattr(e.transaction, 'is_budget', False))
         amounts = (convert_amount(e.amount, currency, e.date) for e in entries)
         return sum(amounts)
 
     # --- Public
+    def add(self, split, amount, balance, reconciled_balance, balance_with_budget):
+        """Add an entry for ``split`` to the list.
+
+        Arguments are the same as :class:`Entry`'s. Like :meth:`add_entry`, calls must *always* be
+        made in order. This is what the :class:`.Oven` calls.
+        """
+        self.add_entry(Entry(split, amount, balance, reconciled_balance, balance_with_budget))
+
     def add_entry(self, entry):
         """Add ``entry`` to the list.
 
@@ -222,6 +238,20 @@ class EntryList(Sequence):
         """
         return self._balance('balance', date, currency=currency)
 
+    def balance_changes(self, date_range):
+        """Yields ``(date, balance)`` for each date of ``date_range`` having entries.
+
+        ``balance`` is the running balance at the end of that day, what :meth:`balance` would
+        return for ``date``. Between those dates, the balance doesn't change.
+
+        :param date_range: :class:`.DateRange`
+        """
+        dates = self._sorted_entry_dates
+        start = bisect.bisect_left(dates, date_range.start)
+        end = bisect.bisect_right(dates, date_range.end)
+        for date in dates[start:end]:
+            yield date, self._date2entries[date][-1].balance
+
     def balance_of_reconciled(self):
         """Returns :attr:`Entry.reconciled_balance` for our last reconciled entry."""
         entry = self._last_reconciled
@@ -303,3 +333,222 @@ class EntryList(Sequence):
         cash_flow = self.cash_flow(date_range, currency)
         return self.account.normalize_amount(cash_flow)
 
+
+
+class AmountColumn:
+    """Compact storage for a list of amounts, used by :class:`ColumnarEntryList`.
+
+    As long as all non-zero amounts we're given are of the same currency, we store them as their
+    shifted (integer) values in an ``array``. Zero amounts are stored as ``0`` and come back as
+    ``0``. If we're ever given an amount in another currency, we fall back to a plain list of
+    amounts.
+    """
+    def __init__(self):
+        self.currency = None
+        self._values = array('q')
+        self._amounts = None
+
+    def __getitem__(self, index):
+        if self._amounts is not None:
+            return self._amounts[index]
+        value = self._values[index]
+        if value:
+            return Amount(value, self.currency, _value_is_shifted=True)
+        else:
+            return 0
+
+    def __len__(self):
+        if self._amounts is not None:
+            return len(self._amounts)
+        return len(self._values)
+
+    def append(self, amount):
+        if self._amounts is None:
+            if not amount:
+                self._values.append(0)
+                return
+            if self.currency is None:
+                self.currency = amount.currency
+            if amount.currency == self.currency:
+                self._values.append(amount._shifted_value)
+                return
+            self._amounts = [self[i] for i in range(len(self._values))]
+            self._values = array('q')
+        self._amounts.append(amount)
+
+    def truncate(self, length):
+        """Removes all amounts from ``length`` onwards."""
+        if self._amounts is not None:
+            del self._amounts[length:]
+            if not self._amounts:
+                self._amounts = None
+        else:
+            del self._values[length:]
+        if not len(self):
+            self.currency = None
+
+
+class ColumnarEntryList(EntryList):
+    """An :class:`EntryList` keeping its data in columns rather than in :class:`Entry` instances.
+
+    Entry dates are kept as ordinals in an ``array`` and running balances are kept in
+    :class:`AmountColumn`. Because balances are running totals, they're prefix sums of our entries'
+    amounts, which means that balance lookups at a specific date are a simple bisect in our dates.
+
+    Cash flows are answered the same way. For each currency we're asked a cash flow in, we keep a
+    column of cumulative non-budget amounts converted in that currency, so that the cash flow of
+    any date range is the difference of two prefix sums. These columns are built lazily: entries
+    are only converted the first time a cash flow in that currency is asked after they're added.
+
+    :class:`Entry` instances are only created when they're asked for (through ``__getitem__``,
+    iteration or :meth:`last_entry`). Two entries created for the same index are equal, but not
+    identical.
+
+    This is the entry list used by :class:`.Account`.
+    """
+    def __init__(self, account):
+        EntryList.__init__(self, account)
+        self._splits = []
+        self._amounts = []
+        self._dates = array('l')
+        self._balances = AmountColumn()
+        self._reconciled_balances = AmountColumn()
+        self._balances_with_budget = AmountColumn()
+        self._last_reconciled_key = None
+        # currency: array of cumulative shifted amounts (see _flow_column())
+        self._flows = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self._entry(index) for index in range(*key.indices(len(self)))]
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError("entry index out of range")
+        return self._entry(key)
+
+    def __len__(self):
+        return len(self._splits)
+
+    # --- Private
+    def _balance(self, balance_attr, date=None, currency=None):
+        column = {
+            'balance': self._balances,
+            'balance_with_budget': self._balances_with_budget,
+        }[balance_attr]
+        index = self._last_index(date)
+        if index < 0:
+            return 0
+        balance = column[index]
+        if currency:
+            return convert_amount(balance, currency, date)
+        else:
+            return balance
+
+    def _cash_flow(self, date_range, currency):
+        start = bisect.bisect_left(self._dates, date_range.start.toordinal())
+        end = bisect.bisect_right(self._dates, date_range.end.toordinal())
+        if start == end:
+            return 0
+        column = self._flow_column(currency)
+        value = column[end - 1] - (column[start - 1] if start else 0)
+        return Amount(value, currency, _value_is_shifted=True) if value else 0
+
+    def _flow_column(self, currency):
+        # Returns, for each entry, the sum of all non-budget amounts up to (and including) that
+        # entry, converted to ``currency`` and shifted. Entries that were added since our last call
+        # are converted now.
+        column = self._flows.get(currency)
+        if column is None:
+            column = self._flows[currency] = array('q')
+        total = column[-1] if column else 0
+        indexes = range(len(column), len(self))
+        dates = [datetime.date.fromordinal(self._dates[index]) for index in indexes]
+        amounts = convert_amounts([self._amounts[index] for index in indexes], currency, dates)
+        for index, amount in zip(indexes, amounts):
+            if amount and not getattr(self._splits[index].transaction, 'is_budget', False):
+                total += amount._shifted_value
+            column.append(total)
+        return column
+
+    def _entry(self, index):
+        entry = Entry(
+            self._splits[index], self._amounts[index], self._balances[index],
+            self._reconciled_balances[index], self._balances_with_budget[index]
+        )
+        entry.index = index
+        return entry
+
+    def _last_index(self, date=None):
+        # Index of the last entry with a date that isn't after ``date``. -1 if there's none.
+        if date is None:
+            return len(self) - 1
+        return bisect.bisect_right(self._dates, date.toordinal()) - 1
+
+    def _reconciliation_key(self, index):
+        # Same as Entry.reconciliation_key, but without having to create the entry.
+        split = self._splits[index]
+        recdate = split.reconciliation_date
+        if recdate is None:
+            recdate = datetime.date.min
+        return (recdate, self._dates[index], split.transaction.position, index)
+
+    # --- Public
+    def add(self, split, amount, balance, reconciled_balance, balance_with_budget):
+        index = len(self)
+        self._splits.append(split)
+        self._amounts.append(amount)
+        self._dates.append(split.transaction.date.toordinal())
+        self._balances.append(balance)
+        self._reconciled_balances.append(reconciled_balance)
+        self._balances_with_budget.append(balance_with_budget)
+        key = self._reconciliation_key(index)
+        if self._last_reconciled_key is None or key >= self._last_reconciled_key:
+            self._last_reconciled_key = key
+
+    def add_entry(self, entry):
+        self.add(
+            entry.split, entry.amount, entry.balance, entry.reconciled_balance,
+            entry.balance_with_budget
+        )
+
+    def balance_changes(self, date_range):
+        dates = self._dates
+        start = bisect.bisect_left(dates, date_range.start.toordinal())
+        end = bisect.bisect_right(dates, date_range.end.toordinal())
+        for index in range(start, end):
+            if index + 1 < end and dates[index + 1] == dates[index]:
+                continue
+            yield datetime.date.fromordinal(dates[index]), self._balances[index]
+
+    def balance_of_reconciled(self):
+        if self._last_reconciled_key is None:
+            return 0
+        return self._reconciled_balances[self._last_reconciled_key[-1]]
+
+    def clear(self, from_date):
+        if from_date is None:
+            index = 0
+        else:
+            index = bisect.bisect_left(self._dates, from_date.toordinal())
+        del self._splits[index:]
+        del self._amounts[index:]
+        del self._dates[index:]
+        self._balances.truncate(index)
+        self._reconciled_balances.truncate(index)
+        self._balances_with_budget.truncate(index)
+        for column in self._flows.values():
+            del column[index:]
+        if self._splits:
+            for date_range, currency in list(self._daterange2cashflow.keys()):
+                if date_range.end >= from_date:
+                    del self._daterange2cashflow[(date_range, currency)]
+            self._last_reconciled_key = max(self._reconciliation_key(i) for i in range(len(self)))
+        else:
+            self._daterange2cashflow = {}
+            self._flows = {}
+            self._last_reconciled_key = None
+
+    def last_entry(self, date=None):
+        index = self._last_index(date)
+        return self._entry(index) if index >= 0 else None
@@ -6,16 +6,29 @@
 # which should be included with this package. The terms are also available at
 # http://www.gnu.org/licenses/gpl-3.0.html
 
+from bisect import bisect_right
 from collections import defaultdict
 from datetime import date
-from itertools import dropwhile
 from operator import attrgetter
 
 from hscommon.util import flatten
 
-from .amount import convert_amount
-from .entry import Entry
+from .amount import convert_amounts
 from .budget import BudgetSpawn
+from .recurrence import Spawn
+
+def _add_stamp(stamps, from_date, revision):
+    # ``stamps`` is a list of (from_date, revision) with increasing dates and revisions. A newer stamp
+    # hides those from the same date or later.
+    while stamps and stamps[-1][0] >= from_date:
+        stamps.pop()
+    stamps.append((from_date, revision))
+
+def _revision_until(stamps, until_date):
+    if until_date is None:
+        return stamps[-1][1] if stamps else 0
+    index = bisect_right(stamps, (until_date, float('inf')))
+    return stamps[index - 1][1] if index else 0
 
 class Oven:
     """Computes raw data from transactions, schedules, budgets.
@@ -27,7 +40,17 @@ class Oven:
        app to display transactions and account entries.
     2. Creates :class:`.Entry` instances to place in :attr:`.Account.entries`. These entries contain
        running totals for each account (which is, of course, calculated).
+
+    Cooking can be scoped to a set of accounts (see :meth:`cook`). When
+    :attr:`VERIFY_INCREMENTAL_COOKING` is true, every scoped cook is followed by a full cook and the
+    results are compared. This is slow and is only meant to be enabled in tests.
+
+    Every cook increments our :meth:`revision`, which tells views whether what they computed from
+    our cooked data is still valid.
     """
+    #: When true, scoped cooks are verified against a full cook. Used in tests.
+    VERIFY_INCREMENTAL_COOKING = False
+
     def __init__(self, accounts, transactions, scheduled, budgets):
         self._accounts = accounts
         self._transactions = transactions
@@ -37,13 +60,21 @@ class Oven:
         #: List of cooked transactions, containing :class:`.Transaction` instances mixed with
         #: schedule and budget :class:`.Spawn` instances (in date/position order).
         self.transactions = []
+        self._revision = 0
+        # (from_date, revision) stamps of our cooks. See _add_stamp() and revision().
+        self._stamps = []
+        self._full_cook_stamps = []
+        self._account_stamps = defaultdict(list)
 
     def _budget_spawns(self, until_date, schedule_spawns):
         if not self._budgets:
             return []
         result = []
-        ref_date = min(b.start_date for b in self._budgets)
-        relevant_txns = list(dropwhile(lambda t: t.date < ref_date, self._transactions)) + schedule_spawns
+        # Schedule spawns aren't in our transaction list, so we index them by account ourselves.
+        account2spawns = defaultdict(set)
+        for spawn in schedule_spawns:
+            for account in spawn.affected_accounts():
+                account2spawns[account].add(spawn)
         # It's possible to have 2 budgets overlapping in date range and having the same account
         # When it happens, we need to keep track of which budget "consume" which txns
         account2consumedtxns = defaultdict(set)
@@ -51,6 +82,8 @@ class Oven:
             if not budget.amount:
                 continue
             consumedtxns = account2consumedtxns[budget.account]
+            relevant_txns = self._transactions.transactions_for_account(budget.account)
+            relevant_txns |= account2spawns[budget.account]
             spawns = budget.get_spawns(until_date, relevant_txns, consumedtxns)
             spawns = [spawn for spawn in spawns if not spawn.is_null]
             result += spawns
@@ -78,14 +111,64 @@ class Oven:
         balance = entries.balance()
         balance_with_budget = entries.balance_with_budget()
         split2reconciledbal = self._cook_reconciliation_balances(splits, entries.balance_of_reconciled())
-        for split in splits:
-            amount = split.amount
-            converted_amount = convert_amount(amount, account.currency, split.transaction.date)
+        amounts = [split.amount for split in splits]
+        dates = [split.transaction.date for split in splits]
+        converted_amounts = convert_amounts(amounts, account.currency, dates)
+        for split, amount, converted_amount in zip(splits, amounts, converted_amounts):
             balance_with_budget += converted_amount
             if not isinstance(split.transaction, BudgetSpawn):
                 balance += converted_amount
             reconciled_balance = split2reconciledbal[split]
-            entries.add_entry(Entry(split, amount, balance, reconciled_balance, balance_with_budget))
+            entries.add(split, amount, balance, reconciled_balance, balance_with_budget)
+
+    def _cooked_state(self):
+        # Returns a comparable representation of our cooked data. Used by cooking verification.
+        accounts = [
+            (account, [
+                (e.split, e.amount, e.balance, e.reconciled_balance, e.balance_with_budget)
+                for e in account.entries
+            ])
+            for account in self._accounts
+        ]
+        return accounts, list(self.transactions)
+
+    def _spawn_changes(self, spawns):
+        # Spawns are re-created when their recurrence (or budget) changes, and budget spawns have
+        # their splits replaced when their amount change. We compare our previously cooked spawns
+        # and their splits with the new ones and return ``(accounts, min_date)`` for those that
+        # changed. ``min_date`` is ``None`` if nothing changed.
+        old_spawns = {t for t in self.transactions if isinstance(t, Spawn)}
+        old_splits = {s for t in old_spawns for s in t.splits}
+        new_splits = {s for t in spawns for s in t.splits}
+        changed_splits = old_splits ^ new_splits
+        changed_spawns = (old_spawns ^ set(spawns)) | {s.transaction for s in changed_splits}
+        accounts = {s.account for s in changed_splits if s.account is not None}
+        min_date = min((t.date for t in changed_spawns), default=None)
+        return accounts, min_date
+
+    def _verify_incremental_cook(self, until_date):
+        incremental = self._cooked_state()
+        self._cook(date.min, until_date, None)
+        if self._cooked_state() != incremental:
+            raise AssertionError("Scoped cooking yields different results than full cooking")
+
+    def revision(self, account=None, until_date=None):
+        """Returns the revision of our cooked data.
+
+        It's the revision of the last cook that changed entries of ``account`` (or anything, if
+        ``None``) at or before ``until_date`` (or at any date, if ``None``). It's ``0`` if there was
+        no such cook. Revisions only go up.
+
+        :param account: :class:`.Account`
+        :param until_date: ``datetime.date``
+        :rtype: int
+        """
+        if account is None:
+            return _revision_until(self._stamps, until_date)
+        return max(
+            _revision_until(self._full_cook_stamps, until_date),
+            _revision_until(self._account_stamps.get(account, []), until_date),
+        )
 
     def continue_cooking(self, until_date):
         """Cooks from where we stop last time until ``until_date``.
@@ -98,7 +181,7 @@ class Oven:
         if until_date > self._cooked_until:
             self.cook(self._cooked_until, until_date)
 
-    def cook(self, from_date=None, until_date=None):
+    def cook(self, from_date=None, until_date=None, accounts=None):
         """Cooks raw data into :attr:`transactions`.
 
         :param from_date: when set, saves calculation time by re-using existing cooked transactions.
@@ -107,32 +190,63 @@ class Oven:
                            cooking. If we don't, we might end up in an infinite loop. If not set,
                            will be the date of the transaction with the highest date.
         :type until_date: ``datetime.date``
+        :param accounts: when set (along with ``from_date``), only entries of these accounts are
+                         re-cooked. It has to contain all accounts that were referenced by changed
+                         transactions, before and after the change. Accounts affected by changes
+                         in schedule and budget spawns are found automatically. If we can't cook
+                         incrementally (for example, because ``until_date`` moved), we perform a
+                         full cook.
+        :type accounts: set of :class:`.Account`
         """
-        # Determine from/until dates
+        from_date, accounts = self._cook(from_date, until_date, accounts)
+        self._revision += 1
+        _add_stamp(self._stamps, from_date, self._revision)
+        if accounts is None:
+            if from_date == date.min:
+                self._account_stamps.clear()
+            _add_stamp(self._full_cook_stamps, from_date, self._revision)
+        else:
+            for account in accounts:
+                _add_stamp(self._account_stamps[account], from_date, self._revision)
+        if accounts is not None and self.VERIFY_INCREMENTAL_COOKING:
+            self._verify_incremental_cook(self._cooked_until)
+
+    def _cook(self, from_date, until_date, accounts):
+        # Does the cooking of cook() and returns the (from_date, accounts) that were actually cooked.
         if from_date is None:
             from_date = date.min
-        else:
+        self._transactions.sort(key=attrgetter('date', 'position')) # needed in case until_date is None
+        if until_date is None:
+            until_date = self._transactions[-1].date if self._transactions else from_date
+        if from_date == date.min or until_date != self._cooked_until:
+            accounts = None
+        spawns = flatten(recurrence.get_spawns(until_date) for recurrence in self._scheduled)
+        spawns += self._budget_spawns(until_date, spawns)
+        if accounts is not None:
+            spawn_accounts, spawn_min_date = self._spawn_changes(spawns)
+            accounts = set(accounts) | spawn_accounts
+            if spawn_min_date is not None:
+                from_date = min(from_date, spawn_min_date)
+        if from_date > date.min:
             # it's possible that we have to reduce from_date a bit. If a split from before as a
             # reconciled date >= from_date, we have to set from_date to that split's normal date
             # We reverse the transactions to correctly detect chained overlappings in date/recdate
             splits = flatten(t.splits for t in reversed(self.transactions)) # splits from *cooked* txns
+            if accounts is not None:
+                splits = (s for s in splits if s.account in accounts)
             for split in splits:
                 rdate = split.reconciliation_date
                 if rdate is not None and rdate >= from_date:
                     from_date = min(from_date, split.transaction.date)
-        self._transactions.sort(key=attrgetter('date', 'position')) # needed in case until_date is None
-        if until_date is None:
-            until_date = self._transactions[-1].date if self._transactions else from_date
         # Clear old cooked data
         for account in self._accounts:
-            account.entries.clear(from_date)
+            if accounts is None or account in accounts:
+                account.entries.clear(from_date)
         if from_date == date.min:
             self.transactions = []
         else:
             self.transactions = [t for t in self.transactions if t.date < from_date]
         # Cook
-        spawns = flatten(recurrence.get_spawns(until_date) for recurrence in self._scheduled)
-        spawns += self._budget_spawns(until_date, spawns)
         # To ensure that our sort order stay correct and consistent, we assign position values
         # to our spawns. To ensure that there's no overlap, we start our position counter at
         # len(transactions)
@@ -147,10 +261,10 @@ class Oven:
         account2splits = defaultdict(list)
         for split in splits:
             account = split.account
-            if account is not None:
+            if account is not None and (accounts is None or account in accounts):
                 account2splits[account].append(split)
         for account, splits in account2splits.items():
             self._cook_splits(account, splits)
         self.transactions += tocook
         self._cooked_until = until_date
-
+        return from_date, accounts
@@ -0,0 +1,135 @@
+# Copyright 2016 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+from bisect import bisect_left, bisect_right, insort
+
+from .amount import Amount
+
+class RangeIndex:
+    """Items indexed by a sortable key, for exact and range lookups.
+
+    Many items can have the same key. Keys are kept in a sorted list, so lookups don't go through
+    all items.
+    """
+    def __init__(self):
+        # Sorted list of our distinct keys
+        self._keys = []
+        # {key: set of items}
+        self._key2items = {}
+
+    def __bool__(self):
+        return bool(self._keys)
+
+    def __contains__(self, key):
+        return key in self._key2items
+
+    # --- Public
+    def add(self, key, item):
+        """Adds ``item`` under ``key``."""
+        items = self._key2items.get(key)
+        if items is None:
+            items = self._key2items[key] = set()
+            insort(self._keys, key)
+        items.add(item)
+
+    def between(self, low, high):
+        """Returns a set of items with a key from ``low`` to ``high``, inclusively.
+
+        If ``low`` or ``high`` is ``None``, the range is open on that side.
+        """
+        start = 0 if low is None else bisect_left(self._keys, low)
+        end = len(self._keys) if high is None else bisect_right(self._keys, high)
+        result = set()
+        for key in self._keys[start:end]:
+            result |= self._key2items[key]
+        return result
+
+    def get(self, key):
+        """Returns a set of items with ``key``."""
+        return set(self._key2items.get(key, ()))
+
+    def remove(self, key, item):
+        """Removes ``item`` from ``key``.
+
+        Raises ``KeyError`` if it isn't there.
+        """
+        items = self._key2items[key]
+        items.remove(item)
+        if not items:
+            del self._key2items[key]
+            del self._keys[bisect_left(self._keys, key)]
+
+
+class AmountIndex:
+    """Items indexed by :class:`.Amount`, by currency.
+
+    Amounts are compared by their ``value``, like amount searches do. Zero amounts, which might
+    not have a currency, are indexed with a ``None`` currency and are found with any currency.
+
+    If ``absolute`` is true, amounts are indexed without their sign.
+    """
+    def __init__(self, absolute=False):
+        self.absolute = absolute
+        # {currency: RangeIndex}
+        self._currency2index = {}
+
+    # --- Private
+    def _key(self, amount):
+        if not amount:
+            return None, 0
+        value = amount.value
+        return amount.currency, abs(value) if self.absolute else value
+
+    def _indexes(self, currency):
+        if currency is None:
+            return list(self._currency2index.values())
+        return [self._currency2index[c] for c in (currency, None) if c in self._currency2index]
+
+    # --- Public
+    def add(self, amount, item):
+        """Adds ``item`` under ``amount``."""
+        currency, value = self._key(amount)
+        index = self._currency2index.get(currency)
+        if index is None:
+            index = self._currency2index[currency] = RangeIndex()
+        index.add(value, item)
+
+    def between(self, low, high, currency=None):
+        """Returns a set of items with an amount value from ``low`` to ``high``, inclusively.
+
+        If ``currency`` is ``None``, amounts of all currencies are returned.
+
+        :param low: ``float``
+        :param high: ``float``
+        :param currency: :class:`.Currency`
+        """
+        result = set()
+        for index in self._indexes(currency):
+            result |= index.between(low, high)
+        return result
+
+    def near(self, amount, tolerance=0):
+        """Returns a set of items with an amount within ``tolerance`` of ``amount``.
+
+        Only amounts in the currency of ``amount`` (and zero amounts) are returned.
+
+        :param amount: :class:`.Amount`
+        :param tolerance: ``float``
+        """
+        currency = amount.currency if isinstance(amount, Amount) else None
+        _, value = self._key(amount)
+        return self.between(value - tolerance, value + tolerance, currency)
+
+    def remove(self, amount, item):
+        """Removes ``item`` from ``amount``.
+
+        Raises ``KeyError`` if it isn't there.
+        """
+        currency, value = self._key(amount)
+        index = self._currency2index[currency]
+        index.remove(value, item)
+        if not index:
+            del self._currency2index[currency]
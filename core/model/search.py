@@ -0,0 +1,217 @@
+# Copyright 2016 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+"""Search queries, as typed in the search field.
+
+A query string is compiled once by :func:`parse_query` into a tree of :class:`Query`, which can then
+be run against a :class:`.TransactionList` (using its indexes) or be checked against a single
+transaction.
+
+A query string is made of terms separated by the ``AND`` and ``OR`` operators, which can be
+preceded by ``NOT``. Operators have to be in uppercase and separated from terms by spaces, so that
+"bread and butter" stays a simple search. ``NOT`` binds tighter than ``AND``, which binds tighter
+than ``OR``. A term is either searched in all fields, or in the field that prefixes it (for example
+"payee: apple"). Amount and date terms can be ranges ("amount: 10..20", "date: 01/01/2016..").
+"""
+
+import re
+
+QUERY_FIELDS = ['account', 'group', 'amount', 'description', 'checkno', 'payee', 'memo']
+RE_OPERATOR = re.compile(r'\s+(AND|OR)\s+')
+RE_NOT = re.compile(r'NOT\s+')
+RE_TARGETED_SEARCH = re.compile(r'({}):(.*)'.format('|'.join(QUERY_FIELDS + ['date'])))
+
+class Query:
+    """Base class for search queries."""
+    def matches(self, transaction):
+        """Returns whether ``transaction`` matches the query."""
+        raise NotImplementedError()
+
+    def transactions(self, transaction_list, date_range=None):
+        """Returns the set of transactions of ``transaction_list`` matching the query.
+
+        If ``date_range`` (a :class:`.DateRange`) is set, only transactions in it are looked at.
+        """
+        raise NotImplementedError()
+
+
+class FieldQuery(Query):
+    """Matches transactions with any of the criteria of ``query``.
+
+    ``query`` is a dict of criteria as in :meth:`.Transaction.matches`.
+    """
+    def __init__(self, query):
+        self.query = query
+
+    def __repr__(self):
+        return '<FieldQuery %r>' % self.query
+
+    def matches(self, transaction):
+        return transaction.matches(self.query)
+
+    def transactions(self, transaction_list, date_range=None):
+        return transaction_list.matching(self.query, date_range=date_range)
+
+
+class DateQuery(Query):
+    """Matches transactions from ``start_date`` to ``end_date``, inclusively.
+
+    Either of them can be ``None``, for an open range.
+    """
+    def __init__(self, start_date, end_date):
+        self.start_date = start_date
+        self.end_date = end_date
+
+    def __repr__(self):
+        return '<DateQuery %r %r>' % (self.start_date, self.end_date)
+
+    def matches(self, transaction):
+        if self.start_date is not None and transaction.date < self.start_date:
+            return False
+        return self.end_date is None or transaction.date <= self.end_date
+
+    def transactions(self, transaction_list, date_range=None):
+        start_date, end_date = self.start_date, self.end_date
+        if date_range is not None:
+            start_date = date_range.start if start_date is None else max(start_date, date_range.start)
+            end_date = date_range.end if end_date is None else min(end_date, date_range.end)
+        return transaction_list.transactions_between(start_date, end_date)
+
+
+class AndQuery(Query):
+    """Matches transactions matching all of ``queries``."""
+    def __init__(self, queries):
+        self.queries = queries
+
+    def __repr__(self):
+        return '<AndQuery %r>' % self.queries
+
+    def matches(self, transaction):
+        return all(query.matches(transaction) for query in self.queries)
+
+    def transactions(self, transaction_list, date_range=None):
+        result = self.queries[0].transactions(transaction_list, date_range)
+        for query in self.queries[1:]:
+            if not result:
+                break
+            result &= query.transactions(transaction_list, date_range)
+        return result
+
+
+class OrQuery(Query):
+    """Matches transactions matching any of ``queries``."""
+    def __init__(self, queries):
+        self.queries = queries
+
+    def __repr__(self):
+        return '<OrQuery %r>' % self.queries
+
+    def matches(self, transaction):
+        return any(query.matches(transaction) for query in self.queries)
+
+    def transactions(self, transaction_list, date_range=None):
+        result = set()
+        for query in self.queries:
+            result |= query.transactions(transaction_list, date_range)
+        return result
+
+
+class NotQuery(Query):
+    """Matches transactions that don't match ``query``."""
+    def __init__(self, query):
+        self.query = query
+
+    def __repr__(self):
+        return '<NotQuery %r>' % self.query
+
+    def matches(self, transaction):
+        return not self.query.matches(transaction)
+
+    def transactions(self, transaction_list, date_range=None):
+        if date_range is None:
+            everything = set(transaction_list)
+        else:
+            everything = transaction_list.transactions_between(date_range.start, date_range.end)
+        return everything - self.query.transactions(transaction_list, date_range)
+
+
+def _parse_range(args, parse_func):
+    # Returns a (low, high) tuple from "low..high". Either side can be empty, giving None.
+    # Raises ValueError if a side can't be parsed or if there's no range.
+    if '..' not in args:
+        raise ValueError()
+    return tuple(parse_func(arg.strip()) if arg.strip() else None for arg in args.split('..', 1))
+
+def _parse_term(term, parse_amount, parse_date):
+    m = RE_NOT.match(term)
+    if m is not None:
+        return NotQuery(_parse_term(term[m.end():], parse_amount, parse_date))
+    term = term.strip().lower()
+    m = RE_TARGETED_SEARCH.match(term)
+    if m is not None:
+        qtype, qargs = m.groups()
+        qtypes = [qtype]
+        qargs = qargs.strip()
+    else:
+        qtypes = QUERY_FIELDS
+        qargs = term
+    if qtypes == ['date']:
+        try:
+            start_date, end_date = _parse_range(qargs, parse_date)
+        except ValueError:
+            try:
+                start_date = end_date = parse_date(qargs)
+            except ValueError:
+                # Invalid dates match nothing, like invalid amounts.
+                return FieldQuery({})
+        return DateQuery(start_date, end_date)
+    query = {}
+    for qtype in qtypes:
+        if qtype in {'account', 'group'}:
+            # account and group args are comma-splitted
+            query[qtype] = {s.strip() for s in qargs.split(',')}
+        elif qtype == 'amount':
+            try:
+                if '..' in qargs:
+                    # amount range, "100..200". Both ends are required.
+                    low, high = _parse_range(qargs, parse_amount)
+                    if low is None or high is None:
+                        raise ValueError()
+                    low, high = abs(low), abs(high)
+                    query['amount_range'] = tuple(sorted([low, high], key=lambda a: a.value if a else 0))
+                else:
+                    query['amount'] = abs(parse_amount(qargs))
+            except ValueError:
+                pass
+        else:
+            query[qtype] = qargs
+    return FieldQuery(query)
+
+def parse_query(query_string, parse_amount, parse_date):
+    """Compiles ``query_string`` into a :class:`Query`.
+
+    :param str query_string: Search string that comes straight from the user through the search
+                             box.
+    :param parse_amount: Function returning an :class:`.Amount` from a string, raising
+                         ``ValueError`` if it can't.
+    :param parse_date: Function returning a ``datetime.date`` from a string, raising ``ValueError``
+                       if it can't.
+    :rtype: :class:`Query`
+    """
+    tokens = RE_OPERATOR.split(query_string.strip())
+    # tokens alternate between terms and operators
+    or_queries = []
+    and_queries = [_parse_term(tokens[0], parse_amount, parse_date)]
+    for operator, term in zip(tokens[1::2], tokens[2::2]):
+        query = _parse_term(term, parse_amount, parse_date)
+        if operator == 'AND':
+            and_queries.append(query)
+        else:
+            or_queries.append(and_queries)
+            and_queries = [query]
+    or_queries.append(and_queries)
+    or_queries = [qs[0] if len(qs) == 1 else AndQuery(qs) for qs in or_queries]
+    return or_queries[0] if len(or_queries) == 1 else OrQuery(or_queries)
@@ -292,11 +292,13 @@ class Transaction:
         * checkno
         * memo
         * amount
+        * amount_range
         * account
         * group
 
         All of these queries are string-based, except ``amount``, which requires an
-        :class:`.Amount`.
+        :class:`.Amount`, and ``amount_range``, which requires a ``(low, high)`` tuple of
+        :class:`.Amount`. Amounts are compared without their sign.
 
         Returns true if any criteria matches, false otherwise.
         """
@@ -324,6 +326,13 @@ class Transaction:
                 split_value = split.amount.value if split.amount else 0
                 if query_value == abs(split_value):
                     return True
+        query_amount_range = query.get('amount_range')
+        if query_amount_range is not None:
+            low, high = (amount.value if amount else 0 for amount in query_amount_range)
+            for split in self.splits:
+                split_value = split.amount.value if split.amount else 0
+                if low <= abs(split_value) <= high:
+                    return True
         query_account = query.get('account')
         if query_account is not None:
             for split in self.splits:
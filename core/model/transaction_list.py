@@ -4,59 +4,278 @@
 # which should be included with this package. The terms are also available at
 # http://www.gnu.org/licenses/gpl-3.0.html
 
-from operator import itemgetter
+from collections import OrderedDict
 
-class TransactionList(list):
+from .completion import CompletionIndex
+from .range_index import AmountIndex, RangeIndex
+
+# Fields we index in our search index, as in Transaction.matches() queries.
+SEARCH_TEXT_FIELDS = ['description', 'payee', 'memo']
+SEARCH_FIELDS = SEARCH_TEXT_FIELDS + ['checkno']
+
+def trigrams(text):
+    """Returns the set of 3 characters long substrings of ``text``."""
+    return {text[i:i+3] for i in range(len(text) - 2)}
+
+class TransactionList:
     """Manages the :class:`.Transaction` instances of a document.
 
     This class is mostly about managing transactions sorting order, moving them around and keeping
-    a cache of values to use for completion. There's only one of those in a document, in
-    :attr:`.Document.transactions`.
+    indexes of values to use for completion (:class:`.CompletionIndex`). There's only one of those
+    in a document, in :attr:`.Document.transactions`.
 
-    Subclasses ``list``.
+    To find transactions at a given date or with a given account without going through the whole
+    list, we keep indexes of transactions by date and by account. To find those matching a search
+    query (:meth:`matching`), we keep an index of their searchable text and of their split
+    amounts. Indexes are built on the
+    first time we need them and kept up to date when adding and removing transactions. When you
+    change the date, the position, the splits, the description, the payee, the check number or the
+    mtime of a transaction that is in the list, call :meth:`reindex` (or :meth:`clear_cache` if you
+    don't know which transactions changed).
+
+    It behaves like a ``list`` for iteration, indexing and sorting. However, transactions are held
+    in an ordered set, so membership tests and removals don't depend on the number of transactions.
     """
-    def __init__(self, *args, **kwargs):
-        list.__init__(self, *args, **kwargs)
+    def __init__(self, transactions=()):
+        # {transaction: None}. Transactions hash by identity.
+        self._transactions = OrderedDict.fromkeys(transactions)
+        # A list of our transactions. None until we need it, for indexing.
+        self._list = None
+        # Our indexes are None until we need them.
+        # {transaction: (description, payee, account names)}, as they were when we indexed the
+        # transaction for completion.
+        self._completion_indexed = None
         self._descriptions = None
         self._payees = None
         self._account_names = None
+        # {transaction: (date, accounts)}, as they were when we indexed the transaction.
+        self._indexed = None
+        # RangeIndex of transactions by date
+        self._date_index = None
+        # {date: highest position of the transactions at that date}. Can be higher than the actual
+        # highest position after a removal, which doesn't matter.
+        self._date2maxposition = None
+        # {account: set of transactions with a split assigned to that account}
+        self._account2transactions = None
+        # {transaction: ({field: set of lowercase texts}, [(amount, split)])}, as they were when we
+        # indexed the transaction for search.
+        self._search_indexed = None
+        # AmountIndex of splits by absolute amount
+        self._amount_index = None
+        # {field: {lowercase text: set of transactions}}
+        self._field2texts = None
+        # {lowercase text: number of SEARCH_TEXT_FIELDS having it}
+        self._text2fieldcount = None
+        # {trigram: set of lowercase texts of SEARCH_TEXT_FIELDS}
+        self._trigram2texts = None
 
     # --- Overrides
+    def __add__(self, other):
+        return self._as_list() + list(other)
+
+    def __contains__(self, transaction):
+        return transaction in self._transactions
+
+    def __getitem__(self, index):
+        return self._as_list()[index]
+
+    def __iter__(self):
+        return iter(self._transactions)
+
+    def __len__(self):
+        return len(self._transactions)
+
+    def __repr__(self):
+        return '<TransactionList %r>' % self._as_list()
+
     def remove(self, transaction):
-        """Removes ``transaction`` from the list."""
-        list.remove(self, transaction)
-        self.clear_cache()
+        """Removes ``transaction`` from the list.
+
+        Raises ``ValueError`` if ``transaction`` isn't in it.
+        """
+        try:
+            del self._transactions[transaction]
+        except KeyError:
+            raise ValueError("%r is not in the list" % transaction)
+        self._list = None
+        if self._indexed is not None:
+            self._unindex(transaction)
+        if self._completion_indexed is not None:
+            self._unindex_completion(transaction)
+        if self._search_indexed is not None:
+            self._unindex_search(transaction)
+
+    def sort(self, key=None, reverse=False):
+        """Sorts the list in place, like ``list.sort()``."""
+        transactions = sorted(self._transactions, key=key, reverse=reverse)
+        self._transactions = OrderedDict.fromkeys(transactions)
+        self._list = transactions
 
     # --- Private
-    def _compute_completion_list(self, data_and_mtime):
-        """Returns a list of unique data sorted in mtime order.
+    def _as_list(self):
+        if self._list is None:
+            self._list = list(self._transactions)
+        return self._list
 
-        ``data_and_mtime`` is an iterable containing ``(data, mtime)`` pairs.
-        """
-        data2mtime = {}
-        for data, mtime in data_and_mtime:
-            maxmtime = max(mtime, data2mtime.get(data, 0))
-            data2mtime[data] = maxmtime
-        data_and_mtime = sorted(data2mtime.items(), key=itemgetter(1), reverse=True)
-        return [data for data, mtime in data_and_mtime]
-
-    def _compute_account_names(self):
-        def data_and_mtime_gen():
+    def _ensure_completion_indexes(self):
+        if self._completion_indexed is None:
+            self._completion_indexed = {}
+            self._descriptions = CompletionIndex()
+            self._payees = CompletionIndex()
+            self._account_names = CompletionIndex()
             for txn in self:
-                mtime = txn.mtime
-                for account in txn.affected_accounts():
-                    if not account.inactive:
-                        yield (account.name, mtime)
+                self._index_completion(txn)
+
+    def _ensure_indexes(self):
+        if self._indexed is None:
+            self._indexed = {}
+            self._date_index = RangeIndex()
+            self._date2maxposition = {}
+            self._account2transactions = {}
+            for txn in self:
+                self._index(txn)
+
+    def _ensure_search_index(self):
+        if self._search_indexed is None:
+            self._search_indexed = {}
+            self._field2texts = {field: {} for field in SEARCH_FIELDS}
+            self._text2fieldcount = {}
+            self._trigram2texts = {}
+            self._amount_index = AmountIndex(absolute=True)
+            for txn in self:
+                self._index_search(txn)
+
+    def _index(self, transaction):
+        date = transaction.date
+        accounts = tuple(transaction.affected_accounts())
+        self._indexed[transaction] = (date, accounts)
+        self._date_index.add(date, transaction)
+        maxposition = self._date2maxposition.get(date)
+        if maxposition is None or transaction.position > maxposition:
+            self._date2maxposition[date] = transaction.position
+        for account in accounts:
+            self._account2transactions.setdefault(account, set()).add(transaction)
+
+    def _index_completion(self, transaction):
+        mtime = transaction.mtime
+        account_names = {a.name for a in transaction.affected_accounts() if not a.inactive}
+        self._completion_indexed[transaction] = (transaction.description, transaction.payee, account_names)
+        self._descriptions.add(transaction.description, transaction, mtime)
+        self._payees.add(transaction.payee, transaction, mtime)
+        for name in account_names:
+            self._account_names.add(name, transaction, mtime)
+
+    def _index_search(self, transaction):
+        field2texts = {
+            'description': (transaction.description.lower(), ),
+            'payee': (transaction.payee.lower(), ),
+            'memo': {split.memo.lower() for split in transaction.splits},
+            'checkno': (transaction.checkno.lower(), ),
+        }
+        amounts = [(split.amount, split) for split in transaction.splits]
+        self._search_indexed[transaction] = (field2texts, amounts)
+        for amount, split in amounts:
+            self._amount_index.add(amount, split)
+        for field, texts in field2texts.items():
+            text2transactions = self._field2texts[field]
+            for text in texts:
+                transactions = text2transactions.get(text)
+                if transactions is None:
+                    transactions = text2transactions[text] = set()
+                    if field in SEARCH_TEXT_FIELDS:
+                        self._index_text(text)
+                transactions.add(transaction)
+
+    def _index_text(self, text):
+        count = self._text2fieldcount.get(text, 0)
+        self._text2fieldcount[text] = count + 1
+        if not count:
+            for trigram in trigrams(text):
+                self._trigram2texts.setdefault(trigram, set()).add(text)
 
-        self._account_names = self._compute_completion_list(data_and_mtime_gen())
+    def _query_candidates(self, query):
+        # Returns a set of our transactions that contains all those that match `query`.
+        result = set()
+        query_amount = query.get('amount')
+        if query_amount is not None:
+            value = query_amount.value if query_amount else 0
+            result |= {split.transaction for split in self._amount_index.between(value, value)}
+        query_amount_range = query.get('amount_range')
+        if query_amount_range is not None:
+            low, high = (amount.value if amount else 0 for amount in query_amount_range)
+            result |= {split.transaction for split in self._amount_index.between(low, high)}
+        for field in SEARCH_TEXT_FIELDS:
+            query_text = query.get(field)
+            if query_text is not None:
+                text2transactions = self._field2texts[field]
+                for text in self._texts_containing(query_text, text2transactions):
+                    result |= text2transactions[text]
+        query_checkno = query.get('checkno')
+        if query_checkno is not None:
+            result |= self._field2texts['checkno'].get(query_checkno, set())
+        query_account = query.get('account')
+        if query_account is not None:
+            for account, transactions in self._account2transactions.items():
+                if account.name.lower() in query_account:
+                    result |= transactions
+        query_group = query.get('group')
+        if query_group is not None:
+            for account, transactions in self._account2transactions.items():
+                if account.group and account.group.name.lower() in query_group:
+                    result |= transactions
+        return result
 
-    def _compute_descriptions(self):
-        data_and_mtime = ((t.description, t.mtime) for t in self)
-        self._descriptions = self._compute_completion_list(data_and_mtime)
+    def _texts_containing(self, query_text, texts):
+        # Returns the elements of `texts` containing `query_text`. Texts containing it also contain
+        # its trigrams. When it's too short to have any, we go through all texts, which are
+        # usually much less numerous than our transactions.
+        query_trigrams = trigrams(query_text)
+        if not query_trigrams:
+            return [text for text in texts if query_text in text]
+        candidate_sets = sorted(
+            (self._trigram2texts.get(trigram, set()) for trigram in query_trigrams), key=len
+        )
+        candidates = set.intersection(*candidate_sets)
+        return [text for text in candidates if text in texts and query_text in text]
 
-    def _compute_payees(self):
-        data_and_mtime = ((t.payee, t.mtime) for t in self)
-        self._payees = self._compute_completion_list(data_and_mtime)
+    def _unindex(self, transaction):
+        date, accounts = self._indexed.pop(transaction)
+        self._date_index.remove(date, transaction)
+        for account in accounts:
+            self._account2transactions[account].discard(transaction)
+
+    def _unindex_completion(self, transaction):
+        description, payee, account_names = self._completion_indexed.pop(transaction)
+        self._descriptions.remove(description, transaction)
+        self._payees.remove(payee, transaction)
+        for name in account_names:
+            self._account_names.remove(name, transaction)
+
+    def _unindex_search(self, transaction):
+        field2texts, amounts = self._search_indexed.pop(transaction)
+        for amount, split in amounts:
+            self._amount_index.remove(amount, split)
+        for field, texts in field2texts.items():
+            text2transactions = self._field2texts[field]
+            for text in texts:
+                transactions = text2transactions[text]
+                transactions.discard(transaction)
+                if transactions:
+                    continue
+                del text2transactions[text]
+                if field in SEARCH_TEXT_FIELDS:
+                    self._unindex_text(text)
+
+    def _unindex_text(self, text):
+        count = self._text2fieldcount.pop(text) - 1
+        if count:
+            self._text2fieldcount[text] = count
+            return
+        for trigram in trigrams(text):
+            texts = self._trigram2texts[trigram]
+            texts.discard(text)
+            if not texts:
+                del self._trigram2texts[trigram]
 
     # --- Public
     def add(self, transaction, keep_position=False, position=None):
@@ -64,42 +283,112 @@ class TransactionList(list):
 
         If you want ``transaction.position`` to stay intact, call with ``keep_position`` at True. If
         you  specify a position, this is the one that will be used.
+
+        Adding a transaction that is already in the list does nothing.
         """
+        if transaction in self._transactions:
+            return
         if position is not None:
             transaction.position = position
         elif not keep_position:
-            transactions = self.transactions_at_date(transaction.date)
-            if transactions:
-                transaction.position = max(t.position for t in transactions) + 1
-        self.append(transaction)
-        self.clear_cache()
+            self._ensure_indexes()
+            if transaction.date in self._date_index:
+                transaction.position = self._date2maxposition[transaction.date] + 1
+        self._transactions[transaction] = None
+        if self._list is not None:
+            self._list.append(transaction)
+        if self._indexed is not None:
+            self._index(transaction)
+        if self._completion_indexed is not None:
+            self._index_completion(transaction)
+        if self._search_indexed is not None:
+            self._index_search(transaction)
 
     def clear(self):
         """Clears the list of all transactions."""
-        del self[:]
+        self._transactions.clear()
+        self._list = None
         self.clear_cache()
 
     def clear_cache(self):
         """Clears cached data.
 
-        For now cache date is auto-completion data (payee, transaction, account). Call this when
-        a transaction has been changed.
+        Cached data is our indexes of auto-completion data (description, payee, account), of
+        transactions by date and account and of searchable text. Call this when transactions have
+        been changed, or when accounts have been renamed or made inactive.
         """
+        self._completion_indexed = None
         self._descriptions = None
         self._payees = None
         self._account_names = None
+        self._indexed = None
+        self._date_index = None
+        self._date2maxposition = None
+        self._account2transactions = None
+        self._search_indexed = None
+        self._field2texts = None
+        self._text2fieldcount = None
+        self._trigram2texts = None
+        self._amount_index = None
+
+    def complete(self, attrname, partial):
+        """Returns values of ``attrname`` that ``partial`` can be completed to, most recent first.
+
+        ``attrname`` is ``description``, ``payee`` or ``account``. See
+        :meth:`.CompletionIndex.complete`.
+        """
+        self._ensure_completion_indexes()
+        index = {
+            'description': self._descriptions,
+            'payee': self._payees,
+            'account': self._account_names,
+        }[attrname]
+        return index.complete(partial)
 
     def reassign_account(self, account, reassign_to=None):
-        """Calls :meth:`.Transaction.reassign_account` on all transactions.
+        """Calls :meth:`.Transaction.reassign_account` on all transactions of ``account``.
 
         If, after such an operation, a transaction ends up referencing no account at all, it is
         removed.
         """
-        for transaction in self[:]:
+        for transaction in self.transactions_for_account(account):
             transaction.reassign_account(account, reassign_to)
             if not transaction.affected_accounts():
                 self.remove(transaction)
-        self.clear_cache()
+            else:
+                self.reindex(transaction)
+
+    def reindex(self, transaction):
+        """Updates our indexes after a change to the date, the position, the splits, the
+        description, the payee, the check number or the mtime of ``transaction``.
+
+        Does nothing if ``transaction`` isn't in the list.
+        """
+        if self._indexed is not None and transaction in self._indexed:
+            self._unindex(transaction)
+            self._index(transaction)
+        if self._completion_indexed is not None and transaction in self._completion_indexed:
+            self._unindex_completion(transaction)
+            self._index_completion(transaction)
+        if self._search_indexed is not None and transaction in self._search_indexed:
+            self._unindex_search(transaction)
+            self._index_search(transaction)
+
+    def matching(self, query, date_range=None):
+        """Returns a set of our transactions matching ``query``.
+
+        ``query`` is the same as in :meth:`.Transaction.matches`, which we verify each result with.
+        However, our indexes let us only verify transactions that can match.
+
+        If ``date_range`` (a :class:`.DateRange`) is set, only transactions in it are verified and
+        returned.
+        """
+        self._ensure_indexes()
+        self._ensure_search_index()
+        candidates = self._query_candidates(query)
+        if date_range is not None:
+            candidates = (txn for txn in candidates if txn.date in date_range)
+        return {txn for txn in candidates if txn.matches(query)}
 
     def move_before(self, from_transaction, to_transaction):
         """Moves ``from_transaction`` just before ``to_transaction``.
@@ -107,11 +396,12 @@ class TransactionList(list):
         If ``to_transaction`` is ``None``, ``from_transaction`` is moved to the end of the
         list. You must :ref:`recook <cooking>` after having done a move (or a bunch of moves)
         """
-        if from_transaction not in self:
+        if from_transaction not in self._transactions:
             return
-        if to_transaction is not None and to_transaction.date != from_transaction.date:
+        date = from_transaction.date
+        if to_transaction is not None and to_transaction.date != date:
             to_transaction = None
-        transactions = self.transactions_at_date(from_transaction.date)
+        transactions = self.transactions_at_date(date)
         transactions.remove(from_transaction)
         if not transactions:
             return
@@ -123,6 +413,7 @@ class TransactionList(list):
         for transaction in transactions:
             if transaction.position >= target_position:
                 transaction.position += 1
+        self._date2maxposition[date] = max(t.position for t in self._date_index.get(date))
 
     def move_last(self, transaction):
         """Equivalent to :meth:`move_before` with ``to_transaction`` to ``None``."""
@@ -130,27 +421,39 @@ class TransactionList(list):
 
     def transactions_at_date(self, target_date):
         """Returns a set of all transactions occurring on ``target_date``."""
-        return set(t for t in self if t.date == target_date)
+        self._ensure_indexes()
+        return self._date_index.get(target_date)
+
+    def transactions_between(self, start_date, end_date):
+        """Returns a set of all transactions occurring from ``start_date`` to ``end_date``,
+        inclusively.
+
+        If ``start_date`` or ``end_date`` is ``None``, the range is open on that side.
+        """
+        self._ensure_indexes()
+        return self._date_index.between(start_date, end_date)
+
+    def transactions_for_account(self, account):
+        """Returns a set of all transactions with a split assigned to ``account``."""
+        self._ensure_indexes()
+        return set(self._account2transactions.get(account, ()))
 
     # --- Properties
     @property
     def account_names(self):
         """A list of active account names used in the transactions, in reverse mtime order."""
-        if self._account_names is None:
-            self._compute_account_names()
-        return self._account_names
+        self._ensure_completion_indexes()
+        return self._account_names.values()
 
     @property
     def descriptions(self):
         """A list of descriptions used in the transactions, in reverse mtime order."""
-        if self._descriptions is None:
-            self._compute_descriptions()
-        return self._descriptions
+        self._ensure_completion_indexes()
+        return self._descriptions.values()
 
     @property
     def payees(self):
         """A list of payees used in the transactions, in reverse mtime order."""
-        if self._payees is None:
-            self._compute_payees()
-        return self._payees
+        self._ensure_completion_indexes()
+        return self._payees.values()
 
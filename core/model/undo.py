@@ -7,8 +7,9 @@
 # http://www.gnu.org/licenses/gpl-3.0.html
 
 import copy
+import datetime
 
-from hscommon.util import extract, flatten
+from hscommon.util import extract
 
 from ..model.recurrence import Spawn
 
@@ -16,6 +17,8 @@ ACCOUNT_SWAP_ATTRS = ['name', 'currency', 'type', 'group', 'account_number', 'no
 GROUP_SWAP_ATTRS = ['name', 'type']
 TRANSACTION_SWAP_ATTRS = ['date', 'description', 'payee', 'checkno', 'notes', 'position', 'splits']
 SPLIT_SWAP_ATTRS = ['account', 'amount', 'reconciliation_date']
+# Split attributes that we restore when undoing a change to a transaction.
+TRANSACTION_SPLIT_SWAP_ATTRS = SPLIT_SWAP_ATTRS + ['memo', 'reference']
 SCHEDULE_SWAP_ATTRS = ['repeat_type', 'repeat_every', 'stop_date', 'date2exception',
                        'date2globalchange', 'date2instances']
 BUDGET_SWAP_ATTRS = SCHEDULE_SWAP_ATTRS + ['account', 'target', 'amount']
@@ -26,6 +29,102 @@ def swapvalues(first, second, attrs):
         setattr(first, attr, getattr(second, attr))
         setattr(second, attr, tmp)
 
+# {attrs: attrs}, so that diffs of the same attributes share their attrs tuple.
+_attrs_tuples = {}
+
+class AttributeDiff:
+    """Values that attributes of an instance had before a change.
+
+    Only attributes that changed are there. :meth:`swap` puts these values back in the instance and
+    keeps the instance's values, so swapping again redoes the change.
+
+    Many of them can be kept around, so they're as small as we can make them.
+    """
+    __slots__ = ['attrs', 'values']
+
+    def __init__(self, instance, backup, attrs):
+        values = []
+        changed = []
+        for attr in attrs:
+            value = getattr(backup, attr)
+            if value != getattr(instance, attr):
+                changed.append(attr)
+                values.append(value)
+        changed = tuple(changed)
+        #: Names of the attributes that changed.
+        self.attrs = _attrs_tuples.setdefault(changed, changed)
+        #: Values of :attr:`attrs`, in the same order.
+        self.values = tuple(values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def swap(self, instance):
+        """Swaps our values with the values of ``instance``."""
+        current = tuple(getattr(instance, attr) for attr in self.attrs)
+        for attr, value in zip(self.attrs, self.values):
+            setattr(instance, attr, value)
+        self.values = current
+
+
+class SplitDiff(AttributeDiff):
+    """:class:`AttributeDiff` for :class:`.Split`."""
+    __slots__ = []
+
+    def __init__(self, split, backup, attrs):
+        AttributeDiff.__init__(self, split, backup, attrs)
+        resetting = {'account', 'amount'} & set(self.attrs)
+        if resetting and 'reconciliation_date' not in self.attrs:
+            # Setting the account or the amount can reset the reconciliation date, so we always set
+            # it back after them.
+            changed = self.attrs + ('reconciliation_date', )
+            self.attrs = _attrs_tuples.setdefault(changed, changed)
+            self.values += (backup.reconciliation_date, )
+
+
+class TransactionDiff(AttributeDiff):
+    """:class:`AttributeDiff` for :class:`.Transaction`.
+
+    When the number of splits didn't change, splits are compared by position and what changed in
+    them is in :attr:`split_diffs`. Otherwise, ``splits`` is one of :attr:`attrs`, with the list of
+    old splits as a value.
+    """
+    __slots__ = ['split_diffs']
+
+    def __init__(self, transaction, backup):
+        attrs = [attr for attr in TRANSACTION_SWAP_ATTRS if attr != 'splits']
+        if len(transaction.splits) != len(backup.splits):
+            attrs.append('splits')
+        AttributeDiff.__init__(self, transaction, backup, attrs)
+        #: ``(index, SplitDiff)`` for splits that changed, or ``None``.
+        self.split_diffs = None
+        if 'splits' not in self.attrs:
+            split_diffs = (
+                (index, SplitDiff(split, old, TRANSACTION_SPLIT_SWAP_ATTRS))
+                for index, (split, old) in enumerate(zip(transaction.splits, backup.splits))
+            )
+            self.split_diffs = tuple((index, diff) for index, diff in split_diffs if diff) or None
+
+    def __len__(self):
+        result = len(self.values)
+        if 'splits' in self.attrs:
+            result += len(self.values[self.attrs.index('splits')])
+        if self.split_diffs:
+            result += sum(len(diff) for _, diff in self.split_diffs)
+        return result
+
+    def swap(self, transaction):
+        AttributeDiff.swap(self, transaction)
+        if self.split_diffs:
+            for index, diff in self.split_diffs:
+                diff.swap(transaction.splits[index])
+
+    @property
+    def splits_changed(self):
+        """Whether the splits of the transaction changed."""
+        return bool(self.split_diffs) or 'splits' in self.attrs
+
+
 class Action:
     """A unit of change that can be undone and redone.
 
@@ -39,6 +138,10 @@ class Action:
     we're about to make a change to something, we copy it first and store that backup. Then, when
     we undo our action, we can use our backup.
 
+    Backups of transactions and splits are complete copies, which is a lot to keep around after a
+    mass edit. Once the change is over, :meth:`compact` replaces them with a :class:`TransactionDiff`
+    or a :class:`SplitDiff`.
+
     To create an action, you can operate on set attributes directly for ``added`` and ``deleted``,
     but you should use convenience method for ``changed``. They perform the copying for you.
 
@@ -63,6 +166,18 @@ class Action:
         self.added_budgets = set()
         self.changed_budgets = set()
         self.deleted_budgets = set()
+        #: Whether :meth:`compact` was called.
+        self.compacted = False
+        #: Rough measure of the memory the action uses, set by :meth:`compact`. It's the number of
+        #: instances and attribute values we hold.
+        self.size = None
+        #: Earliest date of what the action changed, set by :meth:`compact`. ``None`` if the action
+        #: affects the whole document (for example, when it changes accounts).
+        self.min_date = None
+        #: Accounts whose entries are affected by the action, before or after the change, set by
+        #: :meth:`compact`. ``None`` if we don't know. Accounts affected through schedule and budget
+        #: spawns aren't there (the :class:`.Oven` finds them).
+        self.affected_accounts = None
 
     def change_accounts(self, accounts):
         """Record imminent changes to ``accounts``."""
@@ -80,6 +195,68 @@ class Action:
         """Record imminent changes to ``budget``."""
         self.changed_budgets.add((budget, budget.replicate()))
 
+    def _compute_scope(self):
+        # Sets min_date and affected_accounts from our instances and their backups.
+        if self.added_accounts or self.changed_accounts or self.deleted_accounts:
+            return
+        dates = set()
+        accounts = set()
+
+        def add_splits(splits):
+            for split in splits:
+                if split.account is not None:
+                    accounts.add(split.account)
+                if split.reconciliation_date is not None:
+                    dates.add(split.reconciliation_date)
+
+        for txn in self.added_transactions | self.deleted_transactions:
+            dates.add(txn.date)
+            add_splits(txn.splits)
+        for txn, old in self.changed_transactions:
+            dates |= {txn.date, old.date}
+            add_splits(txn.splits)
+            add_splits(old.splits)
+        for split, old in self.changed_splits:
+            dates.add(split.transaction.date)
+            add_splits([split, old])
+        for recurrence in self.added_schedules | self.deleted_schedules | self.added_budgets | self.deleted_budgets:
+            dates.add(recurrence.start_date)
+        for recurrence, old in self.changed_schedules | self.changed_budgets:
+            dates |= {recurrence.start_date, old.start_date}
+        # Without any date, there's nothing to cook (besides spawn changes, which the oven finds).
+        self.min_date = min(dates, default=datetime.date.max)
+        self.affected_accounts = accounts
+
+    def compact(self):
+        """Replaces backups of changed transactions and splits with diffs.
+
+        Has to be called once the changes are over, and before the action is undone. Does nothing
+        if the action is already compacted.
+
+        This is also when we set :attr:`min_date` and :attr:`affected_accounts`.
+        """
+        if self.compacted:
+            return
+        self._compute_scope()
+        self.changed_transactions = {(t, TransactionDiff(t, old)) for t, old in self.changed_transactions}
+        self.changed_splits = {(s, SplitDiff(s, old, SPLIT_SWAP_ATTRS)) for s, old in self.changed_splits}
+        self.compacted = True
+        added_and_deleted = [
+            self.added_accounts, self.deleted_accounts, self.added_groups, self.deleted_groups,
+            self.added_transactions, self.deleted_transactions, self.added_schedules,
+            self.deleted_schedules, self.added_budgets, self.deleted_budgets,
+        ]
+        backups = [
+            (self.changed_accounts, ACCOUNT_SWAP_ATTRS), (self.changed_groups, GROUP_SWAP_ATTRS),
+            (self.changed_schedules, SCHEDULE_SWAP_ATTRS + TRANSACTION_SWAP_ATTRS),
+            (self.changed_budgets, BUDGET_SWAP_ATTRS),
+        ]
+        diffs = [self.changed_transactions, self.changed_splits]
+        instance_count = sum(len(instances) for instances in added_and_deleted)
+        backup_size = sum(len(changed) * (len(attrs) + 1) for changed, attrs in backups)
+        diff_size = sum(len(diff) + 1 for changed in diffs for _, diff in changed)
+        self.size = instance_count + backup_size + diff_size
+
     def change_transactions(self, transactions):
         """Record imminent changes to ``transactions``.
 
@@ -95,24 +272,57 @@ class Action:
         """Record imminent changes to ``splits``."""
         self.changed_splits |= set((s, copy.copy(s)) for s in splits)
 
-    def delete_accounts(self, accounts, reassign=False):
+    def delete_accounts(self, accounts, transactions, reassign=False):
         """Record the imminent deletion of ``accounts``.
 
         Use this method rather than directly modifying the ``deleted_accounts`` set because we also
         trigger the modification of all transasctions related to that account (their splits are
-        going to be reassigned).
+        going to be reassigned). ``transactions`` are the transactions with splits assigned to
+        ``accounts`` (see :meth:`.BaseDocument.transactions_for_account`).
 
         If transactions are going to be reassigned, set the ``reassign`` flag so that we don't
         consider orphaned txns as deleted.
         """
         accounts = set(accounts)
         self.deleted_accounts |= accounts
-        all_entries = flatten(a.entries for a in accounts)
         if not reassign:
-            transactions = {e.transaction for e in all_entries if not isinstance(e.transaction, Spawn)}
-            transactions = {t for t in transactions if not t.affected_accounts() - accounts}
-            self.deleted_transactions |= transactions
-        self.change_splits(e.split for e in all_entries)
+            orphaned = {t for t in transactions if not t.affected_accounts() - accounts}
+            self.deleted_transactions |= orphaned
+        self.change_splits(s for t in transactions for s in t.splits if s.account in accounts)
+
+
+class ActionGroup:
+    """Several actions that are undone and redone as one.
+
+    It's what :meth:`Undoer.end_batch` records. It has the same interface as :class:`Action` for
+    the :class:`Undoer` and the :class:`.Document` (:meth:`compact`, :attr:`size`,
+    :attr:`min_date`, :attr:`affected_accounts`), but it holds no instances itself.
+
+    :param str description: A description of the group which will be shown to the user.
+    :param actions: list of :class:`Action`, in the order they were recorded.
+    """
+    def __init__(self, description, actions):
+        self.description = description
+        self.actions = actions
+        self.compacted = False
+        self.size = None
+        self.min_date = None
+        self.affected_accounts = None
+
+    def compact(self):
+        """Compacts our actions and sets our scope from theirs."""
+        if self.compacted:
+            return
+        for action in self.actions:
+            action.compact()
+        self.compacted = True
+        self.size = sum(action.size for action in self.actions)
+        if any(action.min_date is None for action in self.actions):
+            return
+        self.min_date = min(action.min_date for action in self.actions)
+        self.affected_accounts = set()
+        for action in self.actions:
+            self.affected_accounts |= action.affected_accounts
 
 
 class Undoer:
@@ -125,9 +335,24 @@ class Undoer:
     How it works is that it holds a list of :class:`.Action` and a pointer to our current action
     (most of the time, it's the last action). When we undo or redo an action, we use the information
     we has stored in our action and make proper modifications, then move our action index.
+
+    If we have a ``journal`` (:class:`.AutosaveJournal`), we tell it about every action we record,
+    undo or redo.
+
+    Actions are compacted (see :meth:`Action.compact`) when the next one is recorded or when they're
+    undone, whichever comes first. When the size of our actions goes over :attr:`MAX_SIZE`, the
+    oldest ones are forgotten and can't be undone anymore.
+
+    Actions recorded between :meth:`begin_batch` and :meth:`end_batch` are grouped in an
+    :class:`ActionGroup`, which is undone and redone as one action.
     """
-    def __init__(self, accounts, groups, transactions, scheduled, budgets):
+    #: Maximum total :attr:`Action.size` of our actions. The last recorded action is always kept,
+    #: whatever its size.
+    MAX_SIZE = 500000
+
+    def __init__(self, accounts, groups, transactions, scheduled, budgets, journal=None):
         self._actions = []
+        self._journal = journal
         self._accounts = accounts
         self._groups = groups
         self._transactions = transactions
@@ -135,8 +360,32 @@ class Undoer:
         self._budgets = budgets
         self._index = -1
         self._save_point = None
+        # Actions recorded since begin_batch(), or None if we're not in a batch.
+        self._batch = None
 
     # --- Private
+    def _forget_oldest_actions(self):
+        # Called after having compacted all actions but the last one.
+        size = sum(action.size for action in self._actions[:-1])
+        count = 0
+        while size > self.MAX_SIZE:
+            size -= self._actions[count].size
+            count += 1
+        del self._actions[:count]
+
+    def _append(self, action):
+        if self._index < -1:
+            self._actions = self._actions[:self._index + 1]
+        if self._actions:
+            self._actions[-1].compact()
+        self._actions.append(action)
+        self._index = -1
+        self._forget_oldest_actions()
+
+    def _actions_of(self, action):
+        # Returns the list of Action to undo or redo for ``action``.
+        return action.actions if isinstance(action, ActionGroup) else [action]
+
     def _add_auto_created_accounts(self, transaction):
         for split in transaction.splits:
             if split.account is not None and split.account not in self._accounts:
@@ -159,16 +408,28 @@ class Undoer:
     def _do_changes(self, action):
         for account, old in action.changed_accounts:
             swapvalues(account, old, ACCOUNT_SWAP_ATTRS)
+            self._accounts.reindex(account)
+        if action.changed_accounts:
+            # Account names are part of our transactions' completion data.
+            self._transactions.clear_cache()
         for group, old in action.changed_groups:
             swapvalues(group, old, GROUP_SWAP_ATTRS)
-        for txn, old in action.changed_transactions:
-            self._remove_auto_created_account(txn)
-            swapvalues(txn, old, TRANSACTION_SWAP_ATTRS)
-            for split in txn.splits:
-                split.transaction = txn
-            self._add_auto_created_accounts(txn)
-        for split, old in action.changed_splits:
-            swapvalues(split, old, SPLIT_SWAP_ATTRS)
+        for txn, diff in action.changed_transactions:
+            if not diff:
+                continue
+            splits_changed = diff.splits_changed
+            if splits_changed:
+                self._remove_auto_created_account(txn)
+            diff.swap(txn)
+            if splits_changed:
+                for split in txn.splits:
+                    split.transaction = txn
+                self._add_auto_created_accounts(txn)
+            self._transactions.reindex(txn)
+        for split, diff in action.changed_splits:
+            if diff:
+                diff.swap(split)
+                self._transactions.reindex(split.transaction)
         for schedule, old in action.changed_schedules:
             swapvalues(schedule, old, SCHEDULE_SWAP_ATTRS)
             swapvalues(schedule.ref, old.ref, TRANSACTION_SWAP_ATTRS)
@@ -199,6 +460,35 @@ class Undoer:
                 self._accounts.remove(account)
 
     # --- Public
+    def begin_batch(self):
+        """Starts grouping the actions we record until :meth:`end_batch` is called.
+
+        Actions can't be undone or redone in the meantime.
+        """
+        assert self._batch is None
+        self._batch = []
+
+    def end_batch(self, description=None):
+        """Records the actions recorded since :meth:`begin_batch` as a single action.
+
+        :param str description: Description of the recorded :class:`ActionGroup`. If ``None``, the
+                                description of the first action is used.
+
+        Returns the recorded action, or ``None`` if there was nothing recorded. If only one action
+        was recorded, it's recorded as is.
+        """
+        actions, self._batch = self._batch, None
+        if not actions:
+            return None
+        if len(actions) == 1:
+            action = actions[0]
+            if description is not None:
+                action.description = description
+        else:
+            action = ActionGroup(description or actions[0].description, actions)
+        self._append(action)
+        return action
+
     def can_redo(self):
         """Whether we can redo.
 
@@ -247,10 +537,14 @@ class Undoer:
         :param action: Action to be recorded.
         :type action: :class:`Action`
         """
-        if self._index < -1:
-            self._actions = self._actions[:self._index + 1]
-        self._actions.append(action)
-        self._index = -1
+        if self._journal is not None:
+            self._journal.note(action)
+        if self._batch is not None:
+            if self._batch:
+                self._batch[-1].compact()
+            self._batch.append(action)
+            return
+        self._append(action)
 
     def undo(self):
         """Undo the next action to be undone.
@@ -260,19 +554,26 @@ class Undoer:
         action and decrease our pointer to the previous action.
 
         Make sure you can call this with :meth:`can_undo` first.
+
+        Returns the undone :class:`Action`.
         """
-        assert self.can_undo()
-        action = self._actions[self._index]
-        self._do_adds(
-            action.deleted_accounts, action.deleted_groups, action.deleted_transactions,
-            action.deleted_schedules, action.deleted_budgets
-        )
-        self._do_deletes(
-            action.added_accounts, action.added_groups, action.added_transactions,
-            action.added_schedules, action.added_budgets
-        )
-        self._do_changes(action)
+        assert self.can_undo() and self._batch is None
+        undone = self._actions[self._index]
+        undone.compact()
+        for action in reversed(self._actions_of(undone)):
+            self._do_adds(
+                action.deleted_accounts, action.deleted_groups, action.deleted_transactions,
+                action.deleted_schedules, action.deleted_budgets
+            )
+            self._do_deletes(
+                action.added_accounts, action.added_groups, action.added_transactions,
+                action.added_schedules, action.added_budgets
+            )
+            self._do_changes(action)
+            if self._journal is not None:
+                self._journal.note(action, undone=True)
         self._index -= 1
+        return undone
 
     def redo(self):
         """Redo the next action to be redone.
@@ -281,19 +582,25 @@ class Undoer:
         increase our pointer to the next action.
 
         Make sure you can call this with :meth:`can_redo` first.
+
+        Returns the redone :class:`Action`.
         """
-        assert self.can_redo()
-        action = self._actions[self._index + 1]
-        self._do_adds(
-            action.added_accounts, action.added_groups, action.added_transactions,
-            action.added_schedules, action.added_budgets
-        )
-        self._do_deletes(
-            action.deleted_accounts, action.deleted_groups, action.deleted_transactions,
-            action.deleted_schedules, action.deleted_budgets
-        )
-        self._do_changes(action)
+        assert self.can_redo() and self._batch is None
+        redone = self._actions[self._index + 1]
+        for action in self._actions_of(redone):
+            self._do_adds(
+                action.added_accounts, action.added_groups, action.added_transactions,
+                action.added_schedules, action.added_budgets
+            )
+            self._do_deletes(
+                action.deleted_accounts, action.deleted_groups, action.deleted_transactions,
+                action.deleted_schedules, action.deleted_budgets
+            )
+            self._do_changes(action)
+            if self._journal is not None:
+                self._journal.note(action)
         self._index += 1
+        return redone
 
     # --- Properties
     @property
@@ -163,13 +163,15 @@ Amount_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
 static int
 Amount_init(Amount *self, PyObject *args, PyObject *kwds)
 {
-    PyObject *amount, *currency, *tmp;
+    PyObject *amount = NULL, *currency = NULL, *tmp;
     int exponent;
+    int value_is_shifted = 0;
     double dtmp;
     
-    static char *kwlist[] = {"amount", "currency", NULL};
+    static char *kwlist[] = {"amount", "currency", "_value_is_shifted", NULL};
 
-    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|OO", kwlist, &amount, &currency)) {
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|OOp", kwlist, &amount, &currency,
+        &value_is_shifted)) {
         return -1;
     }
     
@@ -185,7 +187,19 @@ Amount_init(Amount *self, PyObject *args, PyObject *kwds)
         return -1;
     }
     
-    if (amount) {
+    if (amount && value_is_shifted) {
+        self->ival = PyLong_AsLongLong(amount);
+        if (self->ival == -1 && PyErr_Occurred()) {
+            return -1;
+        }
+        tmp = self->rval;
+        self->rval = PyFloat_FromDouble((double)self->ival / pow(10, exponent));
+        Py_XDECREF(tmp);
+        if (self->rval == NULL) {
+            return -1;
+        }
+    }
+    else if (amount) {
         dtmp = PyFloat_AsDouble(amount);
         if (dtmp == -1 && PyErr_Occurred()) {
             return -1;
@@ -463,6 +477,12 @@ Amount_getvalue(Amount *self)
     return self->rval;
 }
 
+static PyObject *
+Amount_getshiftedvalue(Amount *self)
+{
+    return PyLong_FromLongLong(self->ival);
+}
+
 /* We need both __copy__ and __deepcopy__ methods for amounts to behave correctly in undo_test. */
 
 static PyMethodDef Amount_methods[] = {
@@ -474,6 +494,7 @@ static PyMethodDef Amount_methods[] = {
 static PyGetSetDef Amount_getseters[] = {
     {"currency", (getter)Amount_getcurrency, NULL, "currency", NULL},
     {"value", (getter)Amount_getvalue, NULL, "value", NULL},
+    {"_shifted_value", (getter)Amount_getshiftedvalue, NULL, "_shifted_value", NULL},
     {0, 0, 0, 0, 0},
 };
 
@@ -507,7 +528,114 @@ static PyType_Spec Amount_Type_Spec = {
     Amount_Slots,
 };
 
+/* Module functions */
+
+/* An int64_t can hold any number of 18 digits. Longer numbers aren't canonical, we leave them to
+   parse_amount().
+*/
+#define MAX_CANONICAL_DIGITS 18
+
+static PyObject *
+amount_parse_canonical(PyObject *self, PyObject *args)
+{
+    /* See parse_canonical() in _amount_ref.py */
+    PyObject *string, *currencies, *bytes, *code;
+    PyObject *currency = NULL;
+    char *s, *p, *end, *space, *digits_start;
+    int64_t ival = 0;
+    int negative = 0;
+    int digit_count = 0;
+    int decimal_count = 0;
+    int exponent;
+    
+    if (!PyArg_ParseTuple(args, "UO!", &string, &PyDict_Type, &currencies)) {
+        return NULL;
+    }
+    
+    bytes = PyUnicode_AsUTF8String(string);
+    if (bytes == NULL) {
+        return NULL;
+    }
+    s = PyBytes_AsString(bytes);
+    end = s + PyBytes_Size(bytes);
+    p = s;
+    
+    space = memchr(s, ' ', end - s);
+    if (space != NULL) {
+        code = PyUnicode_FromStringAndSize(s, space - s);
+        if (code == NULL) {
+            Py_DECREF(bytes);
+            return NULL;
+        }
+        currency = PyDict_GetItem(currencies, code); /* borrowed */
+        Py_DECREF(code);
+        if (currency == NULL) {
+            goto not_canonical;
+        }
+        p = space + 1;
+    }
+    
+    if (p < end && *p == '-') {
+        negative = 1;
+        p++;
+    }
+    digits_start = p;
+    while (p < end && *p >= '0' && *p <= '9') {
+        if (++digit_count > MAX_CANONICAL_DIGITS) {
+            goto not_canonical;
+        }
+        ival = ival * 10 + (*p - '0');
+        p++;
+    }
+    if (p == digits_start) {
+        goto not_canonical;
+    }
+    if (p < end && *p == '.') {
+        p++;
+        digits_start = p;
+        while (p < end && *p >= '0' && *p <= '9') {
+            if (++digit_count > MAX_CANONICAL_DIGITS) {
+                goto not_canonical;
+            }
+            ival = ival * 10 + (*p - '0');
+            p++;
+        }
+        decimal_count = p - digits_start;
+        if (decimal_count == 0) {
+            goto not_canonical;
+        }
+    }
+    if (p != end) {
+        goto not_canonical;
+    }
+    Py_DECREF(bytes);
+    
+    if (currency == NULL) {
+        /* Only zero comes without a currency */
+        if (ival != 0) {
+            Py_RETURN_NONE;
+        }
+        return PyLong_FromLong(0);
+    }
+    exponent = get_currency_exponent(currency);
+    if (exponent == -1) {
+        return NULL;
+    }
+    if (decimal_count != exponent) {
+        Py_RETURN_NONE;
+    }
+    if (ival == 0) {
+        return PyLong_FromLong(0);
+    }
+    return create_amount(negative ? -ival : ival, currency);
+
+not_canonical:
+    Py_DECREF(bytes);
+    Py_RETURN_NONE;
+}
+
 static PyMethodDef module_methods[] = {
+    {"parse_canonical", amount_parse_canonical, METH_VARARGS, NULL},
     {NULL}  /* Sentinel */
 };
 
@@ -9,7 +9,7 @@ from hscommon.gui.column import Column # noqa
 
 from .api import ( # noqa
     Plugin, ViewPlugin, ReadOnlyTableRow, ReadOnlyTable, ReadOnlyTableView, ReadOnlyTablePlugin,
-    CurrencyProviderPlugin, ImportActionPlugin, ImportBindPlugin, EntryMatch
+    CurrencyProviderPlugin, ImportActionPlugin, ImportBindPlugin, EntryMatch, EntryIndex
 )
 
 def get_plugins_from_mod(mod):
@@ -25,6 +25,7 @@ from collections import namedtuple
 
 from hscommon.notify import Broadcaster
 from ..model.currency import Currency, CurrencyNotSupportedException
+from ..model.range_index import AmountIndex
 from ..gui.base import BaseView
 from ..gui.table import GUITable, Row
 from ..const import PaneType
@@ -310,6 +311,39 @@ class ImportActionPlugin(Plugin, Broadcaster):
 EntryMatch = namedtuple('EntryMatch', 'existing imported will_import weight')
 
 
+class EntryIndex:
+    """Index of entries by amount, for :class:`ImportBindPlugin` subclasses.
+
+    Comparing every imported entry with every existing entry gets slow with big accounts. With this
+    index, you only look at existing entries with a close enough amount and date::
+
+        index = EntryIndex(existing_entries)
+        for imported_entry in imported_entries:
+            for existing_entry in index.find(imported_entry.amount, date=imported_entry.date, days=3):
+                ...
+    """
+    def __init__(self, entries):
+        self._amount_index = AmountIndex()
+        for entry in entries:
+            self._amount_index.add(entry.amount, entry)
+
+    def find(self, amount, tolerance=0, date=None, days=0):
+        """Returns entries with an amount within ``tolerance`` of ``amount``, sorted by date.
+
+        Amounts are compared in the currency of ``amount``. If ``date`` is set, only entries within
+        ``days`` days of it are returned.
+
+        :param amount: :class:`.Amount`
+        :param tolerance: ``float``
+        :param date: ``datetime.date``
+        :param days: ``int``
+        """
+        entries = self._amount_index.near(amount, tolerance)
+        if date is not None:
+            entries = [e for e in entries if abs((e.date - date).days) <= days]
+        return sorted(entries, key=lambda e: (e.date, e.transaction.position))
+
+
 class ImportBindPlugin(Plugin):
     TYPE_NAME = "Import Bind"
 
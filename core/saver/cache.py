@@ -0,0 +1,118 @@
+# Copyright 2016 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+# The document cache is a binary copy of the data of a native document, next to which we store
+# the modification time and size the native file had when we wrote the cache. Reading it back with
+# :mod:`core.loader.cache` is much faster than parsing the native file again.
+#
+# We only pickle builtin types (tuples, strings, numbers), never model instances. This way, the
+# loader can refuse to unpickle anything else and the layout of our model classes doesn't leak in
+# the format.
+
+import os
+import os.path as op
+import pickle
+
+from hscommon.util import ensure_folder
+
+#: Bump this whenever the layout of the cache changes. Caches of other versions are ignored.
+CACHE_VERSION = 1
+
+def source_stamp(source_filename):
+    """Returns what identifies the current version of the file at ``source_filename``."""
+    stat = os.stat(source_filename)
+    return (stat.st_mtime_ns, stat.st_size)
+
+def amount2tuple(amount):
+    # Amounts can also be 0 (int), in which case we have no currency.
+    if not isinstance(amount, int):
+        return (amount.value, amount.currency.code)
+    return (amount, None)
+
+def date2ordinal(date):
+    return date.toordinal() if date is not None else None
+
+def transaction2tuple(txn):
+    splits = tuple(
+        (
+            split.account.name if split.account is not None else None,
+            amount2tuple(split.amount), split.memo, split.reference,
+            date2ordinal(split.reconciliation_date),
+        )
+        for split in txn.splits
+    )
+    return (
+        txn.date.toordinal(), txn.description, txn.payee, txn.checkno, txn.notes, txn.mtime,
+        txn.position, splits
+    )
+
+def recurrence2tuple(recurrence):
+    changes = [
+        (date.toordinal(), transaction2tuple(change))
+        for date, change in recurrence.date2globalchange.items()
+    ]
+    exceptions = [
+        (date.toordinal(), transaction2tuple(exception) if exception is not None else None)
+        for date, exception in recurrence.date2exception.items()
+    ]
+    return (
+        recurrence.repeat_type, recurrence.repeat_every, date2ordinal(recurrence.stop_date),
+        transaction2tuple(recurrence.ref), changes, exceptions
+    )
+
+def budget2tuple(budget):
+    return (
+        budget.account.name, budget.target.name if budget.target is not None else None,
+        amount2tuple(budget.amount), budget.repeat_type, budget.repeat_every, budget.notes,
+        date2ordinal(budget.start_date), date2ordinal(budget.stop_date)
+    )
+
+def save(filename, source_filename, document_id, properties, accounts, groups, transactions,
+         schedules, budgets):
+    """Saves a cache of the document's data to ``filename``.
+
+    ``source_filename`` is the native file that this data was loaded from or saved to. The cache
+    is only valid as long as that file stays the same.
+    """
+    header = {
+        'version': CACHE_VERSION,
+        'document_id': document_id,
+        'source_stamp': source_stamp(source_filename),
+    }
+    properties = {
+        name: value.code if name == 'default_currency' else value
+        for name, value in properties.items()
+    }
+    data = {
+        'properties': properties,
+        'groups': [(group.name, group.type) for group in groups],
+        'accounts': [
+            (
+                account.name, account.currency.code, account.type,
+                account.group.name if account.group else None, account.reference,
+                account.account_number, account.inactive, account.notes
+            )
+            for account in accounts
+        ],
+        'transactions': [transaction2tuple(txn) for txn in transactions],
+        # Like the native saver, we don't save dead schedules.
+        'schedules': [recurrence2tuple(s) for s in schedules if s.is_alive],
+        'budgets': [budget2tuple(budget) for budget in budgets],
+    }
+    ensure_folder(op.dirname(filename))
+    tmp_filename = filename + '.tmp'
+    try:
+        with open(tmp_filename, 'wb') as fp:
+            # The header comes first so that the loader can check it without reading the rest. We
+            # use the same pickler for both so that they share their memo, like the unpickler does.
+            pickler = pickle.Pickler(fp, protocol=pickle.HIGHEST_PROTOCOL)
+            pickler.dump(header)
+            pickler.dump(data)
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        if op.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
@@ -4,66 +4,129 @@
 # which should be included with this package. The terms are also available at
 # http://www.gnu.org/licenses/gpl-3.0.html
 
-import sys
+import os
 import os.path as op
-import xml.etree.cElementTree as ET
+from xml.sax.saxutils import escape
 
 from ..model.amount import format_amount
 from hscommon.util import remove_invalid_xml, ensure_folder
 
-def save(filename, document_id, properties, accounts, groups, transactions, schedules, budgets):
-    def date2str(date):
-        return date.strftime('%Y-%m-%d')
-
-    def handle_newlines(s):
-        # etree doesn't correctly save newlines. In fields that allow it, we have to escape them so
-        # that we can restore them during load.
-        # XXX It seems like newer version of etree do escape newlines. When we use Python 3.2, we
-        # can probably remove this.
-        if not s:
-            return s
-        return s.replace('\n', '\\n')
-
-    def setattrib(attribs, attribname, value):
-        if value:
-            attribs[attribname] = value
-
-    def write_transaction_element(parent_element, transaction):
-        transaction_element = ET.SubElement(parent_element, 'transaction')
-        attrib = transaction_element.attrib
+# We write our XML ourselves, element by element, rather than building an ElementTree. The output
+# is the same as what ElementTree used to write for us: attributes in lexical order, empty elements
+# as "<tag />" and the same attribute escaping (line endings and tabs included).
+ATTRIB_ENTITIES = {
+    '"': '&quot;',
+    '\r\n': '&#10;',
+    '\r': '&#10;',
+    '\n': '&#10;',
+    '\t': '&#09;',
+}
+
+def attribs2str(attrib):
+    return ''.join(
+        ' %s="%s"' % (name, escape(remove_invalid_xml(value), ATTRIB_ENTITIES))
+        for name, value in sorted(attrib.items())
+    )
+
+def date2str(date):
+    return date.strftime('%Y-%m-%d')
+
+def handle_newlines(s):
+    # etree doesn't correctly save newlines. In fields that allow it, we have to escape them so
+    # that we can restore them during load.
+    # XXX It seems like newer version of etree do escape newlines. When we use Python 3.2, we
+    # can probably remove this.
+    if not s:
+        return s
+    return s.replace('\n', '\\n')
+
+def setattrib(attribs, attribname, value):
+    if value:
+        attribs[attribname] = value
+
+class Writer:
+    """Writes moneyGuru native elements through ``write``, a function taking a ``str``.
+
+    If ``keygetter`` is set, it's called with every top level instance (accounts, transactions,
+    etc.) we write and the result is written in the ``key`` attribute of its element. This allows
+    :mod:`core.autosave` to refer to these elements later. Transactions then also get a
+    ``position`` attribute, which :mod:`core.autosave` needs to write them back in order. The
+    loader ignores both attributes.
+    """
+    def __init__(self, write, keygetter=None):
+        self.write = write
+        self.keygetter = keygetter
+
+    def _setkey(self, attrib, obj):
+        if self.keygetter is not None:
+            attrib['key'] = self.keygetter(obj)
+
+    def start(self, tag, attrib):
+        self.write('<%s%s>' % (tag, attribs2str(attrib)))
+
+    def end(self, tag):
+        self.write('</%s>' % tag)
+
+    def empty(self, tag, attrib):
+        self.write('<%s%s />' % (tag, attribs2str(attrib)))
+
+    def split(self, split):
+        attrib = {}
+        attrib['account'] = split.account_name
+        attrib['amount'] = format_amount(split.amount)
+        setattrib(attrib, 'memo', split.memo)
+        setattrib(attrib, 'reference', split.reference)
+        if split.reconciliation_date is not None:
+            attrib['reconciliation_date'] = date2str(split.reconciliation_date)
+        self.empty('split', attrib)
+
+    def transaction(self, transaction, toplevel=True):
+        attrib = {}
         attrib['date'] = date2str(transaction.date)
         setattrib(attrib, 'description', transaction.description)
         setattrib(attrib, 'payee', transaction.payee)
         setattrib(attrib, 'checkno', transaction.checkno)
         setattrib(attrib, 'notes', handle_newlines(transaction.notes))
         attrib['mtime'] = str(int(transaction.mtime))
+        if toplevel:
+            self._setkey(attrib, transaction)
+            if self.keygetter is not None:
+                attrib['position'] = str(transaction.position)
+        if not transaction.splits:
+            self.empty('transaction', attrib)
+            return
+        self.start('transaction', attrib)
         for split in transaction.splits:
-            split_element = ET.SubElement(transaction_element, 'split')
-            attrib = split_element.attrib
-            attrib['account'] = split.account_name
-            attrib['amount'] = format_amount(split.amount)
-            setattrib(attrib, 'memo', split.memo)
-            setattrib(attrib, 'reference', split.reference)
-            if split.reconciliation_date is not None:
-                attrib['reconciliation_date'] = date2str(split.reconciliation_date)
-
-    root = ET.Element('moneyguru-file')
-    root.attrib['document_id'] = document_id
-    props_element = ET.SubElement(root, 'properties')
-    for name, value in properties.items():
-        if name == 'default_currency':
-            value = value.code
-        else:
-            value = str(value)
-        props_element.attrib[name] = value
-    for group in groups:
-        group_element = ET.SubElement(root, 'group')
-        attrib = group_element.attrib
-        attrib['name'] = group.name
-        attrib['type'] = group.type
-    for account in accounts:
-        account_element = ET.SubElement(root, 'account')
-        attrib = account_element.attrib
+            self.split(split)
+        self.end('transaction')
+
+    def _date_element(self, tag, date, transaction):
+        # "change" and "exception" elements of recurrences
+        attrib = {'date': date2str(date)}
+        if transaction is None:
+            self.empty(tag, attrib)
+            return
+        self.start(tag, attrib)
+        self.transaction(transaction, toplevel=False)
+        self.end(tag)
+
+    def properties(self, properties):
+        attrib = {}
+        for name, value in properties.items():
+            if name == 'default_currency':
+                value = value.code
+            else:
+                value = str(value)
+            attrib[name] = value
+        self.empty('properties', attrib)
+
+    def group(self, group):
+        attrib = {'name': group.name, 'type': group.type}
+        self._setkey(attrib, group)
+        self.empty('group', attrib)
+
+    def account(self, account):
+        attrib = {}
         attrib['name'] = account.name
         attrib['currency'] = account.currency.code
         attrib['type'] = account.type
@@ -77,31 +140,26 @@ def save(filename, document_id, properties, accounts, groups, transactions, sche
             attrib['inactive'] = 'y'
         if account.notes:
             attrib['notes'] = handle_newlines(account.notes)
-    for transaction in transactions:
-        write_transaction_element(root, transaction)
-    # the functionality of the line below is untested because it's an optimisation
-    scheduled = [s for s in schedules if s.is_alive]
-    for recurrence in scheduled:
-        recurrence_element = ET.SubElement(root, 'recurrence')
-        attrib = recurrence_element.attrib
+        self._setkey(attrib, account)
+        self.empty('account', attrib)
+
+    def recurrence(self, recurrence):
+        attrib = {}
         attrib['type'] = recurrence.repeat_type
         attrib['every'] = str(recurrence.repeat_every)
         if recurrence.stop_date is not None:
             attrib['stop_date'] = date2str(recurrence.stop_date)
+        self._setkey(attrib, recurrence)
+        self.start('recurrence', attrib)
         for date, change in recurrence.date2globalchange.items():
-            change_element = ET.SubElement(recurrence_element, 'change')
-            change_element.attrib['date'] = date2str(date)
-            if change is not None:
-                write_transaction_element(change_element, change)
+            self._date_element('change', date, change)
         for date, exception in recurrence.date2exception.items():
-            exception_element = ET.SubElement(recurrence_element, 'exception')
-            exception_element.attrib['date'] = date2str(date)
-            if exception is not None:
-                write_transaction_element(exception_element, exception)
-        write_transaction_element(recurrence_element, recurrence.ref)
-    for budget in budgets:
-        budget_element = ET.SubElement(root, 'budget')
-        attrib = budget_element.attrib
+            self._date_element('exception', date, exception)
+        self.transaction(recurrence.ref, toplevel=False)
+        self.end('recurrence')
+
+    def budget(self, budget):
+        attrib = {}
         attrib['account'] = budget.account.name
         attrib['type'] = budget.repeat_type
         attrib['every'] = str(budget.repeat_every)
@@ -112,16 +170,47 @@ def save(filename, document_id, properties, accounts, groups, transactions, sche
         attrib['start_date'] = date2str(budget.start_date)
         if budget.stop_date is not None:
             attrib['stop_date'] = date2str(budget.stop_date)
-    for elem in root.getiterator():
-        attrib = elem.attrib
-        for key, value in attrib.items():
-            attrib[key] = remove_invalid_xml(value)
-    tree = ET.ElementTree(root)
+        self._setkey(attrib, budget)
+        self.empty('budget', attrib)
+
+    def document(self, document_id, properties, accounts, groups, transactions, schedules, budgets):
+        self.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        self.start('moneyguru-file', {'document_id': document_id})
+        self.properties(properties)
+        for group in groups:
+            self.group(group)
+        for account in accounts:
+            self.account(account)
+        for transaction in transactions:
+            self.transaction(transaction)
+        # the functionality of the line below is untested because it's an optimisation
+        scheduled = [s for s in schedules if s.is_alive]
+        for recurrence in scheduled:
+            self.recurrence(recurrence)
+        for budget in budgets:
+            self.budget(budget)
+        self.end('moneyguru-file')
+
+
+def save(filename, document_id, properties, accounts, groups, transactions, schedules, budgets,
+         keygetter=None):
+    """Saves the document's data in the moneyGuru native format to ``filename``.
+
+    The data is first written to a temporary file next to ``filename``, which then replaces
+    ``filename``. If anything goes wrong during the save, ``filename`` is left untouched.
+
+    ``keygetter`` is passed to :class:`Writer`.
+    """
     ensure_folder(op.dirname(filename))
-    fp = open(filename, 'wt', encoding='utf-8')
-    fp.write('<?xml version="1.0" encoding="utf-8"?>\n')
-    # This 'unicode' encoding thing is only available (and necessary) from Python 3.2
-    if sys.version_info[1] >= 2:
-        tree.write(fp, encoding='unicode')
-    else:
-        tree.write(fp)
+    tmp_filename = filename + '.tmp'
+    try:
+        with open(tmp_filename, 'wt', encoding='utf-8') as fp:
+            writer = Writer(fp.write, keygetter=keygetter)
+            writer.document(document_id, properties, accounts, groups, transactions, schedules, budgets)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        if op.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
@@ -663,10 +663,8 @@ def compare_apps(first, second, qif_mode=False):
             eq_(len(txn1.splits), len(txn2.splits))
         except AssertionError:
             raise
-        splits1 = txn1.splits
-        splits2 = txn2.splits
-        splits1.sort(key=lambda s: getattr(s.account, 'name', ''))
-        splits2.sort(key=lambda s: getattr(s.account, 'name', ''))
+        splits1 = sorted(txn1.splits, key=lambda s: getattr(s.account, 'name', ''))
+        splits2 = sorted(txn2.splits, key=lambda s: getattr(s.account, 'name', ''))
         for split1, split2 in zip(splits1, splits2):
             try:
                 account1 = split1.account.name if split1.account else ''
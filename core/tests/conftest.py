@@ -16,6 +16,7 @@ from hscommon.testutil import pytest_funcarg__app
 
 from ..model.currency import RatesDB, Currency
 from ..model import currency as currency_module
+from ..model.oven import Oven
 
 global_monkeypatch = None
 
@@ -32,6 +33,8 @@ def pytest_configure(config):
     # avoid hitting the currency server during tests. However, some tests still need it. This is
     # why we keep it around so that those tests can re-patch it.
     global_monkeypatch.setattr(currency_module, 'initialize_db', fake_initialize_db)
+    # Make sure that scoped cooking always yields the same results as full cooking.
+    global_monkeypatch.setattr(Oven, 'VERIFY_INCREMENTAL_COOKING', True)
     # Avoid false test failures caused by timezones messing up our date fakeries.
     # See http://stackoverflow.com/questions/9915058/pythons-fromtimestamp-does-a-discrete-jump
     os.environ['TZ'] = 'UTC'
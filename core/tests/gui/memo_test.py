@@ -0,0 +1,79 @@
+# Copyright 2016 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+from datetime import date
+
+from hscommon.testutil import eq_
+
+from ..base import TestApp, with_app
+from ...gui.memo import Memo
+from ...model.currency import USD
+
+# --- Memo alone
+@with_app(TestApp)
+def test_bounded_size(app):
+    # We only keep the most recently used results.
+    memo = Memo(app.doc, max_size=2)
+    eq_(memo.get('a', lambda: 1), 1)
+    eq_(memo.get('b', lambda: 2), 2)
+    eq_(memo.get('a', lambda: 3), 1)
+    eq_(memo.get('c', lambda: 4), 4)
+    eq_(len(memo), 2)
+    eq_(memo.get('a', lambda: 5), 1)
+    eq_(memo.get('b', lambda: 6), 6)
+    eq_((memo.hits, memo.misses), (2, 4))
+
+@with_app(TestApp)
+def test_rates_change(app):
+    # A change in exchange rates invalidates our results.
+    memo = Memo(app.doc)
+    memo.get('a', lambda: 1)
+    USD.set_CAD_value(1.42, date(2008, 1, 1))
+    eq_(memo.get('a', lambda: 2), 2)
+
+# --- Two accounts with transactions
+def app_two_accounts_with_transactions():
+    app = TestApp()
+    app.add_account('Checking')
+    app.add_account('Savings')
+    app.add_txn(to='Checking', amount='42')
+    app.add_txn(to='Savings', amount='12')
+    app.show_nwview()
+    return app
+
+@with_app(app_two_accounts_with_transactions)
+def test_report_refresh_without_changes(app):
+    # Refreshing a report without any data change doesn't compute anything.
+    memo = app.bsheet._memo
+    misses = memo.misses
+    app.bsheet.refresh()
+    eq_(memo.misses, misses)
+
+@with_app(app_two_accounts_with_transactions)
+def test_report_only_computes_changed_accounts(app):
+    memo = app.bsheet._memo
+    misses = memo.misses
+    app.add_txn(to='Checking', amount='1')
+    app.show_nwview()
+    eq_(memo.misses, misses + 1)
+    eq_(app.bsheet.assets[0].end, '43.00')
+    eq_(app.bsheet.assets[1].end, '12.00')
+
+@with_app(app_two_accounts_with_transactions)
+def test_document_revisions(app):
+    # Changes after a date range don't change its revision and changes to an account don't change
+    # the revision of other accounts.
+    revision = app.doc.revision
+    date_range_revision = app.doc.date_range_revision()
+    previous_range = app.doc.date_range.prev()
+    previous_range_revision = app.doc.date_range_revision(previous_range)
+    savings = app.doc.accounts.find('Savings')
+    savings_revision = app.doc.account_revision(savings)
+    app.add_txn(to='Checking', amount='1')
+    assert app.doc.revision > revision
+    assert app.doc.date_range_revision() > date_range_revision
+    eq_(app.doc.date_range_revision(previous_range), previous_range_revision)
+    eq_(app.doc.account_revision(savings), savings_revision)
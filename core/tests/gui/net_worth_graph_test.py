@@ -108,6 +108,18 @@ class TestAssetsAndLiabilitiesInDifferentAccounts:
         eq_(app.nw_graph_data(), expected)
         app.check_gui_calls(app.nwgraph_gui, ['refresh'])
 
+    @with_app(do_setup)
+    def test_same_data_as_daily_computation(self, app, monkeypatch):
+        # The graph is computed from balance changes rather than from every day of the range. The
+        # result is the same, today's point and exchange rate changes of the CAD account included.
+        monkeypatch.patch_today(2008, 7, 7)
+        from_changes = app.nw_graph_data()
+        monkeypatch.setattr(app.nwgraph, '_balance_changes', lambda date_range: None)
+        app.nwgraph.compute()
+        eq_(app.nw_graph_data(), from_changes)
+        assert ('08/07/2008', '186.96') in from_changes
+        assert ('16/07/2008', '87.51') in from_changes
+
     @with_app(do_setup)
     def test_net_worth_graph(self, app):
         # One interesting thing about this graph is that on the 14th of july, the CAD value changes,
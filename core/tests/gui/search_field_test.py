@@ -68,6 +68,63 @@ def test_query_amount_negative(app):
     eq_(app.ttable.row_count, 1)
     eq_(app.ttable[0].description, 'Withdrawal')
 
+@with_app(app_two_transactions)
+def test_query_amount_range(app):
+    # Amount ranges are inclusive and, like other amount searches, ignore the amounts' sign.
+    app.sfield.text = 'amount: 140..212.12'
+    eq_(app.ttable.row_count, 2)
+    app.sfield.text = 'amount: -200..100'
+    eq_(app.ttable.row_count, 1)
+    eq_(app.ttable[0].description, 'Withdrawal')
+
+@with_app(app_two_transactions)
+def test_query_amount_open_range(app):
+    # Both ends of an amount range are required.
+    app.sfield.text = 'amount: 100..'
+    eq_(app.ttable.row_count, 0)
+
+@with_app(app_two_transactions)
+def test_query_or(app):
+    # Terms separated by OR match transactions matching any of them.
+    app.sfield.text = 'deposit OR payee: dunno'
+    eq_(app.ttable.row_count, 2)
+
+@with_app(app_two_transactions)
+def test_query_and(app):
+    # Terms separated by AND match transactions matching all of them.
+    app.sfield.text = 'payee: joe AND 212.12'
+    eq_(app.ttable.row_count, 1)
+    eq_(app.ttable[0].description, 'a Deposit')
+    app.sfield.text = 'payee: joe AND 140'
+    eq_(app.ttable.row_count, 0)
+
+@with_app(app_two_transactions)
+def test_query_not(app):
+    # NOT excludes the transactions matching the term that follows it, and binds tighter than AND
+    # and OR.
+    app.sfield.text = 'NOT payee: joe'
+    eq_(app.ttable.row_count, 1)
+    eq_(app.ttable[0].description, 'Withdrawal')
+    app.sfield.text = 'NOT deposit AND NOT withdrawal OR 140'
+    eq_(app.ttable.row_count, 1)
+    eq_(app.ttable[0].description, 'Withdrawal')
+
+@with_app(app_two_transactions)
+def test_query_lowercase_operators(app):
+    # Operators have to be in uppercase. Otherwise, they're part of a simple search.
+    app.sfield.text = 'deposit or withdrawal'
+    eq_(app.ttable.row_count, 0)
+
+@with_app(app_two_transactions)
+def test_query_operators_in_entry_table(app):
+    # Compound queries also filter entry tables.
+    app.show_account('Desjardins')
+    app.sfield.text = 'deposit OR withdrawal'
+    eq_(app.etable_count(), 2)
+    app.sfield.text = 'NOT deposit'
+    eq_(app.etable_count(), 1)
+    eq_(app.etable[0].description, 'Withdrawal')
+
 @with_app(app_two_transactions)
 def test_query_description(app):
     # The query is case insensitive and works on description.
@@ -239,3 +296,69 @@ def test_query_group(app):
     app.sfield.text = 'group:foo,mygRoup'
     eq_(app.ttable.row_count, 1)
     eq_(app.ttable[0].description, 'first')
+
+# --- Txns at different dates
+def app_txns_at_different_dates():
+    app = TestApp()
+    app.add_account('Checking')
+    app.add_txn(date='01/02/2008', description='first', from_='Checking', amount='1')
+    app.add_txn(date='10/02/2008', description='second', from_='Checking', amount='2')
+    app.add_txn(date='20/02/2008', description='third', from_='Checking', amount='3')
+    return app
+
+@with_app(app_txns_at_different_dates)
+def test_query_date(app):
+    app.sfield.text = 'date: 10/02/2008'
+    eq_(app.ttable.row_count, 1)
+    eq_(app.ttable[0].description, 'second')
+
+@with_app(app_txns_at_different_dates)
+def test_query_date_range(app):
+    # Date ranges are inclusive and can be open on either side.
+    app.sfield.text = 'date: 01/02/2008..10/02/2008'
+    eq_(app.ttable.row_count, 2)
+    app.sfield.text = 'date: 05/02/2008..'
+    eq_(app.ttable.row_count, 2)
+    eq_(app.ttable[0].description, 'second')
+    app.sfield.text = 'date: ..05/02/2008'
+    eq_(app.ttable.row_count, 1)
+    eq_(app.ttable[0].description, 'first')
+
+@with_app(app_txns_at_different_dates)
+def test_query_invalid_date(app):
+    # An invalid date matches nothing.
+    app.sfield.text = 'date: foo'
+    eq_(app.ttable.row_count, 0)
+
+@with_app(app_txns_at_different_dates)
+def test_query_date_and_amount(app):
+    app.sfield.text = 'date: 05/02/2008.. AND amount: 0..2'
+    eq_(app.ttable.row_count, 1)
+    eq_(app.ttable[0].description, 'second')
+
+@with_app(app_txns_at_different_dates)
+def test_query_follows_changes(app):
+    # Results of a query are recomputed when transactions change.
+    app.sfield.text = 'date: ..15/02/2008 AND NOT second'
+    eq_(app.ttable.row_count, 1)
+    app.ttable.select([0])
+    app.ttable[0].date = '12/02/2008'
+    app.ttable.save_edits()
+    eq_(app.ttable.row_count, 1)
+    app.ttable[0].date = '16/02/2008'
+    app.ttable.save_edits()
+    eq_(app.ttable.row_count, 0)
+
+@with_app(app_txns_at_different_dates)
+def test_query_follows_date_range_changes(app):
+    # Results of a query are recomputed for the new date range when it changes.
+    app.add_txn(date='05/03/2008', description='fourth', from_='Checking', amount='4')
+    app.drsel.select_month_range()
+    app.drsel.select_prev_date_range()
+    app.sfield.text = 'NOT second'
+    eq_(app.ttable.row_count, 2)
+    app.drsel.select_next_date_range()
+    eq_(app.ttable.row_count, 1)
+    eq_(app.ttable[0].description, 'fourth')
+    app.drsel.select_prev_date_range()
+    eq_(app.ttable.row_count, 2)
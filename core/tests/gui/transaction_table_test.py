@@ -671,6 +671,44 @@ def test_add_date_and_selection(app):
     eq_(row.date, '11/07/2008')
     eq_(app.ttable.selected_indexes, [2])
 
+@with_app(app_three_transactions)
+def test_rows_are_loaded_when_fetched(app):
+    # Refreshing and sorting the table doesn't load rows. They're loaded when they're fetched.
+    app.ttable.refresh()
+    eq_([row.is_loaded for row in app.ttable._rows[:-1]], [False, False, False])
+    app.ttable.sort_by('date', desc=True)
+    eq_(app.ttable[0].description, 'third')
+    assert not app.ttable._rows[1].is_loaded
+
+@with_app(app_three_transactions)
+def test_unloaded_rows_load_their_date(app):
+    # The date of a row that isn't loaded yet is the date of its transaction, not a default one.
+    app.ttable.refresh()
+    row = app.ttable._rows[2]
+    assert not row.is_loaded
+    eq_(row.date, '12/07/2008')
+    assert not row.is_date_in_future()
+    app.show_account('New account')
+    app.etable.refresh()
+    row = app.etable._rows[0]
+    assert not row.is_loaded
+    assert not row.is_date_in_future()
+    eq_(row.date, '11/07/2008')
+
+@with_app(app_three_transactions)
+def test_row_changes_after_edit(app):
+    # Editing a transaction only changes its row. The view only has to update rows it fetched.
+    app.ttable.refresh()
+    app.ttable.pop_row_changes()
+    app.ttable.select([0])
+    app.ttable[0].description = 'changed'
+    app.ttable.save_edits()
+    eq_(app.ttable.pop_row_changes(), [('update', 0, 1, 0, 1), ('update', 3, 4, 3, 4)])
+    # Deleting a transaction removes its row.
+    app.ttable.delete()
+    changes = app.ttable.pop_row_changes()
+    eq_([change for change in changes if change[0] != 'update'], [('delete', 0, 1, 0, 0)])
+
 @with_app(app_three_transactions)
 def test_delete_last(app):
     # Deleting the last txn makes the selection goes one index before.
@@ -14,6 +14,7 @@ from hscommon.testutil import eq_
 from .base import ApplicationGUI, TestApp, with_app, testdata
 from ..app import Application
 from ..exception import FileFormatError
+from ..loader import native
 from ..loader.csv import CsvField
 from ..model.currency import Currency, CAD
 from ..model.date import MonthRange, YearRange
@@ -52,6 +53,18 @@ def test_import_invalid_qif(app):
     with raises(FileFormatError):
         app.mw.parse_file_for_import(filename)
 
+@with_app(TestApp)
+def test_import_truncated_moneyguru_file(app, tmpdir):
+    # A moneyguru file that is cut short past its root element isn't taken for a moneyguru file.
+    contents = open(testdata.filepath('moneyguru', 'simple.moneyguru'), 'rb').read()
+    filename = str(tmpdir.join('truncated.moneyguru'))
+    open(filename, 'wb').write(contents[:len(contents) // 2])
+    try:
+        app.mw.parse_file_for_import(filename)
+    except FileFormatError:
+        pass
+    assert not isinstance(getattr(app.mw, 'loader', None), native.Loader)
+
 @with_app(TestApp)
 def test_import_no_balance_account(app):
     # When importing a moneyguru file with transactions and accounts, but no balance account, we
@@ -4,11 +4,13 @@
 # which should be included with this package. The terms are also available at
 # http://www.gnu.org/licenses/gpl-3.0.html
 
+import os
 from datetime import date
 
 from hscommon.testutil import eq_
 
 from ..document import ScheduleScope
+from ..loader import native
 from ..model.account import AccountType
 from ..model.currency import Currency, CAD
 from ..model.date import MonthRange
@@ -482,6 +484,72 @@ def test_save_load(tmpdir, monkeypatch):
     app = app_account_and_group()
     check(app)
 
+def test_save_load_through_cache(tmpdir, monkeypatch):
+    # When we have a cache for a document, we load the cache instead of parsing the XML again, and
+    # we end up with the same thing.
+    def check(app):
+        cache_path = str(tmpdir.join('cache'))
+        filepath = str(tmpdir.join('foo.xml'))
+        app.app.cache_path = cache_path
+        app.doc.save_to_xml(filepath)
+        app.doc.close()
+        newapp = TestApp()
+        newapp.app.cache_path = cache_path
+        newapp.doc.load_from_xml(filepath)
+        newapp.doc.date_range = app.doc.date_range
+        newapp.doc._cook()
+        compare_apps(app.doc, newapp.doc)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The XML shouldn't be loaded")
+
+    monkeypatch.setattr(native.Loader, 'load', fail)
+    check(app_account_with_budget())
+    check(app_budget_with_all_fields_set())
+    check(app_transaction_with_payee_and_checkno())
+    check(app_transaction_with_memos())
+    check(app_split_with_null_amount())
+    check(app_one_account_in_one_group())
+    check(app_account_with_apanel_attrs())
+    check(app_schedule_with_global_change(monkeypatch))
+    check(app_schedule_with_local_deletion(monkeypatch))
+
+def app_saved_with_cache(tmpdir):
+    app = TestApp()
+    app.app.cache_path = str(tmpdir.join('cache'))
+    app.add_account('foo')
+    app.show_account()
+    app.add_entry('1/1/2008', 'first', increase='42')
+    filepath = str(tmpdir.join('foo.xml'))
+    app.doc.save_to_xml(filepath)
+    return app, filepath
+
+def test_stale_cache_is_ignored(tmpdir):
+    # When the file changed since we wrote the cache, we load the file.
+    app, filepath = app_saved_with_cache(tmpdir)
+    otherapp = TestApp() # no cache path, doesn't update the cache
+    otherapp.doc.load_from_xml(filepath)
+    otherapp.show_account('foo')
+    otherapp.add_entry('2/1/2008', 'second')
+    otherapp.doc.save_to_xml(filepath)
+    stat = os.stat(filepath)
+    os.utime(filepath, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    app.doc.load_from_xml(filepath)
+    app.show_account('foo')
+    eq_(app.entry_descriptions()[:2], ['first', 'second'])
+
+def test_corrupt_cache_is_ignored(tmpdir):
+    # When our cache can't be read, we load the file.
+    app, filepath = app_saved_with_cache(tmpdir)
+    [cache_file] = tmpdir.join('cache', 'documents').listdir()
+    cache_file.write_binary(cache_file.read_binary()[:-10])
+    app.doc.load_from_xml(filepath)
+    app.show_account('foo')
+    eq_(app.entry_descriptions()[:1], ['first'])
+    # Loading from the XML rewrote our cache
+    with open(str(cache_file), 'rb') as fp:
+        assert len(fp.read()) > 0
+
 def test_save_load_qif(tmpdir):
     def check(app):
         filepath = str(tmpdir.join('foo.qif'))
@@ -10,6 +10,7 @@ from io import BytesIO
 from datetime import date
 
 from pytest import raises
+from hscommon.jobprogress.job import Job
 from hscommon.testutil import eq_
 
 from ..base import testdata
@@ -71,17 +72,17 @@ def test_account_and_entry_values(loader):
     eq_(account.name, 'foobar')
     eq_(account.currency, USD)
     eq_(account.type, AccountType.Expense)
-    transactions = loader.transaction_infos
+    transactions = loader.transactions
     eq_(len(transactions), 4)
     transaction = transactions[0]
     eq_(transaction.date, date(2008, 2, 12))
     eq_(transaction.description, 'Entry 3')
-    eq_(transaction.transfer, None)
     eq_(transaction.mtime, 1203095473)
-    eq_(len(transaction.splits), 1)
+    eq_(len(transaction.splits), 2)
     split = transaction.splits[0]
     eq_(split.account.name, 'Account 2')
     eq_(split.amount, Amount(89, PLN))
+    assert transaction.splits[1].account is None
 
     transaction = transactions[1]
     eq_(transaction.date, date(2008, 2, 15))
@@ -100,9 +101,7 @@ def test_account_and_entry_values(loader):
     eq_(transaction.description, 'Entry 2')
     eq_(transaction.payee, 'Some Payee')
     eq_(transaction.checkno, '42')
-    eq_(transaction.transfer, None)
     eq_(transaction.mtime, 1203095456)
-    eq_(len(transaction.splits), 1)
     split = transaction.splits[0]
     eq_(split.account.name, 'Account 1')
     eq_(split.amount, Amount(-14, USD))
@@ -110,7 +109,6 @@ def test_account_and_entry_values(loader):
     transaction = transactions[3]
     eq_(transaction.date, date(2008, 2, 19))
     eq_(transaction.description, 'Entry 4')
-    eq_(transaction.transfer, None)
     eq_(transaction.mtime, 1203095497)
     split = transaction.splits[0]
     eq_(split.account.name, 'Account 2')
@@ -122,3 +120,40 @@ def test_unsupported_currency(loader):
     with raises(FileFormatError):
         loader.load()
 
+
+def test_positions_follow_file_order(loader):
+    # Transactions are sorted by date and, for each date, get positions in the order they come in
+    # the file.
+    content = b"""<moneyguru-file>
+    <transaction date="2008-01-02" description="c"><split account="a" amount="1"/></transaction>
+    <transaction date="2008-01-01" description="a"><split account="a" amount="1"/></transaction>
+    <transaction date="2008-01-02" description="d"><split account="a" amount="1"/></transaction>
+    <transaction date="2008-01-01" description="b"><split account="a" amount="1"/></transaction>
+    </moneyguru-file>"""
+    loader._parse(BytesIO(content))
+    loader.load()
+    eq_([(t.description, t.position) for t in loader.transactions], [('a', 1), ('b', 2), ('c', 1), ('d', 2)])
+
+def test_transaction_without_splits_is_ignored(loader):
+    content = b'<moneyguru-file><transaction date="2008-01-01"><split account="a" /></transaction></moneyguru-file>'
+    loader._parse(BytesIO(content))
+    loader.load()
+    eq_(len(loader.transactions), 0)
+
+def test_malformed_xml_after_root(loader):
+    # We only read the root element in _parse(). Errors further down are reported by load().
+    content = b'<moneyguru-file><transaction date="2008-01-01"></moneyguru-file>'
+    loader._parse(BytesIO(content))
+    with raises(FileFormatError):
+        loader.load()
+
+def test_load_reports_progress(loader):
+    progress = []
+
+    def callback(p, desc=''):
+        progress.append(p)
+        return True
+
+    loader.parse(testdata.filepath('moneyguru', 'simple.moneyguru'))
+    loader.load(job=Job(1, callback))
+    eq_(progress[-1], 100)
@@ -8,20 +8,25 @@
 
 import sys
 import os
+import time
 from datetime import date
+from io import BytesIO
+import xml.etree.cElementTree as ET
 
 from pytest import raises
 from hscommon.testutil import eq_
 
-from .base import ApplicationGUI, TestApp, with_app, testdata
+from .base import ApplicationGUI, TestApp, with_app, testdata, compare_apps
+from .. import autosave
 from ..app import Application
 from ..document import Document, AUTOSAVE_BUFFER_COUNT
 from ..exception import FileFormatError
 from ..gui.entry_table import EntryTable
-from ..loader import base
+from ..loader import native
 from ..model.account import AccountType
 from ..model.currency import EUR
 from ..model.date import MonthRange, QuarterRange, YearRange
+from ..saver import native as saver_native
 
 # --- No Setup
 def test_can_use_another_amount_format():
@@ -100,11 +105,25 @@ def test_load_invalid():
     else:
         raise AssertionError()
 
+def test_load_truncated(tmpdir):
+    # A native file that is cut short past its root element gives the same error message as an
+    # invalid file.
+    app = TestApp()
+    contents = open(testdata.filepath('moneyguru', 'simple.moneyguru'), 'rb').read()
+    filename = str(tmpdir.join('truncated.moneyguru'))
+    open(filename, 'wb').write(contents[:len(contents) // 2])
+    try:
+        app.doc.load_from_xml(filename)
+    except FileFormatError as e:
+        assert filename in str(e)
+    else:
+        raise AssertionError()
+
 def test_load_empty(monkeypatch):
     # When loading an empty file (we mock it here), make sure no exception occur.
     app = TestApp()
-    monkeypatch.setattr(base.Loader, 'parse', lambda self, filename: None)
-    monkeypatch.setattr(base.Loader, 'load', lambda self: None)
+    monkeypatch.setattr(native.Loader, 'parse', lambda self, filename: None)
+    monkeypatch.setattr(native.Loader, 'load', lambda self, job=None: None)
     app.doc.load_from_xml('filename does not matter here')
 
 def test_modified_flag():
@@ -174,7 +193,7 @@ def app_one_empty_account_range_on_october_2007(monkeypatch):
     return app
 
 @with_app(app_one_empty_account_range_on_october_2007)
-def test_autosave(app, tmpdir):
+def test_autosave(app, tmpdir, monkeypatch):
     # Testing the interval between autosaves would require some complicated mocking. We're just
     # going to cheat here and call 'must_autosave' directly.
     cache_path = str(tmpdir)
@@ -183,12 +202,131 @@ def test_autosave(app, tmpdir):
     eq_(len(os.listdir(cache_path)), 1)
     app.check_gui_calls_partial(app.etable_gui, not_expected=['stop_edition'])
     assert app.doc.is_dirty
-    # test that the autosave file rotation works
+    # test that the autosave file rotation works. With a full journal, every autosave is a new
+    # snapshot.
+    monkeypatch.setattr(autosave, 'MAX_CHECKPOINTS', 0)
     for i in range(AUTOSAVE_BUFFER_COUNT):
         app.doc.must_autosave()
     # The extra autosave file has been deleted
     eq_(len(os.listdir(cache_path)), AUTOSAVE_BUFFER_COUNT)
 
+@with_app(app_one_empty_account_range_on_october_2007)
+def test_autosave_appends_changes_to_journal(app, tmpdir):
+    # After the first autosave, autosaves only append what changed to a journal next to it.
+    app.app.cache_path = str(tmpdir)
+    app.doc.must_autosave()
+    [snapshot] = tmpdir.listdir()
+    contents = snapshot.read()
+    app.doc.must_autosave()
+    eq_(tmpdir.listdir(), [snapshot]) # nothing changed, nothing to append
+    app.add_entry('3/10/2007', 'foo', increase='42')
+    app.doc.must_autosave()
+    journal = tmpdir.join(snapshot.basename + '.journal')
+    eq_(sorted(tmpdir.listdir()), [snapshot, journal])
+    eq_(snapshot.read(), contents)
+    eq_(len(journal.readlines()), 1)
+    assert 'foo' in journal.read()
+    assert '<account' not in journal.read() # the account didn't change
+
+@with_app(app_one_empty_account_range_on_october_2007)
+def test_autosave_journal_replay(app, tmpdir):
+    # Loading an autosaved snapshot replays its journal on top of it.
+    app.app.cache_path = str(tmpdir)
+    app.add_account('Savings')
+    app.show_account('Checking')
+    app.add_entry('1/10/2007', 'first', transfer='Savings', increase='1')
+    app.add_entry('2/10/2007', 'second', transfer='Salary', increase='2')
+    app.add_entry('3/10/2007', 'third', increase='3')
+    app.doc.must_autosave()
+    [snapshot] = tmpdir.listdir()
+    app.etable.select([1])
+    app.etable.delete()
+    app.etable.select([0])
+    app.etable[0].description = 'changed'
+    app.etable.save_edits()
+    app.add_entry('4/10/2007', 'fourth', transfer='Savings', increase='4')
+    app.doc.must_autosave()
+    app.show_nwview()
+    app.bsheet.selected = app.bsheet.assets[1] # Savings
+    app.bsheet.selected.name = 'Renamed'
+    app.bsheet.save_edits()
+    app.add_account('New')
+    app.show_account('Checking')
+    app.add_entry('5/10/2007', 'fifth', transfer='New', increase='5')
+    app.add_entry('6/10/2007', 'undone', increase='6')
+    app.doc.undo()
+    app.doc.first_weekday = 3
+    app.doc.must_autosave()
+    eq_(len(tmpdir.listdir()), 2)
+    newapp = TestApp(app=app.app)
+    newapp.doc.load_from_xml(str(snapshot))
+    newapp.doc.date_range = app.doc.date_range
+    newapp.doc._cook()
+    compare_apps(app.doc, newapp.doc)
+    eq_(newapp.doc.first_weekday, 3)
+    eq_(len(tmpdir.listdir()), 2) # the replayed document is written elsewhere
+
+@with_app(app_one_empty_account_range_on_october_2007)
+def test_autosave_journal_replay_keeps_transaction_order(app, tmpdir):
+    # Transactions of the same date keep their order in the replayed document, whether their date
+    # changed or they were moved.
+    app.app.cache_path = str(tmpdir)
+    app.show_account('Checking')
+    app.add_entry('2/10/2007', 'first', increase='1')
+    app.add_entry('3/10/2007', 'a', increase='2')
+    app.add_entry('3/10/2007', 'b', increase='3')
+    app.add_entry('4/10/2007', 'c', increase='4')
+    app.add_entry('4/10/2007', 'd', increase='5')
+    app.doc.must_autosave()
+    [snapshot] = tmpdir.listdir()
+    app.etable.select([0])
+    app.etable[0].date = '3/10/2007'
+    app.etable.save_edits()
+    app.etable.move([4], 3)
+    app.doc.must_autosave()
+    eq_(app.entry_descriptions(), ['a', 'b', 'first', 'd', 'c', 'TOTAL'])
+    newapp = TestApp(app=app.app)
+    newapp.doc.load_from_xml(str(snapshot))
+    newapp.doc.date_range = app.doc.date_range
+    newapp.show_account('Checking')
+    eq_(newapp.entry_descriptions(), ['a', 'b', 'first', 'd', 'c', 'TOTAL'])
+
+@with_app(app_one_empty_account_range_on_october_2007)
+def test_autosave_journal_interrupted_checkpoint(app, tmpdir):
+    # A checkpoint that didn't finish writing is ignored when replaying the journal.
+    app.app.cache_path = str(tmpdir)
+    app.doc.must_autosave()
+    [snapshot] = tmpdir.listdir()
+    app.add_entry('3/10/2007', 'foo', increase='42')
+    app.doc.must_autosave()
+    journal = tmpdir.join(snapshot.basename + '.journal')
+    journal.write('<checkpoint><transaction date="2007-10-04"', mode='a')
+    newapp = TestApp(app=app.app)
+    newapp.doc.load_from_xml(str(snapshot))
+    newapp.doc.date_range = app.doc.date_range
+    newapp.show_account('Checking')
+    eq_(newapp.entry_descriptions(), ['foo', 'TOTAL'])
+
+@with_app(app_one_empty_account_range_on_october_2007)
+def test_autosave_journal_compaction(app, tmpdir, monkeypatch):
+    # When the journal has enough checkpoints, the next autosave is a new snapshot.
+    monkeypatch.setattr(autosave, 'MAX_CHECKPOINTS', 2)
+    monkeypatch.setattr(time, 'time', lambda: 42)
+    app.app.cache_path = str(tmpdir)
+    app.doc.must_autosave()
+    for i in range(3):
+        app.add_entry('3/10/2007', 'foo{}'.format(i), increase='42')
+        app.doc.must_autosave()
+    eq_(
+        sorted(p.basename for p in tmpdir.listdir()),
+        ['autosave42.moneyguru', 'autosave42.moneyguru.journal', 'autosave43.moneyguru']
+    )
+    newapp = TestApp(app=app.app)
+    newapp.doc.load_from_xml(str(tmpdir.join('autosave43.moneyguru')))
+    newapp.doc.date_range = app.doc.date_range
+    newapp.doc._cook()
+    compare_apps(app.doc, newapp.doc)
+
 @with_app(app_one_empty_account_range_on_october_2007)
 def test_balance_recursion_limit(app):
     # Balance calculation don't cause recursion errors when there's a lot of them.
@@ -221,6 +359,43 @@ def test_save_dest_folder_doesnt_exist(app, tmpdir):
     app.doc.save_to_xml(str(dest))
     assert dest.exists()
 
+@with_app(app_one_empty_account_range_on_october_2007)
+def test_save_is_serialized_like_elementtree(app, tmpdir):
+    # We write our XML ourselves, but the result is exactly what ElementTree would write, tricky
+    # characters included.
+    app.show_account()
+    app.add_entry(description='"quoted" & <tagged>\ttab\r\ncrlf\rcr', payee='\x01ctrl', increase='42')
+    app.etable.selected_row.notes = 'multi\nline'
+    app.etable.save_edits()
+    dest = str(tmpdir.join('foo.xml'))
+    app.doc.save_to_xml(dest)
+    with open(dest, 'rb') as fp:
+        saved = fp.read()
+    tree = ET.ElementTree(ET.fromstring(saved))
+    expected = BytesIO()
+    expected.write(b'<?xml version="1.0" encoding="utf-8"?>\n')
+    tree.write(expected, encoding='utf-8', xml_declaration=False)
+    eq_(saved, expected.getvalue())
+
+@with_app(app_one_empty_account_range_on_october_2007)
+def test_failed_save_leaves_file_untouched(app, tmpdir, monkeypatch):
+    # We save in a temporary file that replaces the destination only when the save succeeded.
+    dest = tmpdir.join('foo.xml')
+    app.doc.save_to_xml(str(dest))
+    contents = dest.read()
+    app.add_account('other')
+
+    def failing_format(*args, **kwargs):
+        raise OSError()
+
+    monkeypatch.setattr(saver_native, 'format_amount', failing_format)
+    app.show_account()
+    app.add_entry(increase='42')
+    with raises(OSError):
+        app.doc.save_to_xml(str(dest))
+    eq_(dest.read(), contents)
+    eq_(tmpdir.listdir(), [dest])
+
 # ---
 class TestThreeAccountsAndOneEntry:
     def do_setup(self):
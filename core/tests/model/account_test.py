@@ -86,3 +86,57 @@ class TestOneAccount:
         # Each entry is converted using the entry's day rate.
         eq_(self.account.entries.cash_flow(range, CAD), Amount(201.40, CAD))
 
+
+class TestAccountListFind:
+    def setup_method(self, method):
+        self.accounts = AccountList(USD)
+        self.checking = Account('Checking', USD, AccountType.Asset)
+        self.checking.account_number = '1000'
+        self.savings = Account('Savings', USD, AccountType.Asset)
+        self.savings.account_number = '10'
+        self.accounts.add(self.checking)
+        self.accounts.add(self.savings)
+
+    def test_find_by_name_or_number(self):
+        # Names are matched case insensitively. An account number matches any name that starts
+        # with it and when many accounts match, the first one in the list wins.
+        eq_(self.accounts.find(' savings '), self.savings)
+        eq_(self.accounts.find('1000 foo'), self.checking)
+        eq_(self.accounts.find('1001'), self.savings)
+        eq_(self.accounts.find('1'), None)
+        self.accounts.sort(key=lambda a: a.name, reverse=True)
+        eq_(self.accounts.find('1000 foo'), self.savings)
+
+    def test_name_match_comes_after_earlier_number_match(self):
+        # An account whose name matches doesn't win against an account that comes before it in the
+        # list and whose number matches.
+        other = Account('10 foo', USD, AccountType.Asset)
+        self.accounts.add(other)
+        eq_(self.accounts.find('10 foo'), self.savings)
+        self.accounts.remove(self.savings)
+        eq_(self.accounts.find('10 foo'), other)
+
+    def test_indexes_follow_changes(self):
+        eq_(self.accounts.find('Checking'), self.checking)
+        self.accounts.set_account_name(self.checking, 'Chequing')
+        eq_(self.accounts.find('checking'), None)
+        eq_(self.accounts.find('chequing'), self.checking)
+        self.accounts.set_account_number(self.savings, '2000')
+        eq_(self.accounts.find('1001'), None)
+        eq_(self.accounts.find('2000'), self.savings)
+        self.checking.reference = 'foo'
+        self.accounts.reindex(self.checking)
+        eq_(self.accounts.find_reference('foo'), self.checking)
+        self.accounts.clear()
+        eq_(self.accounts.find('chequing'), None)
+        eq_(self.accounts.find_reference('foo'), None)
+
+    def test_add_existing_reference(self):
+        # An account with a reference that is already in the list isn't added.
+        self.checking.reference = 'foo'
+        self.accounts.reindex(self.checking)
+        other = Account('Other', USD, AccountType.Asset)
+        other.reference = 'foo'
+        self.accounts.add(other)
+        eq_(len(self.accounts), 2)
+        eq_(self.accounts.find('other'), None)
@@ -10,7 +10,9 @@ from pytest import raises
 from hscommon.testutil import eq_
 
 from ...model.currency import Currency, CAD, EUR, USD
-from ...model.amount import format_amount, parse_amount, Amount, UnsupportedCurrencyError
+from ...model.amount import (
+    format_amount, parse_amount, parse_canonical_amount, Amount, UnsupportedCurrencyError
+)
 
 
 # --- Amount
@@ -350,6 +352,48 @@ def test_strict_currency():
     with raises(UnsupportedCurrencyError):
         parse_amount('ZZZ 42', default_currency=USD, strict_currency=True)
 
+# --- Parse canonical amount
+def test_parse_canonical():
+    eq_(parse_canonical_amount('CAD 42.54'), Amount(42.54, CAD))
+    eq_(parse_canonical_amount('USD -1234.05'), Amount(-1234.05, USD))
+    # Zero has no currency
+    eq_(parse_canonical_amount('0.00'), 0)
+    eq_(parse_canonical_amount('CAD 0.00'), 0)
+
+def test_parse_canonical_exponents():
+    # The number of decimals has to match the exponent of the currency.
+    JPY = Currency.register('JPY', 'Japanese yen', exponent=0)
+    BHD = Currency.register('BHD', 'BHD', exponent=3)
+    eq_(parse_canonical_amount('JPY 42'), Amount(42, JPY))
+    eq_(parse_canonical_amount('BHD -1.234'), Amount(-1.234, BHD))
+    assert parse_canonical_amount('JPY 42.00') is None
+    assert parse_canonical_amount('BHD 1.23') is None
+    assert parse_canonical_amount('CAD 42.5') is None
+    assert parse_canonical_amount('CAD 42') is None
+
+def test_parse_canonical_rejects_other_forms():
+    # Anything that format_amount() doesn't return without a default currency isn't canonical and
+    # has to go through parse_amount().
+    for string in [
+            '42.54', '42.54 CAD', 'cad 42.54', 'CAD  42.54', 'CAD 1,000.00', 'CAD 1 000.00',
+            'CAD 42,54', 'CAD (42.54)', 'CAD 40+2.54', 'CAD 42.', 'CAD .54', 'CAD -', 'CAD ',
+            'ZZZ 42.54', '', '12.00', '-0.00x']:
+        assert parse_canonical_amount(string) is None, string
+
+def test_parse_canonical_ascii_digits_and_length():
+    # Only ASCII digits are canonical and numbers with more digits than an int64 can hold aren't
+    # either. This is the same with or without the amount.c module.
+    for string in ['CAD \u0663.00', 'CAD 1.\uff11\uff12', '\u0660.00', 'CAD 12345678901234567.89']:
+        assert parse_canonical_amount(string) is None, string
+    assert parse_canonical_amount('CAD 9999999999999999.99') is not None
+
+def test_parse_canonical_roundtrip():
+    # Whatever format_amount() returns without a default currency parses back to the same amount.
+    for value in [0, 0.01, -0.01, 1, -42.54, 1234567.89, 98765432109.87]:
+        for currency in [CAD, USD, EUR]:
+            amount = Amount(value, currency)
+            eq_(parse_canonical_amount(format_amount(amount)), amount)
+
 # --- Format amount
 def test_format_blank_zero():
     # When blank_zero is True, 0 is rendered as an empty string.
@@ -0,0 +1,43 @@
+# Copyright 2016 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+from hscommon.testutil import eq_
+
+from ...model.completion import CompletionIndex
+
+def test_complete_ranks_by_latest_mtime():
+    index = CompletionIndex()
+    index.add('foo', 'key1', 1)
+    index.add('Fôbar', 'key2', 2)
+    index.add('  fob', 'key3', 3)
+    index.add('bar', 'key4', 4)
+    index.add('foo', 'key5', 5)
+    # Matching ignores accents, case and leading whitespace.
+    eq_(index.complete('fo'), ['foo', '  fob', 'Fôbar'])
+    eq_(index.complete('FOB'), ['  fob', 'Fôbar'])
+    eq_(index.complete('x'), [])
+    eq_(index.values(), ['foo', 'bar', '  fob', 'Fôbar'])
+
+def test_same_mtime_keeps_first_seen_first():
+    index = CompletionIndex()
+    index.add('foo', 'key1', 1)
+    index.add('bar', 'key2', 1)
+    eq_(index.values(), ['foo', 'bar'])
+    eq_(index.complete(''), ['foo', 'bar'])
+
+def test_remove():
+    # A value stays a candidate as long as a key gives it to us, ranked by the latest mtime of the
+    # remaining keys.
+    index = CompletionIndex()
+    index.add('foo', 'key1', 1)
+    index.add('foo', 'key2', 3)
+    index.add('bar', 'key3', 2)
+    eq_(index.values(), ['foo', 'bar'])
+    index.remove('foo', 'key2')
+    eq_(index.values(), ['bar', 'foo'])
+    index.remove('foo', 'key1')
+    eq_(index.values(), ['bar'])
+    eq_(index.complete('f'), [])
@@ -148,6 +148,27 @@ def test_seek_rate_before():
     setup_two_daily_rate()
     eq_(USD.value_in(CAD, date(2008, 4, 19)), 1/0.996115)
 
+def test_get_rates():
+    # get_rates() returns the same rates as get_rate() would, in batch.
+    setup_two_daily_rate()
+    db = Currency.get_rates_db()
+    dates = [date(2008, 4, 19), date(2008, 4, 20), date(2008, 4, 24), date(2008, 4, 26)]
+    eq_(db.get_rates(dates, 'USD', 'CAD'), [db.get_rate(d, 'USD', 'CAD') for d in dates])
+    eq_(USD.values_in(CAD, dates), [USD.value_in(CAD, d) for d in dates])
+
+def test_set_rate_updates_only_following_days():
+    # Setting a rate in the middle of our loaded rates updates days until the next rate.
+    setup_two_daily_rate()
+    USD.value_in(CAD, date(2008, 4, 22)) # rates are loaded
+    USD.set_CAD_value(42, date(2008, 4, 22))
+    dates = [date(2008, 4, 21), date(2008, 4, 22), date(2008, 4, 24), date(2008, 4, 25)]
+    eq_(USD.values_in(CAD, dates), [1/0.996115, 42, 42, 1/0.997115])
+    # before and after our loaded range
+    USD.set_CAD_value(12, date(2008, 4, 10))
+    USD.set_CAD_value(43, date(2008, 4, 30))
+    dates = [date(2008, 4, 9), date(2008, 4, 19), date(2008, 4, 29), date(2008, 5, 2)]
+    eq_(USD.values_in(CAD, dates), [12, 12, 1/0.997115, 43])
+
 # --- Rates of multiple currencies
 def setup_rates_of_multiple_currencies():
     USD.set_CAD_value(1/0.996115, date(2008, 4, 20))
@@ -0,0 +1,94 @@
+# Copyright 2016 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+from datetime import date
+
+from hscommon.testutil import eq_
+
+from ...model.account import Account, AccountList, AccountType
+from ...model.amount import Amount
+from ...model.currency import USD, CAD
+from ...model.date import DateRange, MonthRange
+from ...model.entry import EntryList, ColumnarEntryList
+from ...model.oven import Oven
+from ...model.transaction import Transaction
+from ...model.transaction_list import TransactionList
+
+class TestColumnarEntryList:
+    # ColumnarEntryList behaves exactly like the object-based EntryList.
+    def setup_method(self, method):
+        USD.set_CAD_value(0.9, date(2008, 1, 1))
+        USD.set_CAD_value(0.8, date(2008, 1, 2))
+        self.account = Account('Checking', USD, AccountType.Asset)
+        accounts = AccountList(CAD)
+        accounts.add(self.account)
+        transactions = TransactionList([
+            Transaction(date(2007, 12, 31), account=self.account, amount=Amount(20, USD)),
+            Transaction(date(2008, 1, 1), account=self.account, amount=Amount(100, USD)),
+            Transaction(date(2008, 1, 1), account=self.account, amount=Amount(-120, USD)),
+            Transaction(date(2008, 1, 3), account=self.account, amount=Amount(70, CAD)),
+            Transaction(date(2008, 1, 31), account=self.account, amount=Amount(2, USD)),
+        ])
+        transactions[0].splits[0].reconciliation_date = date(2008, 1, 2)
+        self.oven = Oven(accounts, transactions, [], [])
+        self.oven.cook(date.min, date.max)
+        self.columnar = self.account.entries
+        self.reference = EntryList(self.account)
+        for entry in self.columnar:
+            self.reference.add_entry(entry)
+
+    def test_is_columnar(self):
+        assert isinstance(self.columnar, ColumnarEntryList)
+
+    def test_balances(self):
+        eq_(self.columnar.balance(), self.reference.balance())
+        dates = [date(2007, 1, 1), date(2008, 1, 1), date(2008, 1, 2), date(2008, 2, 1)]
+        for d in dates:
+            eq_(self.columnar.balance(d), self.reference.balance(d))
+            eq_(self.columnar.balance(d, CAD), self.reference.balance(d, CAD))
+            eq_(self.columnar.balance_with_budget(d), self.reference.balance_with_budget(d))
+        eq_(self.columnar.balance_of_reconciled(), self.reference.balance_of_reconciled())
+
+    def test_cash_flow(self):
+        for currency in [None, USD, CAD]:
+            date_range = MonthRange(date(2008, 1, 1))
+            eq_(self.columnar.cash_flow(date_range, currency), self.reference.cash_flow(date_range, currency))
+
+    def test_entries(self):
+        eq_(len(self.columnar), 5)
+        eq_(list(self.columnar), list(self.reference))
+        eq_(self.columnar[-1].index, 4)
+        eq_(self.columnar.last_entry(date(2008, 1, 2)), self.reference.last_entry(date(2008, 1, 2)))
+        eq_(self.columnar.last_entry(date(2008, 1, 2)).balance, Amount(0, USD))
+        eq_(self.columnar.last_entry(date(2007, 1, 1)), None)
+
+    def test_clear(self):
+        self.columnar.clear(date(2008, 1, 1))
+        self.reference.clear(date(2008, 1, 1))
+        eq_(len(self.columnar), 1)
+        eq_(self.columnar.balance(), self.reference.balance())
+        eq_(self.columnar.balance_of_reconciled(), self.reference.balance_of_reconciled())
+        self.columnar.clear(None)
+        eq_(len(self.columnar), 0)
+        eq_(self.columnar.balance(), 0)
+
+    def test_cash_flow_partial_ranges(self):
+        # Cash flows are differences of prefix sums, which must hold for any range boundaries.
+        starts = [date(2007, 12, 31), date(2008, 1, 1), date(2008, 1, 2), date(2008, 1, 4)]
+        for start in starts:
+            for currency in [USD, CAD]:
+                date_range = DateRange(start, date(2008, 1, 31))
+                eq_(self.columnar.cash_flow(date_range, currency), self.reference.cash_flow(date_range, currency))
+
+    def test_cash_flow_after_clear(self):
+        # Our cumulative flows are truncated on clear() and extended when entries are re-added.
+        date_range = MonthRange(date(2008, 1, 1))
+        eq_(self.columnar.cash_flow(date_range, CAD), self.reference.cash_flow(date_range, CAD))
+        entries = list(self.columnar)
+        self.columnar.clear(date(2008, 1, 3))
+        for entry in entries[3:]:
+            self.columnar.add_entry(entry)
+        eq_(self.columnar.cash_flow(date_range, CAD), self.reference.cash_flow(date_range, CAD))
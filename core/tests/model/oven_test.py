@@ -0,0 +1,80 @@
+# Copyright 2016 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+from datetime import date
+
+from hscommon.testutil import eq_
+
+from ...model.account import Account, AccountList, AccountType
+from ...model.amount import Amount
+from ...model.currency import USD
+from ...model.oven import Oven
+from ...model.transaction import Transaction
+from ...model.transaction_list import TransactionList
+
+class TestScopedCooking:
+    def setup_method(self, method):
+        self.checking = Account('Checking', USD, AccountType.Asset)
+        self.savings = Account('Savings', USD, AccountType.Asset)
+        self.accounts = AccountList(USD)
+        self.accounts.add(self.checking)
+        self.accounts.add(self.savings)
+        self.transactions = TransactionList([
+            Transaction(date(2008, 1, 1), account=self.checking, amount=Amount(10, USD)),
+            Transaction(date(2008, 1, 2), account=self.savings, amount=Amount(20, USD)),
+            Transaction(date(2008, 1, 3), account=self.checking, amount=Amount(30, USD)),
+        ])
+        self.oven = Oven(self.accounts, self.transactions, [], [])
+        self.oven.cook(until_date=date(2008, 1, 31))
+
+    def test_unaffected_accounts_are_not_recooked(self, monkeypatch):
+        # When we scope our cooking to an account, the entries of other accounts are left alone.
+        # (verification would recook everything, so we disable it)
+        monkeypatch.setattr(Oven, 'VERIFY_INCREMENTAL_COOKING', False)
+        self.transactions[2].splits[0].amount = Amount(40, USD)
+        self.oven.cook(date(2008, 1, 1), date(2008, 1, 31), accounts={self.checking})
+        eq_(self.checking.entries.balance(), Amount(50, USD))
+        eq_(len(self.savings.entries), 1)
+        # balance was computed before scoped cooking
+        self.transactions[1].splits[0].amount = Amount(40, USD)
+        self.oven.cook(date(2008, 1, 1), date(2008, 1, 31), accounts={self.checking})
+        eq_(self.savings.entries.balance(), Amount(20, USD))
+
+    def test_new_until_date_makes_a_full_cook(self, monkeypatch):
+        # If our until_date changed, scoping can't be trusted, so we cook everything.
+        monkeypatch.setattr(Oven, 'VERIFY_INCREMENTAL_COOKING', False)
+        self.transactions[1].splits[0].amount = Amount(40, USD)
+        self.oven.cook(date(2008, 1, 1), date(2008, 2, 28), accounts={self.checking})
+        eq_(self.savings.entries.balance(), Amount(40, USD))
+
+    def test_verify_against_full_cook(self):
+        # With VERIFY_INCREMENTAL_COOKING (enabled for all tests), scoping with an incomplete
+        # account set is caught.
+        self.transactions[1].splits[0].amount = Amount(40, USD)
+        try:
+            self.oven.cook(date(2008, 1, 2), date(2008, 1, 31), accounts={self.checking})
+        except AssertionError:
+            pass
+        else:
+            assert False, "Scoped cooking with a missing account should fail verification"
+        # the verification cook leaves us in a correct state
+        eq_(self.savings.entries.balance(), Amount(40, USD))
+
+    def test_revisions(self):
+        # A scoped cook only bumps the revision of the accounts it cooked, and only for the dates
+        # it cooked from.
+        revision = self.oven.revision()
+        eq_(self.oven.revision(self.savings), revision)
+        self.transactions[2].splits[0].amount = Amount(40, USD)
+        self.oven.cook(date(2008, 1, 3), date(2008, 1, 31), accounts={self.checking})
+        eq_(self.oven.revision(self.savings), revision)
+        assert self.oven.revision(self.checking) > revision
+        eq_(self.oven.revision(self.checking, until_date=date(2008, 1, 2)), revision)
+        eq_(self.oven.revision(self.checking, until_date=date(2008, 1, 3)), self.oven.revision())
+        eq_(self.oven.revision(until_date=date(2008, 1, 2)), revision)
+        # A full cook bumps everything
+        self.oven.cook(until_date=date(2008, 1, 31))
+        assert self.oven.revision(self.savings, until_date=date(2008, 1, 1)) > revision
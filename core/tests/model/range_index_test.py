@@ -0,0 +1,42 @@
+# Copyright 2016 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+from pytest import raises
+from hscommon.testutil import eq_
+
+from ...model.amount import Amount
+from ...model.currency import USD, CAD
+from ...model.range_index import RangeIndex, AmountIndex
+
+def test_range_index():
+    index = RangeIndex()
+    index.add(2, 'a')
+    index.add(1, 'b')
+    index.add(2, 'c')
+    index.add(4, 'd')
+    eq_(index.get(2), {'a', 'c'})
+    eq_(index.between(1, 2), {'a', 'b', 'c'})
+    eq_(index.between(3, 3), set())
+    index.remove(2, 'a')
+    index.remove(2, 'c')
+    assert 2 not in index
+    eq_(index.between(0, 10), {'b', 'd'})
+    with raises(KeyError):
+        index.remove(2, 'a')
+
+def test_amount_index():
+    index = AmountIndex()
+    index.add(Amount(10, USD), 'a')
+    index.add(Amount(10.5, CAD), 'b')
+    index.add(Amount(0, CAD), 'zero')
+    index.add(0, 'other_zero')
+    eq_(index.between(10, 11), {'a', 'b'})
+    eq_(index.between(10, 11, USD), {'a'})
+    # Zero amounts are found in any currency.
+    eq_(index.near(Amount(0, USD)), {'zero', 'other_zero'})
+    eq_(index.near(Amount(10, CAD), tolerance=0.5), {'b'})
+    index.remove(Amount(10.5, CAD), 'b')
+    eq_(index.between(10, 11), {'a'})
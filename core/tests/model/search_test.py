@@ -0,0 +1,86 @@
+# Copyright 2016 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+from datetime import date, datetime
+
+from hscommon.testutil import eq_
+
+from ...model.account import Account, AccountType
+from ...model.amount import Amount
+from ...model.currency import USD
+from ...model.date import DateRange
+from ...model.search import parse_query, AndQuery, DateQuery, FieldQuery, NotQuery, OrQuery
+from ...model.transaction import Transaction
+from ...model.transaction_list import TransactionList
+
+def parse_amount(s):
+    return Amount(float(s), USD)
+
+def parse_date(s):
+    return datetime.strptime(s, '%Y-%m-%d').date()
+
+def parse(query_string):
+    return parse_query(query_string, parse_amount, parse_date)
+
+def test_parse_simple():
+    # A simple query searches all fields.
+    query = parse('Foo')
+    assert isinstance(query, FieldQuery)
+    eq_(query.query['description'], 'foo')
+    eq_(query.query['account'], {'foo'})
+    assert 'amount' not in query.query
+
+def test_parse_targeted():
+    query = parse('payee: foo')
+    eq_(query.query, {'payee': 'foo'})
+    query = parse('amount: 10..2')
+    eq_(query.query, {'amount_range': (Amount(2, USD), Amount(10, USD))})
+
+def test_parse_precedence():
+    # NOT binds tighter than AND, which binds tighter than OR.
+    query = parse('foo AND NOT bar OR baz')
+    assert isinstance(query, OrQuery)
+    foo_and_not_bar, baz = query.queries
+    assert isinstance(foo_and_not_bar, AndQuery)
+    assert isinstance(foo_and_not_bar.queries[1], NotQuery)
+    eq_(baz.query['description'], 'baz')
+
+def test_parse_lowercase_operators():
+    # Lowercase operators are part of the searched text.
+    query = parse('bread and butter')
+    eq_(query.query['description'], 'bread and butter')
+
+def test_parse_date():
+    query = parse('date: 2016-01-01..')
+    assert isinstance(query, DateQuery)
+    eq_((query.start_date, query.end_date), (date(2016, 1, 1), None))
+    query = parse('date: 2016-01-01')
+    eq_((query.start_date, query.end_date), (date(2016, 1, 1), date(2016, 1, 1)))
+    # Invalid dates match nothing
+    eq_(parse('date: foo').query, {})
+
+def test_transactions():
+    # Running a query against a transaction list gives the same result as matching transactions
+    # one by one.
+    checking = Account('Checking', USD, AccountType.Asset)
+    t1 = Transaction(date(2016, 1, 1), description='foo', payee='bar', account=checking, amount=Amount(1, USD))
+    t2 = Transaction(date(2016, 1, 5), description='foobar', amount=Amount(2, USD))
+    t3 = Transaction(date(2016, 1, 10), description='baz', account=checking, amount=Amount(3, USD))
+    transactions = TransactionList([t1, t2, t3])
+    query_strings = [
+        'foo', 'foo AND bar', 'foo OR baz', 'NOT foo', 'NOT foo AND NOT bar', 'xyz OR NOT checking',
+        'date: 2016-01-02..', 'date: ..2016-01-05 AND amount: 2..3', 'date: 2016-01-10 OR 1',
+        'NOT date: 2016-01-02..2016-01-31 OR description: baz', 'date: foo OR bar',
+    ]
+    date_range = DateRange(date(2016, 1, 2), date(2016, 1, 31))
+    for query_string in query_strings:
+        query = parse(query_string)
+        expected = {t for t in transactions if query.matches(t)}
+        eq_(query.transactions(transactions), expected)
+        # With a date range, only matching transactions in it are returned.
+        expected = {t for t in expected if t.date in date_range}
+        eq_(query.transactions(transactions, date_range), expected)
+    eq_(parse('foo AND NOT baz').transactions(transactions), {t1, t2})
@@ -0,0 +1,225 @@
+# Copyright 2016 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+from datetime import date
+from operator import attrgetter
+
+from pytest import raises
+from hscommon.testutil import eq_
+
+from ...model.account import Account, AccountType, Group
+from ...model.amount import Amount
+from ...model.currency import USD
+from ...model.date import DateRange
+from ...model.transaction import Transaction
+from ...model.transaction_list import TransactionList
+
+def test_add_assigns_next_position_at_date():
+    # Transactions added without a position come after the other transactions of the same date.
+    transactions = TransactionList()
+    t1 = Transaction(date(2016, 1, 1))
+    t2 = Transaction(date(2016, 1, 1))
+    t3 = Transaction(date(2016, 1, 2))
+    transactions.add(t1, position=4)
+    transactions.add(t2)
+    transactions.add(t3)
+    eq_(t2.position, 5)
+    eq_(t3.position, 0)
+    eq_(transactions.transactions_at_date(date(2016, 1, 1)), {t1, t2})
+
+def test_remove_updates_date_index():
+    transactions = TransactionList()
+    t1 = Transaction(date(2016, 1, 1))
+    t2 = Transaction(date(2016, 1, 1))
+    transactions.add(t1)
+    transactions.add(t2)
+    transactions.remove(t1)
+    eq_(transactions.transactions_at_date(date(2016, 1, 1)), {t2})
+    transactions.remove(t2)
+    eq_(transactions.transactions_at_date(date(2016, 1, 1)), set())
+
+def test_date_change_after_clear_cache():
+    # After a date change, clear_cache() makes the date index pick up the new date.
+    transactions = TransactionList()
+    t1 = Transaction(date(2016, 1, 1))
+    t2 = Transaction(date(2016, 1, 2))
+    transactions.add(t1)
+    transactions.add(t2)
+    t1.date = date(2016, 1, 2)
+    transactions.clear_cache()
+    eq_(transactions.transactions_at_date(date(2016, 1, 1)), set())
+    eq_(transactions.transactions_at_date(date(2016, 1, 2)), {t1, t2})
+    transactions.move_last(t1)
+    eq_(t1.position, 1)
+    t3 = Transaction(date(2016, 1, 2))
+    transactions.add(t3)
+    eq_(t3.position, 2)
+
+def test_move_before_updates_max_position():
+    transactions = TransactionList()
+    t1 = Transaction(date(2016, 1, 1))
+    t2 = Transaction(date(2016, 1, 1))
+    transactions.add(t1)
+    transactions.add(t2)
+    transactions.move_before(t2, t1)
+    eq_((t2.position, t1.position), (0, 1))
+    t3 = Transaction(date(2016, 1, 1))
+    transactions.add(t3)
+    eq_(t3.position, 2)
+
+def test_list_behavior():
+    # TransactionList isn't a list, but it can be used as one.
+    t1 = Transaction(date(2016, 1, 2))
+    t2 = Transaction(date(2016, 1, 1))
+    t3 = Transaction(date(2016, 1, 3))
+    transactions = TransactionList([t1, t2])
+    transactions.add(t3)
+    eq_(list(transactions), [t1, t2, t3])
+    eq_(len(transactions), 3)
+    eq_(transactions[-1], t3)
+    eq_(transactions[:2], [t1, t2])
+    assert t2 in transactions
+    transactions.sort(key=attrgetter('date'))
+    eq_(list(transactions), [t2, t1, t3])
+    eq_(transactions[0], t2)
+    transactions.remove(t1)
+    eq_(transactions[1], t3)
+    assert t1 not in transactions
+    with raises(ValueError):
+        transactions.remove(t1)
+
+def test_add_twice():
+    # Adding a transaction that is already there does nothing.
+    transactions = TransactionList()
+    txn = Transaction(date(2016, 1, 1))
+    transactions.add(txn)
+    transactions.add(txn)
+    eq_(len(transactions), 1)
+    eq_(txn.position, 0)
+
+def test_transactions_for_account():
+    checking = Account('Checking', USD, AccountType.Asset)
+    income = Account('Income', USD, AccountType.Income)
+    t1 = Transaction(date(2016, 1, 1), account=checking, amount=Amount(1, USD))
+    t2 = Transaction(date(2016, 1, 1), account=income, amount=Amount(1, USD))
+    t2.splits[1].account = checking
+    transactions = TransactionList([t1])
+    transactions.add(t2)
+    eq_(transactions.transactions_for_account(checking), {t1, t2})
+    eq_(transactions.transactions_for_account(income), {t2})
+    transactions.remove(t2)
+    eq_(transactions.transactions_for_account(checking), {t1})
+    eq_(transactions.transactions_for_account(income), set())
+
+def test_reindex():
+    # After changing a transaction's date or splits, reindex() updates our indexes.
+    checking = Account('Checking', USD, AccountType.Asset)
+    income = Account('Income', USD, AccountType.Income)
+    txn = Transaction(date(2016, 1, 1), account=checking, amount=Amount(1, USD))
+    transactions = TransactionList([txn])
+    eq_(transactions.transactions_for_account(checking), {txn})
+    txn.date = date(2016, 1, 2)
+    txn.splits[0].account = income
+    transactions.reindex(txn)
+    eq_(transactions.transactions_for_account(checking), set())
+    eq_(transactions.transactions_for_account(income), {txn})
+    eq_(transactions.transactions_at_date(date(2016, 1, 1)), set())
+    eq_(transactions.transactions_at_date(date(2016, 1, 2)), {txn})
+
+def test_reassign_account():
+    checking = Account('Checking', USD, AccountType.Asset)
+    income = Account('Income', USD, AccountType.Income)
+    t1 = Transaction(date(2016, 1, 1), account=checking, amount=Amount(1, USD))
+    t2 = Transaction(date(2016, 1, 1), account=checking, amount=Amount(1, USD))
+    t2.splits[1].account = income
+    transactions = TransactionList([t1, t2])
+    transactions.reassign_account(checking)
+    # t1 doesn't reference any account anymore and is removed.
+    eq_(list(transactions), [t2])
+    eq_(transactions.transactions_for_account(checking), set())
+    eq_(transactions.transactions_for_account(income), {t2})
+
+def test_completion_follows_changes():
+    # Completion data is kept up to date when transactions are added, changed and removed.
+    checking = Account('Checking', USD, AccountType.Asset)
+    t1 = Transaction(date(2016, 1, 1), description='foo', payee='bar', account=checking, amount=Amount(1, USD))
+    t1.mtime = 1
+    transactions = TransactionList([t1])
+    eq_(transactions.complete('description', 'f'), ['foo'])
+    t2 = Transaction(date(2016, 1, 1), description='fob')
+    t2.mtime = 2
+    transactions.add(t2)
+    eq_(transactions.descriptions, ['fob', 'foo'])
+    eq_(transactions.complete('description', 'f'), ['fob', 'foo'])
+    t1.description = 'baz'
+    t1.mtime = 3
+    transactions.reindex(t1)
+    eq_(transactions.complete('description', 'f'), ['fob'])
+    eq_(transactions.complete('description', 'b'), ['baz'])
+    eq_(transactions.complete('account', 'c'), ['Checking'])
+    transactions.remove(t1)
+    eq_(transactions.payees, [''])
+    eq_(transactions.account_names, [])
+
+def test_matching():
+    # matching() gives the same results as Transaction.matches().
+    checking = Account('Checking', USD, AccountType.Asset)
+    checking.group = Group('Banks', AccountType.Asset)
+    income = Account('Income', USD, AccountType.Income)
+    t1 = Transaction(
+        date(2016, 1, 1), description='Grocery Store', payee='Foo', checkno='42', account=checking,
+        amount=Amount(1, USD)
+    )
+    t1.splits[1].account = income
+    t1.splits[0].memo = 'Bread'
+    t2 = Transaction(
+        date(2016, 1, 1), description='Gas station', payee='bar', account=income, amount=Amount(2, USD)
+    )
+    transactions = TransactionList([t1, t2])
+    queries = [
+        {'description': 'gro'}, {'description': 'sto'}, {'description': 's'}, {'description': ''},
+        {'description': 'grocery store'}, {'description': 'xyz'}, {'payee': 'foo'},
+        {'memo': 'bre'}, {'memo': 'stat'}, {'checkno': '42'}, {'checkno': '4'},
+        {'account': {'checking'}}, {'account': {'income', 'foo'}}, {'group': {'banks'}},
+        {'amount': Amount(2, USD)}, {'amount': Amount(3, USD)}, {'amount_range': (Amount(1, USD), Amount(1.5, USD))},
+        {'amount_range': (Amount(0, USD), Amount(5, USD))}, {'description': 'bar', 'payee': 'bar'},
+    ]
+    for query in queries:
+        expected = {t for t in transactions if t.matches(query)}
+        eq_(transactions.matching(query), expected)
+
+def test_matching_follows_changes():
+    t1 = Transaction(date(2016, 1, 1), description='foo')
+    t2 = Transaction(date(2016, 1, 1), description='foobar')
+    transactions = TransactionList([t1, t2])
+    eq_(transactions.matching({'description': 'foo'}), {t1, t2})
+    t1.description = 'baz'
+    transactions.reindex(t1)
+    eq_(transactions.matching({'description': 'foo'}), {t2})
+    eq_(transactions.matching({'description': 'baz'}), {t1})
+    transactions.remove(t2)
+    eq_(transactions.matching({'description': 'foo'}), set())
+    t3 = Transaction(date(2016, 1, 1), payee='foo')
+    transactions.add(t3)
+    eq_(transactions.matching({'description': 'foo', 'payee': 'foo'}), {t3})
+
+def test_matching_in_date_range():
+    # With a date range, only transactions in it are returned.
+    t1 = Transaction(date(2016, 1, 1), description='foo')
+    t2 = Transaction(date(2016, 2, 1), description='foo')
+    transactions = TransactionList([t1, t2])
+    eq_(transactions.matching({'description': 'foo'}, DateRange(date(2016, 1, 1), date(2016, 1, 31))), {t1})
+    eq_(transactions.matching({'description': 'foo'}, DateRange(date(2016, 3, 1), date(2016, 3, 31))), set())
+
+def test_transactions_between():
+    t1 = Transaction(date(2016, 1, 1))
+    t2 = Transaction(date(2016, 1, 5))
+    t3 = Transaction(date(2016, 1, 10))
+    transactions = TransactionList([t1, t2, t3])
+    eq_(transactions.transactions_between(date(2016, 1, 1), date(2016, 1, 5)), {t1, t2})
+    t2.date = date(2016, 1, 20)
+    transactions.reindex(t2)
+    eq_(transactions.transactions_between(date(2016, 1, 2), date(2016, 1, 31)), {t2, t3})
@@ -5,7 +5,7 @@
 # http://www.gnu.org/licenses/gpl-3.0.html
 
 from hscommon.testutil import eq_
-from core.plugin import CurrencyProviderPlugin, ViewPlugin
+from core.plugin import CurrencyProviderPlugin, ViewPlugin, EntryIndex
 
 from ..model.currency import Currency
 from ..const import PaneType
@@ -87,3 +87,19 @@ def test_disable_currency_plugin(app):
     # ATS, not being supported is replaced by our default currency
     eq_(tview.ttable[0].amount, '42.00')
 
+
+@with_app(TestApp)
+def test_entry_index(app):
+    # EntryIndex finds entries with a close amount and date.
+    app.add_account('checking')
+    app.show_account()
+    app.add_entry('01/01/2016', description='a', increase='10')
+    app.add_entry('05/01/2016', description='b', increase='10.50')
+    app.add_entry('20/01/2016', description='c', increase='10')
+    app.add_entry('02/01/2016', description='d', decrease='10')
+    entries = app.doc.accounts.find('checking').entries
+    index = EntryIndex(entries)
+    amount = entries[0].amount
+    eq_([e.description for e in index.find(amount)], ['a', 'c'])
+    eq_([e.description for e in index.find(amount, tolerance=0.5)], ['a', 'b', 'c'])
+    eq_([e.description for e in index.find(amount, tolerance=1, date=entries[0].date, days=5)], ['a', 'b'])
@@ -533,6 +533,45 @@ def test_undo_mass_edition(app, checkstate):
     mepanel.save()
     checkstate()
 
+@with_app(app_two_txns_in_two_accounts)
+def test_mass_edition_action_only_keeps_changes(app):
+    # Once a change is over, its action doesn't hold copies of the transactions it changed, but only
+    # the attributes that changed in them.
+    app.etable.select([0, 1])
+    mepanel = app.mw.edit_item()
+    mepanel.description_field.text = 'foobar'
+    mepanel.save()
+    app.doc.undo()
+    action = app.doc._undoer._actions[-1]
+    eq_([diff.attrs for txn, diff in action.changed_transactions], [('description', ), ('description', )])
+    eq_(action.size, 4)
+    app.doc.redo()
+    eq_([row.description for row in app.etable.rows], ['foobar', 'foobar'])
+
+@with_app(TestApp)
+def test_oldest_actions_are_forgotten_over_max_size(app):
+    # When our actions hold too much, the oldest ones can't be undone anymore.
+    app.doc._undoer.MAX_SIZE = 2
+    app.show_nwview()
+    for _ in range(4):
+        app.bsheet.add_account()
+    app.doc.undo()
+    app.doc.undo()
+    app.doc.undo()
+    assert not app.doc.can_undo()
+    eq_(app.account_names(), ['New account'])
+
+@with_app(app_two_txns_in_two_accounts)
+def test_undone_action_scope(app):
+    # An undone transaction change knows from when and which accounts have to be recooked.
+    app.etable.select([0])
+    app.etable[0].date = '21/6/2008'
+    app.etable.save_edits()
+    app.doc.undo()
+    action = app.doc._undoer._actions[-1]
+    eq_(action.min_date, date(2008, 6, 19))
+    eq_({a.name for a in action.affected_accounts}, {'first', 'second'})
+
 @with_app(app_two_txns_in_two_accounts)
 def test_undo_schedule(app, checkstate):
     tpanel = app.mw.edit_item()
@@ -787,3 +826,56 @@ def test_delete_account_with_budget(app, checkstate):
 def test_delete_budget(app, checkstate):
     app.btable.delete()
     checkstate()
+
+# ---
+@with_app(app_two_txns_in_two_accounts)
+def test_batch_is_undone_as_a_single_action(app, checkstate):
+    # Changes made in a batch are undone and redone in one step.
+    doc = app.doc
+    t1, t2 = doc.transactions
+    with doc.batch('Batch edit'):
+        doc.change_transactions([t1, t2], description='foo')
+        doc.change_transactions([t2], date=date(2008, 6, 18), to='new account')
+        doc.duplicate_transactions([t1])
+        doc.delete_transactions([t1])
+    eq_(doc.undo_description(), 'Batch edit')
+    checkstate()
+    doc.undo()
+    eq_(doc.undo_description(), 'Add transaction')
+
+@with_app(app_two_txns_in_two_accounts)
+def test_batch_cooks_and_notifies_once(app, monkeypatch):
+    # Cooking and notifications happen once, at the end of the batch.
+    doc = app.doc
+    monkeypatch.setattr(doc.oven, 'VERIFY_INCREMENTAL_COOKING', False)
+    cook_calls = []
+    cook = doc.oven.cook
+    def logged_cook(**kwargs):
+        cook_calls.append(kwargs)
+        cook(**kwargs)
+    monkeypatch.setattr(doc.oven, 'cook', logged_cook)
+    app.show_tview()
+    app.clear_gui_calls()
+    t1, t2 = doc.transactions
+    with doc.batch():
+        doc.change_transactions([t1], description='foo')
+        doc.change_transactions([t2], description='bar')
+        eq_(cook_calls, [])
+        app.ttable.view.check_gui_calls([])
+    eq_(len(cook_calls), 1)
+    eq_(cook_calls[0]['from_date'], date(2008, 6, 19))
+    eq_(app.ttable.view.calls.count('refresh'), 1)
+    eq_(app.ttable[0].description, 'foo')
+    eq_(doc.undo_description(), 'Change transaction')
+
+@with_app(app_two_txns_in_two_accounts)
+def test_batch_removes_empty_auto_created_accounts_at_the_end(app):
+    # Accounts created in the batch aren't removed because they aren't cooked yet, but accounts
+    # that end up empty are.
+    doc = app.doc
+    t1, t2 = doc.transactions
+    with doc.batch():
+        doc.change_transactions([t2], to='temporary')
+        doc.change_transactions([t1], to='new account')
+        doc.change_transactions([t2], to='')
+    eq_(app.account_names(), ['first', 'second', 'new account'])
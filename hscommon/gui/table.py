@@ -6,7 +6,9 @@
 # which should be included with this package. The terms are also available at
 # http://www.gnu.org/licenses/gpl-3.0.html
 
-from collections import MutableSequence, namedtuple
+from bisect import bisect_left
+from collections import MutableSequence, OrderedDict, namedtuple
+from difflib import SequenceMatcher
 
 from .base import GUIObject
 from .selectable_list import Selectable
@@ -30,11 +32,14 @@ class Table(MutableSequence, Selectable):
         self._header = None
         self._footer = None
 
+    def __contains__(self, item):
+        return item in self._rows
+
     def __delitem__(self, key):
         self._rows.__delitem__(key)
-        if self._header is not None and ((not self) or (self[0] is not self._header)):
+        if self._header is not None and ((not self) or (self._rows[0] is not self._header)):
             self._header = None
-        if self._footer is not None and ((not self) or (self[-1] is not self._footer)):
+        if self._footer is not None and ((not self) or (self._rows[-1] is not self._footer)):
             self._footer = None
         self._check_selection_range()
 
@@ -57,6 +62,13 @@ class Table(MutableSequence, Selectable):
         else:
             self._rows.append(item)
 
+    def index(self, item):
+        """Returns the index of ``item`` in the table.
+
+        Raises ``ValueError`` if it isn't there.
+        """
+        return self._rows.index(item)
+
     def insert(self, index, item):
         """Inserts ``item`` at ``index`` in the table.
 
@@ -221,6 +233,9 @@ class GUITableView:
 
         Ensures that the contents of the table widget is synced with the model. This includes
         selection.
+
+        Views that can update only some of their rows can call :meth:`GUITable.pop_row_changes`
+        to know which ones. When it returns ``None``, everything has to be reloaded.
         """
 
     def start_editing(self):
@@ -251,15 +266,109 @@ class GUITable(Table, GUIObject):
     editing mechanism which tracks whether (and which) row is being edited (or added) and
     save/cancel edits when appropriate.
 
+    Rows that are expensive to load can subclass :class:`LazyRow`. They're then only loaded when
+    they're fetched from the table (which the view does only for the rows it shows) and no more
+    than :attr:`MAX_LOADED_ROWS` of them are kept loaded at once.
+
     Subclasses :class:`Table` and :class:`.GUIObject`. Expected view:
     :class:`GUITableView`.
     """
+    #: Number of :class:`LazyRow` that we keep loaded. Past that, the least recently used rows
+    #: are unloaded.
+    MAX_LOADED_ROWS = 1000
+
+    #: When a refresh changes more rows than that, we don't look for the rows that stayed in the
+    #: middle of them and :meth:`pop_row_changes` reports them all as replaced.
+    MAX_DIFFED_ROWS = 1000
+
     def __init__(self):
         GUIObject.__init__(self)
         Table.__init__(self)
         #: The row being currently edited by the user. ``None`` if no edit is taking place.
         self.edited = None
         self._sort_descriptor = None
+        # {LazyRow: None}, from the least to the most recently used
+        self._loaded_rows = OrderedDict()
+        # Rows as they were when the view last called pop_row_changes(). None if it never did.
+        self._view_rows = None
+        # Changes from _view_rows to _changed_rows, computed by refresh().
+        self._row_changes = None
+        self._changed_rows = None
+
+    def __getitem__(self, key):
+        result = Table.__getitem__(self, key)
+        if isinstance(key, slice):
+            for row in result:
+                if isinstance(row, LazyRow):
+                    row.ensure_loaded()
+        elif isinstance(result, LazyRow):
+            result.ensure_loaded()
+        return result
+
+    #--- Private
+    def _diff_rows(self, old_rows, new_rows):
+        # Returns difflib-like opcodes to go from old_rows to new_rows (see pop_row_changes()), or
+        # None if rows can't be matched.
+        old_keys = [row.get_key() for row in old_rows]
+        new_keys = [row.get_key() for row in new_rows]
+        if None in old_keys or None in new_keys:
+            return None
+        # Most refreshes change a few rows in one place, so we only diff what's between the rows
+        # that stayed at the start and at the end of the table.
+        prefix = 0
+        max_prefix = min(len(old_keys), len(new_keys))
+        while prefix < max_prefix and old_keys[prefix] == new_keys[prefix]:
+            prefix += 1
+        suffix = 0
+        max_suffix = max_prefix - prefix
+        while suffix < max_suffix and old_keys[-suffix-1] == new_keys[-suffix-1]:
+            suffix += 1
+        old_end = len(old_keys) - suffix
+        new_end = len(new_keys) - suffix
+        opcodes = [('equal', 0, prefix, 0, prefix)]
+        old_middle = old_keys[prefix:old_end]
+        new_middle = new_keys[prefix:new_end]
+        if len(old_middle) + len(new_middle) > self.MAX_DIFFED_ROWS:
+            opcodes.append(('replace', prefix, old_end, prefix, new_end))
+        else:
+            matcher = SequenceMatcher(None, old_middle, new_middle, autojunk=False)
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+                opcodes.append((tag, i1 + prefix, i2 + prefix, j1 + prefix, j2 + prefix))
+        opcodes.append(('equal', old_end, len(old_keys), new_end, len(new_keys)))
+        # Matching rows might have new values, but the view only has to update those it has shown,
+        # that is, those that were loaded.
+        shown = [
+            i for i, row in enumerate(old_rows) if not isinstance(row, LazyRow) or row.is_loaded
+        ]
+        result = []
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag != 'equal':
+                if i1 < i2 or j1 < j2:
+                    result.append((tag, i1, i2, j1, j2))
+                continue
+            start = end = None
+            for i in shown[bisect_left(shown, i1):bisect_left(shown, i2)]:
+                if i != end:
+                    if start is not None:
+                        result.append(('update', start, end, start - i1 + j1, end - i1 + j1))
+                    start = i
+                end = i + 1
+            if start is not None:
+                result.append(('update', start, end, start - i1 + j1, end - i1 + j1))
+        return result
+
+    def _row_used(self, row):
+        # Called by LazyRow.ensure_loaded().
+        loaded_rows = self._loaded_rows
+        loaded_rows[row] = None
+        loaded_rows.move_to_end(row)
+        while len(loaded_rows) > self.MAX_LOADED_ROWS:
+            oldest, _ = loaded_rows.popitem(last=False)
+            if oldest is self.edited:
+                # Unloading it would lose the edits.
+                loaded_rows[oldest] = None
+            else:
+                oldest.unload()
 
     #--- Virtual
     def _do_add(self):
@@ -383,14 +492,41 @@ class GUITable(Table, GUIObject):
         self.cancel_edits()
         previous_selection = self.selected_indexes
         del self[:]
+        self._loaded_rows.clear()
         self._fill()
         sd = self._sort_descriptor
         if sd is not None:
             Table.sort_by(self, column_name=sd.column, desc=sd.desc)
         self._restore_selection(previous_selection)
+        if self._view_rows is not None:
+            self._row_changes = self._diff_rows(self._view_rows, self._rows)
+            self._changed_rows = list(self._rows)
         if refresh_view:
             self.view.refresh()
 
+    def pop_row_changes(self):
+        """Returns the changes in our rows since the last call, and forgets about them.
+
+        Meant to be called by the view in :meth:`GUITableView.refresh`, to update only the rows that
+        changed. Changes are only known for rows that have a :meth:`Row.get_key` and when the last
+        change to our rows was a :meth:`refresh`. Otherwise, or on the first call, returns ``None``.
+
+        Changes are a list of difflib-like opcodes ``(tag, i1, i2, j1, j2)``, in order. Tags are
+        ``'delete'``, ``'insert'`` and ``'replace'``, for rows ``i1:i2`` of the old rows that became
+        rows ``j1:j2``, and ``'update'`` for rows that stayed but might have new values. Rows that
+        stayed and that aren't loaded (the view never fetched them, or they were unloaded since)
+        aren't reported, so the view should also update the rows it shows. As changes are in order,
+        when the view applies one of them, its rows before ``j1`` already are our rows.
+        """
+        if self._changed_rows is not None and self._rows == self._changed_rows:
+            result = self._row_changes
+        else:
+            result = None
+        self._view_rows = list(self._rows)
+        self._row_changes = None
+        self._changed_rows = None
+        return result
+
     def save_edits(self):
         """Commit user edits to the model.
 
@@ -452,6 +588,15 @@ class Row:
         self.table.edited = self
 
     #--- Virtual
+    def get_key(self):
+        """(Virtual) Returns a hashable value identifying what the row represents.
+
+        Used to match rows from before and after a :meth:`GUITable.refresh` to tell the view which
+        rows changed (see :meth:`GUITable.pop_row_changes`). Two rows of a table shouldn't have the
+        same key. By default, returns ``None``, which means that rows can't be matched.
+        """
+        return None
+
     def can_edit(self):
         """(Virtual) Whether the whole row can be edited.
 
@@ -541,3 +686,61 @@ class Row:
             attrname = 'from_'
         setattr(self, attrname, value)
 
+
+class LazyRow(Row):
+    """A :class:`Row` that is only loaded when it's needed.
+
+    Creating a lazy row doesn't call :meth:`Row.load`, which makes it cheap. The row is loaded when
+    it's fetched from its :class:`GUITable` or when an attribute that isn't there yet is accessed
+    (which is why subclasses shouldn't set, in ``__init__``, attributes that :meth:`Row.load`
+    sets). Code that goes through all rows of a big table without fetching them from the table
+    can thus avoid loading them.
+
+    The table only keeps :attr:`GUITable.MAX_LOADED_ROWS` lazy rows loaded. Past that, the least
+    recently used rows are unloaded with :meth:`unload`, and they will be loaded again when needed.
+    """
+    def __init__(self, table):
+        Row.__init__(self, table)
+        # None when not loaded, else a set of the attributes that load() added.
+        self._loaded_attrs = None
+
+    def __getattr__(self, name):
+        # Only called when ``name`` isn't there. If we aren't loaded, load() might set it.
+        if name.startswith('__') or self.__dict__.get('_loaded_attrs', ()) is not None:
+            raise AttributeError(name)
+        self.ensure_loaded()
+        return getattr(self, name)
+
+    #--- Public
+    def ensure_loaded(self):
+        """Calls :meth:`Row.load` if the row isn't loaded.
+
+        The row is also marked as being the most recently used one of its table.
+        """
+        if self._loaded_attrs is None:
+            existing_attrs = set(self.__dict__)
+            # Avoids recursion if load() reads attributes that aren't there
+            self._loaded_attrs = set()
+            self.load()
+            self._loaded_attrs = set(self.__dict__) - existing_attrs
+        self.table._row_used(self)
+
+    def unload(self):
+        """Removes the attributes that :meth:`Row.load` added.
+
+        They will be loaded again when needed.
+        """
+        if self._loaded_attrs is None:
+            return
+        for name in self._loaded_attrs:
+            self.__dict__.pop(name, None)
+        self._loaded_attrs = None
+
+    #--- Properties
+    @property
+    def is_loaded(self):
+        """Whether :meth:`Row.load` was called since the row was created or unloaded.
+
+        *bool*. *read-only*.
+        """
+        return self._loaded_attrs is not None
@@ -10,30 +10,92 @@ This module is a brain-dead simple notification system involving a :class:`Broad
 :class:`Listener`. A listener can only listen to one broadcaster. A broadcaster can have multiple
 listeners. If the listener is connected, whenever the broadcaster calls :meth:`~Broadcaster.notify`,
 the method with the same name as the broadcasted message is called on the listener.
+
+A broadcaster can also coalesce its messages during a burst of changes (see
+:meth:`Broadcaster.coalescing`). They're then delivered once per listener at the end of the burst.
 """
 
-from collections import defaultdict
+from collections import defaultdict, Counter, OrderedDict
+from contextlib import contextmanager
 
 class Broadcaster:
     """Broadcasts messages that are received by all listeners.
     """
     def __init__(self):
         self.listeners = set()
+        #: ``Counter`` of the times each message was dispatched to a listener. Useful for profiling.
+        self.dispatch_counts = Counter()
+        # Listeners can change during iteration, so we iterate over a copy, which we keep until
+        # they change.
+        self._listeners_copy = None
+        self._coalescing_depth = 0
+        # {msg: set of listeners} of messages waiting for the end of coalescing, in order.
+        self._pending = OrderedDict()
+    
+    def _dispatch(self, msg, listeners):
+        for listener in listeners:
+            if listener in self.listeners: # disconnected during notification
+                self.dispatch_counts[msg] += 1
+                listener.dispatch(msg)
     
     def add_listener(self, listener):
         self.listeners.add(listener)
+        self._listeners_copy = None
+    
+    def begin_coalescing(self):
+        """Starts holding messages until :meth:`end_coalescing` is called.
+        
+        Calls can be nested. Messages are delivered when the outermost call ends.
+        """
+        self._coalescing_depth += 1
+    
+    @contextmanager
+    def coalescing(self):
+        """Context manager calling :meth:`begin_coalescing` and :meth:`end_coalescing`."""
+        self.begin_coalescing()
+        try:
+            yield
+        finally:
+            self.end_coalescing()
+    
+    def end_coalescing(self):
+        """Delivers messages held since :meth:`begin_coalescing`.
+        
+        Every message is delivered once to each listener that was connected when it was sent, in
+        the order messages were first sent.
+        
+        Raises ``RuntimeError`` if there's no matching :meth:`begin_coalescing` call.
+        """
+        if self._coalescing_depth == 0:
+            raise RuntimeError("end_coalescing() called without a matching begin_coalescing()")
+        self._coalescing_depth -= 1
+        if self._coalescing_depth > 0:
+            return
+        pending, self._pending = self._pending, OrderedDict()
+        for msg, listeners in pending.items():
+            self._dispatch(msg, listeners)
     
     def notify(self, msg):
         """Notify all connected listeners of ``msg``.
         
         That means that each listeners will have their method with the same name as ``msg`` called.
+        
+        If we're coalescing, this happens at the end of it.
         """
-        for listener in self.listeners.copy(): # listeners can change during iteration
-            if listener in self.listeners: # disconnected during notification
-                listener.dispatch(msg)
+        if self._coalescing_depth > 0:
+            self._pending.setdefault(msg, set()).update(self.listeners)
+        else:
+            self.notify_now(msg)
+    
+    def notify_now(self, msg):
+        """Notify all connected listeners of ``msg``, even if we're coalescing."""
+        if self._listeners_copy is None:
+            self._listeners_copy = tuple(self.listeners)
+        self._dispatch(msg, self._listeners_copy)
     
     def remove_listener(self, listener):
         self.listeners.discard(listener)
+        self._listeners_copy = None
     
 
 class Listener:
@@ -4,6 +4,8 @@
 # which should be included with this package. The terms are also available at 
 # http://www.gnu.org/licenses/gpl-3.0.html
 
+from pytest import raises
+
 from ..testutil import eq_
 from ..notify import Broadcaster, Listener, Repeater
 
@@ -138,3 +140,75 @@ def test_bind_messages():
     b.notify('bar')
     b.notify('hello') # Normal dispatching still work
     eq_(l.hello_count, 3)
+
+def test_coalescing():
+    # While coalescing, messages are held and then delivered once, in the order they were sent.
+    class LoggingListener(Listener):
+        def __init__(self, broadcaster):
+            Listener.__init__(self, broadcaster)
+            self.messages = []
+
+        def dispatch(self, msg):
+            self.messages.append(msg)
+
+    b = Broadcaster()
+    l = LoggingListener(b)
+    l.connect()
+    with b.coalescing():
+        b.notify('foo')
+        with b.coalescing():
+            b.notify('bar')
+            b.notify('foo')
+        eq_(l.messages, [])
+    eq_(l.messages, ['foo', 'bar'])
+    eq_(b.dispatch_counts['foo'], 1)
+
+def test_coalescing_notify_now():
+    # notify_now() delivers right away, even while coalescing.
+    b, l = create_pair()
+    l.connect()
+    with b.coalescing():
+        b.notify_now('hello')
+        eq_(l.hello_count, 1)
+    eq_(l.hello_count, 1)
+
+def test_coalescing_only_delivers_to_listeners_connected_at_both_ends():
+    # A listener that connected after a message was sent, or disconnected before the end of the
+    # coalescing, doesn't get it.
+    b, first = create_pair()
+    second = HelloListener(b)
+    first.connect()
+    b.begin_coalescing()
+    b.notify('hello')
+    first.disconnect()
+    second.connect()
+    b.end_coalescing()
+    eq_(first.hello_count, 0)
+    eq_(second.hello_count, 0)
+    b.notify('hello')
+    eq_(second.hello_count, 1)
+
+def test_unbalanced_end_coalescing():
+    # An end_coalescing() call without a matching begin_coalescing() raises instead of putting the
+    # broadcaster in a state where it would coalesce forever after the next begin_coalescing().
+    b, l = create_pair()
+    l.connect()
+    with raises(RuntimeError):
+        b.end_coalescing()
+    b.begin_coalescing()
+    b.end_coalescing()
+    with raises(RuntimeError):
+        b.end_coalescing()
+    b.notify('hello')
+    eq_(l.hello_count, 1)
+
+def test_dispatch_counts():
+    # We count how many times each message was dispatched to a listener.
+    b, l = create_pair()
+    HelloListener(b).connect()
+    l.connect()
+    b.notify('hello')
+    b.notify('hello')
+    l.disconnect()
+    b.notify('foo')
+    eq_(b.dispatch_counts, {'hello': 4, 'foo': 1})
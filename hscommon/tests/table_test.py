@@ -7,7 +7,7 @@
 # http://www.gnu.org/licenses/gpl-3.0.html
 
 from ..testutil import CallLogger, eq_
-from ..gui.table import Table, GUITable, Row
+from ..gui.table import Table, GUITable, Row, LazyRow
 
 class TestRow(Row):
     def __init__(self, table, index, is_new=False):
@@ -47,6 +47,35 @@ class TestGUITable(GUITable):
         self.updated_rows = self.selected_rows[:]
     
 
+class TestLazyRow(LazyRow):
+    def __init__(self, table, index):
+        LazyRow.__init__(self, table)
+        self._index = index
+
+    def load(self):
+        self.table.load_count += 1
+        self.name = 'row {}'.format(self._index)
+
+    def save(self):
+        pass
+
+    def get_key(self):
+        return self._index
+
+
+class TestLazyGUITable(TestGUITable):
+    MAX_LOADED_ROWS = 3
+
+    def __init__(self, rowcount):
+        TestGUITable.__init__(self, rowcount)
+        self.load_count = 0
+        self.indexes = list(range(rowcount))
+
+    def _fill(self):
+        for i in self.indexes:
+            self.append(TestLazyRow(self, i))
+
+
 def table_with_footer():
     table = Table()
     table.append(TestRow(table, 0))
@@ -310,4 +339,122 @@ def test_sort_table_with_header():
     # Sorting a table with a header keeps it at the top
     table, header = table_with_header()
     table.sort_by('index', desc=True)
-    assert table[0] is header
\ No newline at end of file
+    assert table[0] is header
+
+def test_lazy_rows_are_loaded_when_fetched():
+    table = TestLazyGUITable(10)
+    table.refresh(refresh_view=False)
+    # Only the selected row has been fetched
+    eq_(table.load_count, 1)
+    eq_(len(table), 10)
+    eq_(table[4].name, 'row 4')
+    eq_(table.load_count, 2)
+    # Fetching it again doesn't reload it.
+    assert table[4].is_loaded
+    eq_(table.load_count, 2)
+
+def test_lazy_rows_index_and_contains():
+    # Looking for a row doesn't load rows.
+    table = TestLazyGUITable(10)
+    table.refresh(refresh_view=False)
+    row = table._rows[5]
+    assert row in table
+    eq_(table.index(row), 5)
+    table.selected_row = row
+    eq_(table.selected_index, 5)
+    assert not row.is_loaded
+
+def test_lazy_rows_least_recently_used_are_unloaded():
+    table = TestLazyGUITable(10)
+    table.refresh(refresh_view=False)
+    table.load_count = 0
+    rows = [table[i] for i in range(3)]
+    table[0] # row 0 is now more recently used than row 1
+    table[3]
+    eq_([row.is_loaded for row in rows], [True, False, True])
+    # An unloaded row is loaded again when one of its attributes is accessed.
+    eq_(rows[1].name, 'row 1')
+    eq_(table.load_count, 5)
+
+def test_lazy_edited_row_stays_loaded():
+    table = TestLazyGUITable(10)
+    table.refresh(refresh_view=False)
+    row = table[0]
+    row.name = 'edited'
+    table.edited = row
+    for i in range(1, 10):
+        table[i]
+    eq_(row.name, 'edited')
+
+def test_lazy_rows_sort():
+    # Sorting by an attribute that load() doesn't set doesn't load rows.
+    table = TestLazyGUITable(10)
+    table.refresh(refresh_view=False)
+    table.sort_by('index', desc=True)
+    eq_(table._rows[0]._index, 9)
+    # Only the selected rows were fetched, before and after sorting.
+    eq_(table.load_count, 2)
+
+def test_row_changes_unknown_before_view_is_synced():
+    table = TestLazyGUITable(10)
+    table.refresh()
+    eq_(table.pop_row_changes(), None)
+    table.refresh()
+    eq_(table.pop_row_changes(), [('update', 9, 10, 9, 10)])
+
+def test_row_changes_after_refresh():
+    # Inserted and removed rows are reported, as well as the rows that stayed and that were
+    # fetched (the selected row 9 and row 2 here).
+    table = TestLazyGUITable(10)
+    table.refresh()
+    table.pop_row_changes()
+    table[2]
+    table[4]
+    table.indexes = [0, 1, 2, 3, 5, 6, 7, 8, 9, 10]
+    table.refresh()
+    expected = [
+        ('update', 2, 3, 2, 3),
+        ('delete', 4, 5, 4, 4),
+        ('update', 9, 10, 8, 9),
+        ('insert', 10, 10, 9, 10),
+    ]
+    eq_(table.pop_row_changes(), expected)
+    # Changes are forgotten once popped.
+    eq_(table.pop_row_changes(), None)
+
+def test_row_changes_since_last_pop():
+    # When the view doesn't pop changes after a refresh, the next changes include them.
+    table = TestLazyGUITable(3)
+    table.refresh()
+    table.pop_row_changes()
+    table.indexes = [0, 1]
+    table.refresh(refresh_view=False)
+    table.indexes = [1]
+    table.refresh()
+    eq_(table.pop_row_changes(), [('delete', 0, 1, 0, 0), ('delete', 2, 3, 1, 1)])
+
+def test_row_changes_unknown_after_other_changes():
+    # Changes to rows that don't come from a refresh can't be diffed.
+    table = TestLazyGUITable(10)
+    table.refresh()
+    table.pop_row_changes()
+    table.refresh()
+    del table[0]
+    eq_(table.pop_row_changes(), None)
+
+def test_row_changes_unknown_without_row_keys():
+    table = TestGUITable(10)
+    table.refresh()
+    table.pop_row_changes()
+    table.refresh()
+    eq_(table.pop_row_changes(), None)
+
+def test_row_changes_with_many_changes():
+    # When a refresh changes many rows, the rows that stayed among them are replaced too.
+    table = TestLazyGUITable(10)
+    table.MAX_DIFFED_ROWS = 4
+    table.refresh()
+    table.pop_row_changes()
+    table.indexes = [0, 11, 2, 13, 4, 15, 6, 7, 8, 9]
+    table.refresh()
+    eq_(table.pop_row_changes(), [('replace', 1, 6, 1, 6), ('update', 9, 10, 9, 10)])
@@ -19,6 +19,8 @@ class Table(QAbstractTableModel):
         super().__init__(**kwargs)
         self.model = model
         self.view = view
+        # While we apply row changes, the number of rows that the view knows about.
+        self._rowCount = None
         self.view.setModel(self)
         self.model.view = self
         if hasattr(self.model, 'columns'):
@@ -26,6 +28,42 @@ class Table(QAbstractTableModel):
         
         self.view.selectionModel().selectionChanged[(QItemSelection, QItemSelection)].connect(self.selectionChanged)
     
+    def _applyRowChanges(self, changes):
+        # We first remove rows, from the last ones so that the old indexes (i1:i2) stay valid, and
+        # then insert rows in order, so that our rows before j1 are already up to date. This way,
+        # the number of rows the view knows about never exceeds the larger of the old and the new
+        # number of rows, and once removals are done, it never exceeds the model's.
+        removed = sum(i2 - i1 for tag, i1, i2, j1, j2 in changes if tag in {'delete', 'replace'})
+        inserted = sum(j2 - j1 for tag, i1, i2, j1, j2 in changes if tag in {'insert', 'replace'})
+        self._rowCount = len(self.model) - inserted + removed
+        lastColumn = self.columnCount(QModelIndex()) - 1
+        try:
+            for tag, i1, i2, j1, j2 in reversed(changes):
+                if tag in {'delete', 'replace'}:
+                    self.beginRemoveRows(QModelIndex(), i1, i2 - 1)
+                    self._rowCount -= i2 - i1
+                    self.endRemoveRows()
+            for tag, i1, i2, j1, j2 in changes:
+                if tag in {'insert', 'replace'}:
+                    self.beginInsertRows(QModelIndex(), j1, j2 - 1)
+                    self._rowCount += j2 - j1
+                    self.endInsertRows()
+        finally:
+            self._rowCount = None
+        for tag, i1, i2, j1, j2 in changes:
+            if tag == 'update':
+                self.dataChanged.emit(self.index(j1, 0), self.index(j2 - 1, lastColumn))
+        # Changes only have updates for loaded rows, and the model might have unloaded some of the
+        # rows we show.
+        visibleRows = self._visibleRows()
+        if visibleRows is not None:
+            first, last = visibleRows
+            self.dataChanged.emit(self.index(first, 0), self.index(last, lastColumn))
+    
+    def _isRowValid(self, index):
+        # While we apply row changes, the view can ask for rows that the model doesn't have anymore.
+        return index.isValid() and index.row() < len(self.model)
+    
     def _updateModelSelection(self):
         # Takes the selection on the view's side and update the model with it.
         # an _updateViewSelection() call will normally result in an _updateModelSelection() call.
@@ -47,6 +85,16 @@ class Table(QAbstractTableModel):
             self.view.selectionModel().setCurrentIndex(currentIndex, QItemSelectionModel.Current)
             self.view.scrollTo(currentIndex)
     
+    def _visibleRows(self):
+        # Returns the (first, last) rows shown by the view, or None if there's none.
+        first = self.view.rowAt(0)
+        if first == -1:
+            return None
+        last = self.view.rowAt(self.view.viewport().height())
+        if last == -1:
+            last = self.rowCount(QModelIndex()) - 1
+        return first, last
+    
     #--- Data Model methods
     # Virtual
     def _getData(self, row, column, role):
@@ -78,14 +126,14 @@ class Table(QAbstractTableModel):
         return self.model.columns.columns_count()
     
     def data(self, index, role):
-        if not index.isValid():
+        if not self._isRowValid(index):
             return None
         row = self.model[index.row()]
         column = self.model.columns.column_by_index(index.column())
         return self._getData(row, column, role)
     
     def flags(self, index):
-        if not index.isValid():
+        if not self._isRowValid(index):
             return self.INVALID_INDEX_FLAGS
         row = self.model[index.row()]
         column = self.model.columns.column_by_index(index.column())
@@ -110,10 +158,12 @@ class Table(QAbstractTableModel):
     def rowCount(self, index):
         if index.isValid():
             return 0
+        if self._rowCount is not None:
+            return self._rowCount
         return len(self.model)
     
     def setData(self, index, value, role):
-        if not index.isValid():
+        if not self._isRowValid(index):
             return False
         row = self.model[index.row()]
         column = self.model.columns.column_by_index(index.column())
@@ -130,12 +180,21 @@ class Table(QAbstractTableModel):
     
     #--- Events
     def selectionChanged(self, selected, deselected):
+        if self._rowCount is not None:
+            # We're applying row changes and the selection model is dropping removed rows from its
+            # selection. The model's selection is already right, and refresh() puts it back in the
+            # view when we're done.
+            return
         self._updateModelSelection()
     
     #--- model --> view
     def refresh(self):
-        self.beginResetModel()
-        self.endResetModel()
+        changes = self.model.pop_row_changes()
+        if changes is None:
+            self.beginResetModel()
+            self.endResetModel()
+        else:
+            self._applyRowChanges(changes)
         self._updateViewSelection()
     
     def show_selected_row(self):
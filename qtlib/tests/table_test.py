@@ -0,0 +1,155 @@
+# Copyright 2016 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+import pytest
+pytest.importorskip('PyQt5')
+
+from PyQt5.QtCore import Qt, QModelIndex, QItemSelectionModel
+
+from hscommon.testutil import CallLogger, eq_
+from hscommon.gui.column import Column, Columns
+from hscommon.gui.table import GUITable, LazyRow
+
+from ..table import Table
+
+class TestRow(LazyRow):
+    def __init__(self, table, key):
+        LazyRow.__init__(self, table)
+        self.key = key
+
+    def load(self):
+        self.value = self.table.values[self.key]
+
+    def get_key(self):
+        return self.key
+
+
+class TestGUITable(GUITable):
+    COLUMNS = [Column('value')]
+    MAX_LOADED_ROWS = 2
+
+    def __init__(self, keys):
+        GUITable.__init__(self)
+        self.columns = Columns(self)
+        self.keys = keys
+        self.values = {key: key for key in keys}
+
+    def _fill(self):
+        for key in self.keys:
+            self.append(TestRow(self, key))
+
+
+class FakeSignal:
+    def connect(self, slot):
+        pass
+
+
+class FakeHeaderView(CallLogger):
+    sectionMoved = FakeSignal()
+    sectionResized = FakeSignal()
+
+
+class FakeTableView:
+    # Shows rows `first` to `last`, or less if there aren't that many.
+    def __init__(self, first, last):
+        self.first = first
+        self.last = last
+        self.model = None
+        self._selectionModel = None
+
+    def horizontalHeader(self):
+        return FakeHeaderView()
+
+    def rowAt(self, y):
+        row = self.first if y == 0 else self.last
+        return row if row < self.model.rowCount(QModelIndex()) else -1
+
+    def scrollTo(self, index):
+        pass
+
+    def selectionModel(self):
+        return self._selectionModel
+
+    def setModel(self, model):
+        self.model = model
+        self._selectionModel = QItemSelectionModel(model)
+
+    def viewport(self):
+        return self
+
+    def height(self):
+        return 100
+
+
+class ViewRows:
+    # Keeps the values that a view of `table` shows by following its signals. Like a view, it can
+    # ask for any of the rows it knows about after each signal.
+    def __init__(self, table):
+        self.table = table
+        self.errors = []
+        self.values = self._read(0, table.rowCount(QModelIndex()))
+        table.rowsRemoved.connect(self.rowsRemoved)
+        table.rowsInserted.connect(self.rowsInserted)
+        table.dataChanged.connect(self.dataChanged)
+
+    def _read(self, start, end):
+        return [self.table.data(self.table.index(row, 0), Qt.DisplayRole) for row in range(start, end)]
+
+    def _check(self):
+        try:
+            rowCount = self.table.rowCount(QModelIndex())
+            eq_(rowCount, len(self.values))
+            self._read(0, rowCount)
+        except Exception as e:
+            self.errors.append(e)
+
+    def rowsRemoved(self, parent, first, last):
+        del self.values[first:last+1]
+        self._check()
+
+    def rowsInserted(self, parent, first, last):
+        self.values[first:first] = self._read(first, last + 1)
+        self._check()
+
+    def dataChanged(self, topLeft, bottomRight, roles=()):
+        self.values[topLeft.row():bottomRight.row()+1] = self._read(topLeft.row(), bottomRight.row() + 1)
+        self._check()
+
+
+def create_table(keys, first=0, last=100):
+    model = TestGUITable(keys)
+    table = Table(model, FakeTableView(first, last))
+    model.refresh()
+    return model, table, ViewRows(table)
+
+def test_row_changes_with_fewer_rows():
+    # When rows are inserted before rows that are removed, the view never knows about more rows
+    # than the model has, except for those that it knew about before.
+    model, table, view = create_table(list('abcde'))
+    model.keys = list('xab') + list('yc')
+    model.values.update(x='x', y='y')
+    model.refresh()
+    eq_(view.errors, [])
+    eq_(view.values, list('xabyc'))
+
+def test_row_changes_with_more_rows():
+    model, table, view = create_table(list('abc'))
+    model.keys = list('xbyzc')
+    model.values.update(x='x', y='y', z='z')
+    model.refresh()
+    eq_(view.errors, [])
+    eq_(view.values, list('xbyzc'))
+
+def test_visible_rows_are_updated_even_when_unloaded():
+    # The model only reports updates for its loaded rows, but the rows that the view shows might
+    # have been unloaded.
+    model, table, view = create_table(list('abcde'), first=1, last=3)
+    eq_(view.values, list('abcde'))
+    model.values = {key: key.upper() for key in model.keys}
+    model.refresh()
+    eq_(view.errors, [])
+    # Rows 1 to 3 are shown, and the model has kept rows 3 and 4 loaded.
+    eq_(view.values, list('aBCDE'))